@@ -1,19 +1,28 @@
 """Router definition for easy FastAPI integration"""
 
 import os
+import json
+import asyncio
 import uuid
-from typing import Dict, Any, List
-from fastapi import APIRouter, HTTPException
+import contextlib
+from typing import AsyncIterator, Awaitable, Dict, Any, List, TypeVar
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from core.mcp_client.client import MCPWIPClient
 from core.mcp_client.models import AssistantMessage, ToolMessage
+from core.mcp_client.token_usage import TokenBudgetExceeded
 from .models import ChatRequest, ContextInjectionRequest
 
-
 router = APIRouter()
 _wip_client: MCPWIPClient = None
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+# seconds between two checks of the client connection during a chat turn
+DISCONNECT_POLL_INTERVAL = 0.5
+
+T = TypeVar("T")
+
 
 router = APIRouter()
 
@@ -61,6 +70,52 @@ def get_client() -> MCPWIPClient:
     return _deps.client
 
 
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    FastAPI lifespan that opens the MCP sessions of the configured MCPWIPClient on startup
+    and closes them on shutdown.
+
+    Args:
+        app (FastAPI): The FastAPI application.
+
+    Example:
+        app = FastAPI(lifespan=lifespan)
+    """
+    client = get_client()
+    await client.start()
+    try:
+        yield
+    finally:
+        await client.close()
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await a chat turn, cancelling it (in-flight LLM request and MCP calls included) if the HTTP client disconnects.
+
+    Args:
+        request (Request): The incoming HTTP request.
+        awaitable (Awaitable[T]): The chat turn to run.
+
+    Returns:
+        T: The result of the chat turn.
+
+    Raises:
+        HTTPException: 499 if the client disconnected before the end of the turn.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        task.cancel()
+
+
 @router.get("/manifest")
 async def get_full_manifest() -> Dict[str, Any]:
     """
@@ -81,33 +136,79 @@ async def get_full_manifest() -> Dict[str, Any]:
 
 
 @router.post("/chat", response_model=List[ToolMessage | AssistantMessage])
-async def chat(req: ChatRequest) -> List[ToolMessage | AssistantMessage]:
+async def chat(
+    req: ChatRequest, request: Request
+) -> List[ToolMessage | AssistantMessage]:
     """
     Handle a chat request by passing it to the MCPWIPClient and returning the response.
+    The turn is cancelled if the client disconnects.
 
     Args:
         req (ChatRequest): The incoming chat request data.
+        request (Request): The incoming HTTP request.
 
     Returns:
         List[ToolMessage | AssistantMessage]: The resulting chat turn consisting of tool and assistant messages.
 
     Raises:
-        HTTPException: If there is an error while processing the chat turn.
+        HTTPException: If there is an error while processing the chat turn, 429 if the token budget is exhausted.
     """
     try:
         client = get_client()
         session_id = req.session_id
-        result = await client.run_chat_turn(
-            req.message,
-            session_id=session_id,
+        result = await cancel_on_disconnect(
+            request,
+            client.run_chat_turn(
+                req.message,
+                session_id=session_id,
+            ),
         )
         # print(result)
         return result
+    except HTTPException:
+        raise
+    except TokenBudgetExceeded as exc:
+        raise HTTPException(status_code=429, detail=str(exc)) from exc
     except Exception as exc:
         print(exc.with_traceback())
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+@router.post("/chat-stream")
+async def chat_stream(req: ChatRequest) -> StreamingResponse:
+    """
+    Handle a chat request streaming the turn as Server-Sent Events.
+
+    Events are named after the message role: `tool` for each completed tool call, `widget` as soon as
+    the selected widget uri is known (sent again, possibly empty, if the validated answer changes it),
+    `assistant` for the final message. Failures are sent as an `error` event.
+    When the client disconnects, the turn is closed and its in-flight LLM request and MCP calls are cancelled.
+
+    Args:
+        req (ChatRequest): The incoming chat request data.
+
+    Returns:
+        StreamingResponse: The text/event-stream response.
+    """
+    client = get_client()
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async with contextlib.aclosing(
+                client.run_chat_turn_stream(req.message, session_id=req.session_id)
+            ) as messages:
+                async for message in messages:
+                    yield f"event: {message.role}\ndata: {message.model_dump_json()}\n\n"
+        except Exception as exc:
+            yield f"event: error\ndata: {json.dumps({'detail': str(exc)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/context-injection")
 async def context_injection(req: ContextInjectionRequest) -> Dict[str, Any]:
     """
@@ -188,3 +289,38 @@ async def call_tool(tool_name: str, arguments: dict) -> Any:
         return result
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@router.get("/token-usage")
+async def token_usage(session_id: str | None = None) -> Dict[str, Any]:
+    """
+    Report the LLM tokens used (prompt, completion, cached), per session and turn or overall and per widget.
+
+    Args:
+        session_id (str | None): The session to report, None for the overall report.
+
+    Returns:
+        dict: The token usage report.
+
+    Raises:
+        HTTPException: 404 if the session is unknown.
+    """
+    client = get_client()
+    report = client.token_usage.report(session_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return report
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """
+    Expose the client metrics (turn stage durations, counters, caches, LLM limiter) for Prometheus.
+
+    Returns:
+        PlainTextResponse: The metrics in the Prometheus text exposition format.
+    """
+    client = get_client()
+    return PlainTextResponse(
+        client.prometheus_metrics(), media_type="text/plain; version=0.0.4"
+    )
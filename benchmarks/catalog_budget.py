@@ -0,0 +1,40 @@
+"""
+Widget catalog size and rendering time of a turn prompt, for several catalog token budgets.
+
+Run from the repository root:
+    python -m benchmarks.catalog_budget [--widgets 100] [--iterations 200]
+"""
+
+import argparse
+import json
+import time
+
+from core.mcp_client.catalog import CatalogRenderer
+from .fakes import synthetic_manifest
+
+
+def main():
+    """Main function of the benchmark"""
+    parser = argparse.ArgumentParser(
+        description="Widget catalog token budget benchmark"
+    )
+    parser.add_argument("--widgets", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    texts = [synthetic_manifest(i).model_dump_json() for i in range(args.widgets)]
+    manifests = [json.loads(text) for text in texts]
+    print(f"{'budget':>8}{'widgets':>9}{'tokens':>9}{'ms/turn':>10}")
+    for budget in (None, 8000, 4000, 2000, 1000, 500):
+        renderer = CatalogRenderer(token_budget=budget)
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            catalog = renderer.render(texts, manifests)
+        elapsed = (time.perf_counter() - start) / args.iterations
+        print(
+            f"{str(budget):>8}{len(catalog.uris):>9}{catalog.tokens:>9}{elapsed * 1e3:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Local fake OpenAI-compatible LLM server, for the benchmarks of the HTTP paths (LLM router, routes load).
+
+Serves POST /v1/chat/completions, streamed or not, answering with a FakeLLM script (by default the
+first widget offered in the last user message, or tool calls then a widget with --tool-calls), with a
+configurable latency tail, error rate and concurrency limit (429 responses).
+
+Run from the repository root:
+    python -m benchmarks.fake_openai_server [--port 8100] [--latency 0.05] [--slow-fraction 0.05]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import socket
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.requests import ClientDisconnect
+
+from .fakes import FakeLLM, estimate_tokens
+
+
+def create_app(
+    latency: float = 0.05,
+    slow_latency: float = 1.0,
+    slow_fraction: float = 0.0,
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    max_concurrency: int | None = None,
+    retry_after: float = 0.5,
+    script: Callable[[List[Dict[str, Any]], Any], Any] = FakeLLM.select_first_widget,
+) -> FastAPI:
+    """
+    Builds the fake server.
+
+    Args:
+        latency: Seconds before each response.
+        slow_latency: Seconds before the responses of the slow requests.
+        slow_fraction: Fraction of the requests that are slow (the latency tail).
+        error_rate: Fraction of the requests answered with error_status.
+        error_status: HTTP status of the failed requests.
+        max_concurrency: Max number of concurrent requests, the others are answered 429.
+        retry_after: Seconds of the retry-after header of the 429 responses.
+        script: Function producing the answer of each completion, a final answer string or a list of
+            (tool name, arguments) tool calls (see FakeLLM).
+    """
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.in_flight = 0
+    app.state.rate_limited = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        try:
+            body = await request.json()
+        except ClientDisconnect:
+            # hedged requests are cancelled as soon as another endpoint answers
+            return Response(status_code=499)
+        app.state.requests += 1
+        if max_concurrency is not None and app.state.in_flight >= max_concurrency:
+            app.state.rate_limited += 1
+            return JSONResponse(
+                {"error": {"message": "rate limited", "type": "rate_limit_error"}},
+                status_code=429,
+                headers={"retry-after": str(retry_after)},
+            )
+        app.state.in_flight += 1
+        try:
+            await asyncio.sleep(
+                slow_latency if random.random() < slow_fraction else latency
+            )
+        finally:
+            app.state.in_flight -= 1
+        if random.random() < error_rate:
+            return JSONResponse(
+                {"error": {"message": "fake error", "type": "server_error"}},
+                status_code=error_status,
+            )
+        answer = script(body["messages"], body.get("tools"))
+        created = int(time.time())
+        completion_id = f"chatcmpl-{app.state.requests}"
+        if isinstance(answer, list):
+            content = ""
+            tool_calls = [
+                {
+                    "index": i,
+                    "id": f"call_{app.state.requests}_{i}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(args)},
+                }
+                for i, (name, args) in enumerate(answer)
+            ]
+            finish_reason = "tool_calls"
+        else:
+            content, tool_calls, finish_reason = answer, [], "stop"
+        prompt_tokens = estimate_tokens(body["messages"])
+        completion_tokens = (len(content) + len(json.dumps(tool_calls))) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": finish_reason,
+                        "message": {
+                            "role": "assistant",
+                            "content": content or None,
+                            "tool_calls": [
+                                {k: v for k, v in tc.items() if k != "index"}
+                                for tc in tool_calls
+                            ]
+                            or None,
+                        },
+                    }
+                ],
+                "usage": usage,
+            }
+
+        def chunk(delta: Dict[str, Any], finish: str | None = None) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        async def events() -> AsyncIterator[str]:
+            for i in range(0, len(content), 16):
+                yield chunk({"content": content[i : i + 16]})
+            if tool_calls:
+                yield chunk({"tool_calls": tool_calls})
+            yield chunk({}, finish_reason)
+            last = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body["model"],
+                "choices": [],
+                "usage": usage,
+            }
+            yield f"data: {json.dumps(last)}\n\ndata: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def free_port() -> int:
+    """A free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.asynccontextmanager
+async def serve(
+    app: FastAPI, port: int | None = None
+) -> AsyncIterator[Tuple[str, int]]:
+    """
+    Runs an ASGI app with uvicorn in the current event loop.
+
+    Yields:
+        Tuple[str, int]: the base URL ("http://127.0.0.1:<port>") and the port.
+    """
+    port = port or free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}", port
+    finally:
+        server.should_exit = True
+        await task
+
+
+def main():
+    """Runs a fake server until interrupted"""
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=1.0)
+    parser.add_argument("--slow-fraction", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--tool-calls", action="store_true")
+    args = parser.parse_args()
+    app = create_app(
+        latency=args.latency,
+        slow_latency=args.slow_latency,
+        slow_fraction=args.slow_fraction,
+        error_rate=args.error_rate,
+        max_concurrency=args.max_concurrency,
+        script=(
+            FakeLLM.call_tools_then_select
+            if args.tool_calls
+            else FakeLLM.select_first_widget
+        ),
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
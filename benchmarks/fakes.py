@@ -0,0 +1,269 @@
+"""
+Offline stand-ins for the benchmarks: a fake OpenAI-compatible LLM client, a keyword RAG and
+an in-process MCPWIPServer with synthetic widget manifests.
+"""
+
+import asyncio
+import collections
+import json
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from fastmcp import FastMCP
+from openai.types.chat import ChatCompletion, ChatCompletionChunk, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+from openai.types.chat.chat_completion_message_function_tool_call import (
+    ChatCompletionMessageFunctionToolCall,
+    Function,
+)
+from openai.types.completion_usage import CompletionUsage
+
+from core.mcp_client import catalog
+from core.mcp_client.models import ValidResponse
+from core.mcp_server.models import WidgetManifest
+from core.mcp_server.server import MCPWIPServer
+from rag.base import BaseRAG
+
+_WIP_URI = re.compile(r"wip://[\w\-./]+")
+_USER_TEXT = re.compile(r"User:\n(.*?)\nAvailable-widgets:", re.S)
+_SKU = re.compile(r"\bsku\w+", re.I)
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Estimated prompt tokens of a list of messages."""
+    return sum(catalog.estimate_tokens(json.dumps(m)) for m in messages)
+
+
+class _Namespace:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _FakeStream:
+    def __init__(self, chunks: List[ChatCompletionChunk]):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self):
+        """Nothing to release."""
+
+
+class FakeLLM:
+    """
+    Fake AsyncOpenAI client answering `chat.completions.create` (streamed or not) and `responses.parse`.
+
+    The answer of each completion is produced by `script(messages, tools)`, returning either
+    a final answer string or a list of (tool name, arguments) tool calls. By default the
+    first widget offered in the last user message is selected. Every request is recorded.
+    """
+
+    def __init__(
+        self,
+        script: Optional[Callable[[List[Dict[str, Any]], Any], Any]] = None,
+        latency: float = 0.0,
+    ):
+        """
+        Args:
+            script: Function producing the answer of each completion.
+            latency: Seconds of simulated latency per request.
+        """
+        self.script = script or self.select_first_widget
+        self.latency = latency
+        self.requests: List[Dict[str, Any]] = []
+        self.chat = _Namespace(completions=_Namespace(create=self._create))
+        self.responses = _Namespace(parse=self._parse)
+
+    @staticmethod
+    def select_first_widget(messages: List[Dict[str, Any]], tools: Any) -> str:
+        """Selects the first widget offered in the last user message."""
+        content = next(m["content"] for m in reversed(messages) if m["role"] == "user")
+        match = _WIP_URI.search(content)
+        uri = match.group(0) if match else ""
+        return json.dumps({"uri": uri, "parameters": [], "text": ""})
+
+    @staticmethod
+    def call_tools_then_select(messages: List[Dict[str, Any]], tools: Any) -> Any:
+        """
+        Calls get_stock_for_sku or read_daily_calendar when the user asks about stock or meetings
+        (and the tool is offered), then selects the first widget offered once the tool has answered.
+        """
+        if messages[-1]["role"] == "tool":
+            return FakeLLM.select_first_widget(messages, tools)
+        content = next(m["content"] for m in reversed(messages) if m["role"] == "user")
+        match = _USER_TEXT.search(content)
+        text = (match.group(1) if match else content).lower()
+        names = {t["function"]["name"] for t in tools or []}
+        if "stock" in text and "get_stock_for_sku" in names:
+            sku = _SKU.search(text)
+            return [("get_stock_for_sku", {"sku": sku.group(0) if sku else "sku1"})]
+        if ("meeting" in text or "calendar" in text) and "read_daily_calendar" in names:
+            date = _DATE.search(text)
+            return [
+                (
+                    "read_daily_calendar",
+                    {"date": date.group(0) if date else "2025-01-01"},
+                )
+            ]
+        return FakeLLM.select_first_widget(messages, tools)
+
+    async def _create(self, **kwargs) -> ChatCompletion:
+        self.requests.append(kwargs)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        answer = self.script(kwargs["messages"], kwargs.get("tools"))
+        if isinstance(answer, list):
+            message = ChatCompletionMessage(
+                role="assistant",
+                content=None,
+                tool_calls=[
+                    ChatCompletionMessageFunctionToolCall(
+                        id=f"call_{len(self.requests)}_{i}",
+                        type="function",
+                        function=Function(name=name, arguments=json.dumps(args)),
+                    )
+                    for i, (name, args) in enumerate(answer)
+                ],
+            )
+            finish_reason = "tool_calls"
+        else:
+            message = ChatCompletionMessage(role="assistant", content=answer)
+            finish_reason = "stop"
+        prompt_tokens = estimate_tokens(kwargs["messages"])
+        completion_tokens = len(json.dumps(message.model_dump())) // 4
+        completion = ChatCompletion(
+            id=f"chatcmpl-{len(self.requests)}",
+            object="chat.completion",
+            created=int(time.time()),
+            model=kwargs["model"],
+            choices=[Choice(index=0, finish_reason=finish_reason, message=message)],
+            usage=CompletionUsage(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+        if not kwargs.get("stream"):
+            return completion
+        # the whole message in one chunk, then the usage chunk
+        base = completion.model_dump(include={"id", "created", "model"})
+        delta = {"content": message.content}
+        if message.tool_calls:
+            delta["tool_calls"] = [
+                {"index": i, **tc.model_dump()}
+                for i, tc in enumerate(message.tool_calls)
+            ]
+        chunks = [
+            {
+                **base,
+                "object": "chat.completion.chunk",
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            },
+            {
+                **base,
+                "object": "chat.completion.chunk",
+                "choices": [],
+                "usage": completion.usage.model_dump(),
+            },
+        ]
+        return _FakeStream([ChatCompletionChunk.model_validate(c) for c in chunks])
+
+    async def _parse(self, **kwargs):
+        self.requests.append(kwargs)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return _Namespace(
+            output_parsed=ValidResponse(text=str(kwargs["input"])), usage=None
+        )
+
+
+class KeywordRAG(BaseRAG):
+    """
+    In-memory keyword RAG over widget JSON texts, ranking them by the number of query words
+    they contain (inverted index), as a stand-in for the vector RAG search path.
+    """
+
+    documents: List[str] = []
+
+    def model_post_init(self, __context: Any) -> None:
+        self._index: Dict[str, List[int]] = collections.defaultdict(list)
+        for i, document in enumerate(self.documents):
+            for word in set(re.findall(r"\w+", document.lower())):
+                self._index[word].append(i)
+
+    def search(self, query: str, top_k: Optional[int] = 5, **kwargs) -> List[str]:
+        scores: Dict[int, int] = collections.Counter()
+        for word in set(re.findall(r"\w+", query.lower())):
+            for i in self._index.get(word, ()):
+                scores[i] += 1
+        return [self.documents[i] for i, _ in scores.most_common(top_k)]
+
+    def hybrid_search(
+        self, query: str, top_k: Optional[int] = 5, **kwargs
+    ) -> List[str]:
+        return self.search(query, top_k)
+
+
+def synthetic_manifest(i: int) -> WidgetManifest:
+    """A synthetic widget manifest of realistic size."""
+    return WidgetManifest(
+        uri=f"wip://synthetic-widget-{i}",
+        input_parameters_schema={
+            "type": "object",
+            "properties": {
+                "sku": {"type": "string", "description": "The product sku"},
+                "date": {"type": "string", "description": "A date in yyyy-mm-dd"},
+                "ids": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "A list of identifiers",
+                },
+            },
+            "required": ["sku"],
+            "additionalProperties": False,
+        },
+        capabilities=["display", "interact"],
+        name=f"Synthetic widget {i}",
+        description=(
+            f"Synthetic widget number {i}, it displays product information, stock levels "
+            "and related items in an interactive card that the user can browse."
+        ),
+        use_cases_hints=f"Use it when the user asks about topic {i} or products related to it.",
+        version="1.0.0",
+    )
+
+
+def build_server(n_widgets: int = 10, tool_latency: float = 0.0) -> FastMCP:
+    """
+    Builds an in-process FastMCP server wrapped by MCPWIPServer, with synthetic manifests and two tools.
+
+    Args:
+        n_widgets: Number of synthetic widget manifests.
+        tool_latency: Seconds of simulated latency of each tool call.
+    """
+    server = FastMCP("mcp-wip-bench")
+
+    @server.tool(description="Returns the stock level for each size of the given sku.")
+    async def get_stock_for_sku(sku: str) -> dict:
+        if tool_latency:
+            await asyncio.sleep(tool_latency)
+        return {"sku": sku, "stock_by_size": [{"size": "40", "stock": 3}]}
+
+    @server.tool(
+        description="Reads the calendar events given the date in the format yyyy-mm-dd."
+    )
+    async def read_daily_calendar(date: str) -> dict:
+        if tool_latency:
+            await asyncio.sleep(tool_latency)
+        return {"events": [{"id": "1", "title": "Team Meeting", "date": date}]}
+
+    wip_server = MCPWIPServer(input_dir="", server=server, load_from_directory=False)
+    for i in range(n_widgets):
+        wip_server.add_manifest_json_resource(synthetic_manifest(i))
+    return server
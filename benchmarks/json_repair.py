@@ -0,0 +1,169 @@
+"""
+Corpus check and microbenchmark of the local JSON repair of the LLM final answers.
+
+Every corpus entry is checked against its expected repair, then the repair pipeline
+is timed against the plain json.loads + ValidResponse validation. The corpus is also
+checked by the test suite (tests/test_json_repair.py).
+
+Run from the repository root:
+    python -m benchmarks.json_repair [--iterations 2000]
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.mcp_client.json_repair import repair_response
+from core.mcp_client.models import ValidResponse
+
+_STOCK = {
+    "uri": "wip://stock-level-inspector",
+    "parameters": [{"name": "sku", "value": "sku1234"}],
+    "text": "",
+}
+_CALENDAR = {
+    "uri": "wip://calendar",
+    "parameters": [
+        {"name": "date", "value": "2025-10-20"},
+        {"name": "days", "value": 3},
+    ],
+    "text": "",
+}
+_TEXT = {"uri": "", "parameters": [], "text": "Hello! How can I help you?"}
+
+# (description, LLM answer, expected repair or None if the repair must fail)
+CORPUS: List[Tuple[str, Any, Optional[Dict[str, Any]]]] = [
+    ("valid", json.dumps(_STOCK), _STOCK),
+    ("json fence", "```json\n" + json.dumps(_STOCK) + "\n```", _STOCK),
+    ("bare fence", "```\n" + json.dumps(_CALENDAR) + "\n```", _CALENDAR),
+    (
+        "prose around",
+        "Sure! Here is the widget: " + json.dumps(_STOCK) + " Let me know.",
+        _STOCK,
+    ),
+    (
+        "trailing commas",
+        '{"uri": "wip://stock-level-inspector", "parameters": [{"name": "sku", "value": "sku1234"},], "text": "",}',
+        _STOCK,
+    ),
+    (
+        "single quotes",
+        "{'uri': 'wip://stock-level-inspector', 'parameters': [{'name': 'sku', 'value': 'sku1234'}], 'text': ''}",
+        _STOCK,
+    ),
+    (
+        "python literals",
+        "{'uri': 'wip://stock-level-inspector', 'parameters': [{'name': 'sku', 'value': 'sku1234'}], 'text': None}",
+        _STOCK,
+    ),
+    (
+        "typographic quotes",
+        "{“uri”: “wip://stock-level-inspector”, “parameters”: [{“name”: “sku”, “value”: “sku1234”}], “text”: “”}",
+        _STOCK,
+    ),
+    (
+        "unquoted keys",
+        '{uri: "wip://stock-level-inspector", parameters: [{name: "sku", value: "sku1234"}], text: ""}',
+        _STOCK,
+    ),
+    (
+        "parameters as dict",
+        '{"uri": "wip://calendar", "parameters": {"date": "2025-10-20", "days": 3}, "text": null}',
+        _CALENDAR,
+    ),
+    (
+        "parameters as single-key dicts",
+        '{"uri": "wip://calendar", "parameters": [{"date": "2025-10-20"}, {"days": 3}]}',
+        _CALENDAR,
+    ),
+    (
+        "parameters as pairs",
+        '{"uri": "wip://calendar", "parameters": [["date", "2025-10-20"], ["days", 3]], "text": ""}',
+        _CALENDAR,
+    ),
+    (
+        "null parameters",
+        '{"uri": "", "parameters": null, "text": "Hello! How can I help you?"}',
+        _TEXT,
+    ),
+    (
+        "extra keys",
+        '{"uri": "", "parameters": [], "text": "Hello! How can I help you?", "reason": "x"}',
+        _TEXT,
+    ),
+    ("plain prose", "Hello! How can I help you?", _TEXT),
+    (
+        "truncated",
+        '{"uri": "wip://stock-level-inspector", "parameters": [{"name": "sku", "value": "sku1234"}',
+        _STOCK,
+    ),
+    (
+        "braces in strings",
+        '{"uri": "", "parameters": [], "text": "use {braces} and \\"quotes\\""}',
+        {"uri": "", "parameters": [], "text": 'use {braces} and "quotes"'},
+    ),
+    (
+        "apostrophe in text",
+        "{'uri': '', 'parameters': [], 'text': \"It's done\"}",
+        {"uri": "", "parameters": [], "text": "It's done"},
+    ),
+    (
+        "newline in string",
+        '{"uri": "", "parameters": [], "text": "line1\nline2"}',
+        {"uri": "", "parameters": [], "text": "line1\nline2"},
+    ),
+    ("dict answer", dict(_STOCK, parameters={"sku": "sku1234"}), _STOCK),
+    ("list answer", "[1, 2, 3]", {"uri": "", "parameters": [], "text": "[1, 2, 3]"}),
+    ("wrong types", '{"uri": 3, "parameters": [], "text": {"a": 1}}', None),
+    ("broken beyond repair", '{"uri": "x" "parameters" [[[ :: }', None),
+]
+
+
+def check_corpus() -> int:
+    """Checks every corpus entry, returns the number of failures."""
+    failures = 0
+    for name, answer, expected in CORPUS:
+        repaired = repair_response(answer)
+        if repaired != expected:
+            failures += 1
+            print(f"FAIL {name}: expected {expected}, got {repaired}")
+    print(f"corpus: {len(CORPUS) - failures}/{len(CORPUS)} repaired as expected")
+    return failures
+
+
+def _strict(answer: Any) -> Optional[Dict[str, Any]]:
+    """The strict path: json.loads and ValidResponse validation only."""
+    try:
+        return ValidResponse.model_validate_json(answer).model_dump()
+    except Exception:
+        return None
+
+
+def bench(iterations: int):
+    """Times the strict path and the repair pipeline over the corpus."""
+    answers = [answer for _, answer, _ in CORPUS if isinstance(answer, str)]
+    print(f"{'stage':<12}{'answers/s':>14}{'us/answer':>12}")
+    for stage, func in (("strict", _strict), ("repair", repair_response)):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for answer in answers:
+                func(answer)
+        elapsed = time.perf_counter() - start
+        n = iterations * len(answers)
+        print(f"{stage:<12}{n / elapsed:>14.0f}{elapsed / n * 1e6:>12.2f}")
+
+
+def main():
+    """Main function of the benchmark"""
+    parser = argparse.ArgumentParser(description="JSON repair corpus and benchmark")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    failures = check_corpus()
+    bench(args.iterations)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Chat turns sent in bursts to a rate-limited fake OpenAI-compatible server (429 beyond a max
+concurrency), with and without LLMLimiter.
+
+Run from the repository root:
+    python -m benchmarks.llm_limiter [--turns 200] [--sessions 200] [--server-concurrency 8]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from fastmcp.client.transports import FastMCPTransport
+from openai import AsyncOpenAI
+
+from core.mcp_client.client import MCPWIPClient
+from core.mcp_client.llm_limiter import LLMLimiter
+from .fake_openai_server import create_app, serve
+from .fakes import build_server
+
+
+async def run(url: str, limiter: LLMLimiter | None, turns: int, sessions: int):
+    """Sends all the turns at once, returning the number of failed turns and the elapsed time."""
+    client = MCPWIPClient(
+        # with the limiter, the 429 responses are handled by the limiter only
+        llm_client=AsyncOpenAI(
+            base_url=f"{url}/v1", api_key="none", max_retries=0 if limiter else 2
+        ),
+        mcp_server_transport=FastMCPTransport(build_server(10)),
+        log_lvl=logging.ERROR,
+        llm_limiter=limiter,
+    )
+    errors = 0
+
+    async def turn(i: int):
+        nonlocal errors
+        try:
+            await client.run_chat_turn(f"show widget {i}", f"session-{i % sessions}")
+        except Exception:  # pylint: disable=broad-exception-caught
+            errors += 1
+
+    await client.collect_widget_resources_text_full()
+    start = time.perf_counter()
+    await asyncio.gather(*(turn(i) for i in range(turns)))
+    elapsed = time.perf_counter() - start
+    await client.llm_client.close()
+    return errors, elapsed
+
+
+async def main():
+    """Main function of the benchmark"""
+    parser = argparse.ArgumentParser(description="LLM limiter benchmark")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--server-concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'setup':<12}{'failed':>8}{'429s':>8}{'seconds':>9}")
+    for name in ("no limiter", "limiter"):
+        app = create_app(
+            latency=0.05, max_concurrency=args.server_concurrency, retry_after=0.05
+        )
+        limiter = LLMLimiter(initial_limit=16, log_lvl=logging.ERROR)
+        async with serve(app) as (url, _):
+            errors, elapsed = await run(
+                url, limiter if name == "limiter" else None, args.turns, args.sessions
+            )
+        print(f"{name:<12}{errors:>8}{app.state.rate_limited:>8}{elapsed:>9.2f}")
+        if name == "limiter":
+            print(limiter.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Latency of LLM requests through LLMRouter, against local fake OpenAI-compatible servers with a
+latency tail and a failing endpoint.
+
+Run from the repository root:
+    python -m benchmarks.llm_router [--requests 300] [--concurrency 10]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import statistics
+import time
+
+from openai import AsyncOpenAI
+
+from core.mcp_client.llm_router import LLMEndpoint, LLMRouter
+from .fake_openai_server import create_app, serve
+
+MESSAGES = [{"role": "user", "content": "User: show wip://synthetic-widget-1"}]
+
+
+async def run(llm, requests: int, concurrency: int) -> tuple:
+    """Sends the requests, returning the latencies and the number of errors."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await llm.chat.completions.create(model="fake", messages=MESSAGES)
+            except Exception:  # pylint: disable=broad-exception-caught
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, errors
+
+
+def report(name: str, latencies: list, errors: int):
+    """Prints the latency percentiles of a run."""
+    q = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<24}{q[49] * 1e3:>8.0f}{q[94] * 1e3:>8.0f}{q[98] * 1e3:>8.0f}{errors:>8}"
+    )
+
+
+async def main():
+    """Main function of the benchmark"""
+    parser = argparse.ArgumentParser(description="LLM router benchmark")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    async with contextlib.AsyncExitStack() as stack:
+        tail = dict(latency=0.02, slow_latency=0.5, slow_fraction=0.05)
+        urls = [
+            (await stack.enter_async_context(serve(create_app(**tail))))[0],
+            (await stack.enter_async_context(serve(create_app(**tail))))[0],
+            (
+                await stack.enter_async_context(
+                    serve(create_app(error_rate=1.0, **tail))
+                )
+            )[0],
+        ]
+        print(f"{'setup':<24}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'errors':>8}")
+
+        single = AsyncOpenAI(base_url=f"{urls[0]}/v1", api_key="none", max_retries=0)
+        report("single endpoint", *await run(single, args.requests, args.concurrency))
+        await single.close()
+
+        for name, hedge, endpoints in (
+            ("router", False, urls[:2]),
+            ("router + hedging", True, urls[:2]),
+            ("router + failing", True, urls),
+        ):
+            router = LLMRouter(
+                [LLMEndpoint(f"{url}/v1") for url in endpoints],
+                hedge=hedge,
+                hedge_delay=0.1,
+                max_attempts=3,
+                log_lvl=logging.ERROR,
+            )
+            report(name, *await run(router, args.requests, args.concurrency))
+            await router.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
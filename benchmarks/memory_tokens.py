@@ -0,0 +1,56 @@
+"""
+Prompt tokens sent to the LLM over a multi-turn session, storing in memory the full
+widget catalog of each turn (previous behaviour) versus the compact uri reference.
+
+Run from the repository root:
+    python -m benchmarks.memory_tokens [--turns 20] [--widgets 10]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from fastmcp.client.transports import FastMCPTransport
+
+from core.mcp_client.client import MCPWIPClient
+from core.mcp_client.memory_handler import LastKMemory
+from .fakes import FakeLLM, build_server, estimate_tokens
+
+
+async def run_session(turns: int, n_widgets: int, store_widget_catalog: bool) -> list:
+    """Runs a session and returns the prompt tokens of each turn."""
+    llm = FakeLLM()
+    client = MCPWIPClient(
+        llm_client=llm,
+        mcp_server_transport=FastMCPTransport(build_server(n_widgets)),
+        memory=LastKMemory(k=4 * turns),
+        log_lvl=logging.WARNING,
+        store_widget_catalog=store_widget_catalog,
+    )
+    tokens = []
+    try:
+        for turn in range(turns):
+            await client.run_chat_turn(f"Show me the product number {turn}", "bench")
+            tokens.append(estimate_tokens(llm.requests[-1]["messages"]))
+    finally:
+        await client.close()
+    return tokens
+
+
+async def main(turns: int, n_widgets: int):
+    """Main function of the benchmark"""
+    full = await run_session(turns, n_widgets, store_widget_catalog=True)
+    compact = await run_session(turns, n_widgets, store_widget_catalog=False)
+    print(f"{'turn':>5}{'full catalog':>15}{'uri reference':>15}")
+    for turn, (f, c) in enumerate(zip(full, compact), start=1):
+        print(f"{turn:>5}{f:>15}{c:>15}")
+    saved = 1 - sum(compact) / sum(full)
+    print(f"total prompt tokens: {sum(full)} -> {sum(compact)} ({saved:.0%} saved)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Session prompt tokens benchmark")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--widgets", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.turns, args.widgets))
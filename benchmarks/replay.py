@@ -0,0 +1,113 @@
+"""
+Replay of a turn log recorded by TurnRecorder, reporting the client overhead per turn and the
+behaviour drift against the recording.
+
+The `record` command writes a synthetic log offline (fake LLM with tool calls, in-process server).
+
+Run from the repository root:
+    python -m benchmarks.replay record [--sessions 20] [--turns 3] [--output turns.jsonl]
+    python -m benchmarks.replay replay turns.jsonl [--output report.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+from fastmcp.client.transports import FastMCPTransport
+
+from core.mcp_client.client import MCPWIPClient
+from core.mcp_client.memory_handler import LastKMemory
+from core.mcp_client.turn_recorder import TurnRecorder
+from core.mcp_client.turn_replay import TurnReplayer
+from .fakes import FakeLLM, build_server
+
+MESSAGES = [
+    "How much stock is left for sku{n}?",
+    "Which meetings do I have on 2025-01-{day:02d}?",
+    "Show me the product number {n}",
+]
+
+
+async def record(path: str, sessions: int, turns: int, widgets: int):
+    """Records synthetic sessions, half of them streamed, with a context injection after the first turn."""
+    client = MCPWIPClient(
+        llm_client=FakeLLM(FakeLLM.call_tools_then_select, latency=0.02),
+        mcp_server_transport=FastMCPTransport(
+            build_server(widgets, tool_latency=0.005)
+        ),
+        # the default memory of MCPWIPClient is shared by the clients of the process
+        memory=LastKMemory(k=5),
+        log_lvl=logging.WARNING,
+        turn_recorder=TurnRecorder(path),
+    )
+
+    async def session(n: int):
+        session_id = f"session-{n}"
+        for i in range(turns):
+            message = MESSAGES[i % len(MESSAGES)].format(n=n, day=n % 28 + 1)
+            if n % 2:
+                async for _ in client.run_chat_turn_stream(message, session_id):
+                    pass
+            else:
+                await client.run_chat_turn(message, session_id)
+            if i == 0:
+                await client.inject_context(json.dumps({"size": "40"}), session_id)
+
+    try:
+        await asyncio.gather(*(session(n) for n in range(sessions)))
+    finally:
+        await client.close()
+        client.turn_recorder.close()
+    print(f"{client.turn_recorder.turns} turns recorded to {path}")
+
+
+async def replay(path: str, output: str | None):
+    """Replays a log and prints the report."""
+    report = await TurnReplayer(path).run()
+    print(f"{report['turns']} turns replayed in {report['elapsed_s']:.2f}s")
+    print(f"{'turn ms':<12}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name in ("recorded", "replayed"):
+        q = report[f"{name}_turn_ms"]
+        if q:
+            print(
+                f"{name:<12}{q['mean']:>10.2f}{q['p50']:>10.2f}{q['p95']:>10.2f}{q['p99']:>10.2f}"
+            )
+    print(f"\n{'stage mean ms':<18}{'recorded':>10}{'replayed':>10}")
+    recorded, replayed = report["recorded_stage_ms"], report["replayed_stage_ms"]
+    for stage in sorted(set(recorded) | set(replayed)):
+        print(
+            f"{stage:<18}{recorded.get(stage, float('nan')):>10.2f}"
+            f"{replayed.get(stage, float('nan')):>10.2f}"
+        )
+    print(f"\nerrors: {report['errors']}, drift: {report['drift'] or 'none'}")
+    for mismatch in report["mismatches"]:
+        print(
+            f"turn {mismatch['turn']}: {mismatch['recorded']!r} -> {mismatch['replayed']!r}"
+        )
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+def main():
+    """Main function of the benchmark"""
+    parser = argparse.ArgumentParser(description="Record and replay of chat turns")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record")
+    record_parser.add_argument("--sessions", type=int, default=20)
+    record_parser.add_argument("--turns", type=int, default=3)
+    record_parser.add_argument("--widgets", type=int, default=50)
+    record_parser.add_argument("--output", default="turns.jsonl")
+    replay_parser = commands.add_parser("replay")
+    replay_parser.add_argument("log")
+    replay_parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    if args.command == "record":
+        asyncio.run(record(args.output, args.sessions, args.turns, args.widgets))
+    else:
+        asyncio.run(replay(args.log, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+End-to-end load test of the FastAPI routes (api/routes.py) under concurrent sessions.
+
+The app under test runs in its own process (uvicorn), with an MCPWIPClient connected to a local
+MCP server over streamable HTTP (synthetic widgets and tools, see fakes.py) and to a local fake
+OpenAI-compatible LLM server answering with tool calls then a widget (see fake_openai_server.py).
+Each session runs a multi-turn script: start-session, manifest, chat with a stock tool call, a
+context injection, chat with a calendar tool call, a direct tool call and a chat without tools.
+Reports the throughput, p50/p95/p99 latency and error rate per endpoint and the peak RSS of the app.
+
+Run from the repository root:
+    python -m benchmarks.routes_load [--sessions 200] [--concurrency 50] [--llm-latency 0.05]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import multiprocessing
+import resource
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastmcp.client.transports import StreamableHttpTransport
+from openai import AsyncOpenAI
+
+from api.routes import lifespan, router, set_client
+from core.mcp_client.client import MCPWIPClient
+from .fake_openai_server import create_app, free_port, serve
+from .fakes import FakeLLM, build_server
+
+
+def _run_app(llm_url: str, mcp_url: str, port: int, pool_size: int):
+    """Runs the app under test (process target)."""
+    set_client(
+        MCPWIPClient(
+            llm_client=AsyncOpenAI(
+                base_url=f"{llm_url}/v1", api_key="none", max_retries=0
+            ),
+            mcp_server_transport=StreamableHttpTransport(mcp_url),
+            log_lvl=logging.WARNING,
+            pool_size=pool_size,
+        )
+    )
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router, prefix="/wip")
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+class _Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def add(self, endpoint: str, latency: float, status: str):
+        self.latencies.setdefault(endpoint, []).append(latency)
+        failed = status != "200"
+        self.errors[endpoint] = self.errors.get(endpoint, 0) + failed
+        if failed:
+            counts = self.statuses.setdefault(endpoint, {})
+            counts[status] = counts.get(status, 0) + 1
+
+
+async def _request(
+    http: httpx.AsyncClient,
+    stats: _Stats,
+    endpoint: str,
+    method: str,
+    path: str,
+    **kwargs,
+) -> Any:
+    """Sends a request, recording its latency and outcome under the endpoint name."""
+    start = time.perf_counter()
+    try:
+        response = await http.request(method, path, **kwargs)
+        status = str(response.status_code)
+    except httpx.HTTPError as exc:
+        response, status = None, type(exc).__name__
+    stats.add(endpoint, time.perf_counter() - start, status)
+    return response.json() if status == "200" else None
+
+
+async def run_session(
+    http: httpx.AsyncClient, stats: _Stats, n: int, think_time: float
+):
+    """Runs the multi-turn script of the n-th session."""
+    session = await _request(http, stats, "/start-session", "GET", "/wip/start-session")
+    if session is None:
+        return
+    session_id = session["session_id"]
+    sku = f"sku{1000 + n}"
+    steps: List[Tuple[str, str, str, Dict[str, Any]]] = [
+        ("/manifest", "GET", "/wip/manifest", {}),
+        (
+            "/chat",
+            "POST",
+            "/wip/chat",
+            {
+                "json": {
+                    "message": f"How much stock is left for {sku}?",
+                    "session_id": session_id,
+                }
+            },
+        ),
+        (
+            "/context-injection",
+            "POST",
+            "/wip/context-injection",
+            {
+                "json": {
+                    "content": json.dumps({"selected_size": "40", "sku": sku}),
+                    "session_id": session_id,
+                }
+            },
+        ),
+        (
+            "/chat",
+            "POST",
+            "/wip/chat",
+            {
+                "json": {
+                    "message": f"Which meetings do I have on 2025-01-{n % 28 + 1:02d}?",
+                    "session_id": session_id,
+                }
+            },
+        ),
+        (
+            "/call-tool",
+            "POST",
+            "/wip/call-tool/get_stock_for_sku",
+            {"json": {"sku": sku}},
+        ),
+        (
+            "/chat",
+            "POST",
+            "/wip/chat",
+            {
+                "json": {
+                    "message": f"Show me the product number {n}",
+                    "session_id": session_id,
+                }
+            },
+        ),
+    ]
+    for endpoint, method, path, kwargs in steps:
+        if think_time:
+            await asyncio.sleep(think_time)
+        await _request(http, stats, endpoint, method, path, **kwargs)
+
+
+def report(stats: _Stats, elapsed: float, sessions: int, peak_rss_kb: int):
+    """Prints the throughput, latency percentiles and errors per endpoint."""
+    print(
+        f"{'endpoint':<22}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+    )
+    total = errors = 0
+    for endpoint, latencies in stats.latencies.items():
+        q = (
+            statistics.quantiles(latencies, n=100)
+            if len(latencies) > 1
+            else latencies * 99
+        )
+        total += len(latencies)
+        errors += stats.errors[endpoint]
+        print(
+            f"{endpoint:<22}{len(latencies):>9}{len(latencies) / elapsed:>9.1f}"
+            f"{q[49] * 1e3:>9.1f}{q[94] * 1e3:>9.1f}{q[98] * 1e3:>9.1f}"
+            f"{stats.errors[endpoint] / len(latencies):>8.1%}"
+        )
+    print(
+        f"\n{sessions} sessions, {total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s, "
+        f"{sessions / elapsed:.1f} sessions/s, error rate {errors / max(total, 1):.1%}"
+    )
+    for endpoint, counts in stats.statuses.items():
+        print(f"errors of {endpoint}: {counts}")
+    print(f"peak RSS of the app: {peak_rss_kb / 1024:.1f} MiB")
+
+
+async def _wait_ready(http: httpx.AsyncClient, process: multiprocessing.Process):
+    while True:
+        if not process.is_alive():
+            raise RuntimeError("The app under test exited at startup")
+        with contextlib.suppress(httpx.HTTPError):
+            if (await http.get("/wip/start-session")).status_code == 200:
+                return
+        await asyncio.sleep(0.1)
+
+
+async def main():
+    """Main function of the benchmark"""
+    parser = argparse.ArgumentParser(description="Load test of the FastAPI routes")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--widgets", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--llm-slow-fraction", type=float, default=0.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--tool-latency", type=float, default=0.01)
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+
+    llm_app = create_app(
+        latency=args.llm_latency,
+        slow_fraction=args.llm_slow_fraction,
+        error_rate=args.llm_error_rate,
+        script=FakeLLM.call_tools_then_select,
+    )
+    mcp_app = build_server(args.widgets, tool_latency=args.tool_latency).http_app()
+    async with serve(llm_app) as (llm_url, _), serve(mcp_app) as (mcp_url, _):
+        port = free_port()
+        # the app under test runs in its own process, for its peak RSS and a realistic event loop
+        process = multiprocessing.get_context("spawn").Process(
+            target=_run_app, args=(llm_url, f"{mcp_url}/mcp", port, args.pool_size)
+        )
+        process.start()
+        try:
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}",
+                timeout=60,
+                limits=httpx.Limits(max_connections=args.concurrency),
+            ) as http:
+                await _wait_ready(http, process)
+                stats = _Stats()
+                semaphore = asyncio.Semaphore(args.concurrency)
+
+                async def session(n: int):
+                    async with semaphore:
+                        await run_session(http, stats, n, args.think_time)
+
+                start = time.perf_counter()
+                await asyncio.gather(*(session(n) for n in range(args.sessions)))
+                elapsed = time.perf_counter() - start
+        finally:
+            # the app closes its MCP sessions on shutdown, the MCP server must keep serving meanwhile
+            process.terminate()
+            await asyncio.to_thread(process.join)
+
+    # ru_maxrss is in KiB on Linux; the app process is the only child that has been waited
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    report(stats, elapsed, args.sessions, peak_rss_kb)
+    print(f"fake LLM requests: {llm_app.state.requests}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
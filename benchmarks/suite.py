@@ -0,0 +1,319 @@
+"""
+Offline microbenchmarks of the MCPWIPClient hot path, for catalogs of 10 to 10,000 synthetic widgets.
+
+Each stage is timed on an in-process MCPWIPServer (FastMCPTransport) with the fake LLM: latency
+percentiles, throughput and peak memory allocated per operation (tracemalloc). Results are saved
+as JSON, and compared with a previous run with --compare.
+
+Run from the repository root:
+    python -m benchmarks.suite [--widgets 10,100,1000,10000] [--output bench.json] [--compare old.json]
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import platform
+import subprocess
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from fastmcp.client.transports import FastMCPTransport
+
+from core.mcp_client.catalog import CatalogRenderer
+from core.mcp_client.client import MCPWIPClient
+from core.mcp_client.memory_handler import LastKMemory
+from core.mcp_client.models import ValidResponse
+from .fakes import FakeLLM, KeywordRAG, build_server
+
+_ANSWER = json.dumps(
+    {
+        "uri": "wip://synthetic-widget-1",
+        "parameters": [{"name": "sku", "value": "sku1234"}],
+        "text": "",
+    }
+)
+
+
+async def _call(fn: Callable[[], Any]) -> Any:
+    result = fn()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def measure(
+    fn: Callable[[], Any], min_time: float, max_iterations: int
+) -> Dict[str, float]:
+    """
+    Times fn (sync or async) for at least min_time seconds and 3 iterations, at most max_iterations,
+    then measures the peak memory allocated by one more call.
+    """
+    latencies: List[float] = []
+    start = time.perf_counter()
+    while len(latencies) < max_iterations and (
+        len(latencies) < 3 or time.perf_counter() - start < min_time
+    ):
+        t = time.perf_counter()
+        await _call(fn)
+        latencies.append(time.perf_counter() - t)
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await _call(fn)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "iterations": len(latencies),
+        "mean_ms": total / len(latencies) * 1e3,
+        "p50_ms": latencies[len(latencies) // 2] * 1e3,
+        "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1e3,
+        "min_ms": latencies[0] * 1e3,
+        "ops_per_s": len(latencies) / total if total else 0.0,
+        "alloc_peak_kb": peak / 1024,
+    }
+
+
+def _client(server, **kwargs) -> MCPWIPClient:
+    return MCPWIPClient(
+        llm_client=FakeLLM(lambda messages, tools: _ANSWER),
+        mcp_server_transport=FastMCPTransport(server),
+        log_lvl=logging.WARNING,
+        **kwargs,
+    )
+
+
+async def bench_widgets(
+    n_widgets: int, min_time: float, max_iterations: int, concurrency: int
+) -> List[Dict[str, Any]]:
+    """Runs the benchmarks of the stages that depend on the catalog size."""
+    results = []
+
+    def record(name: str, stats: Dict[str, float]):
+        results.append({"benchmark": name, "widgets": n_widgets, **stats})
+        print(
+            f"{name:<24}{n_widgets:>8}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}"
+            f"{stats['ops_per_s']:>12.1f}{stats['alloc_peak_kb']:>12.1f}"
+        )
+
+    start = time.perf_counter()
+    server = build_server(n_widgets)
+    record(
+        "server_build",
+        {
+            **await measure(lambda: build_server(n_widgets), 0, 1),
+            "first_build_ms": (time.perf_counter() - start) * 1e3,
+        },
+    )
+
+    client = _client(server)
+    try:
+        # cold fill of the widget cache: list_resources + one read per widget
+        async def fill_cache():
+            client.widget_cache.invalidate()
+            return await client.widget_cache.get_all(client.session_pool)
+
+        await client.start()
+        record("widget_cache_fill", await measure(fill_cache, min_time, 5))
+        widgets = await client.widget_cache.get_all(client.session_pool)
+        texts = [w.text for w in widgets]
+        manifests = [w.manifest for w in widgets]
+
+        record(
+            "catalog_render",
+            await measure(
+                lambda: CatalogRenderer().render(texts, manifests),
+                min_time,
+                max_iterations,
+            ),
+        )
+        record(
+            "catalog_render_budget",
+            await measure(
+                lambda: CatalogRenderer(token_budget=2000).render(texts, manifests),
+                min_time,
+                max_iterations,
+            ),
+        )
+        record(
+            "format_prompt",
+            await measure(
+                lambda: client.format_prompt("Show me the product number 1"),
+                min_time,
+                max_iterations,
+            ),
+        )
+        rag = KeywordRAG(documents=texts)
+        record(
+            "rag_search",
+            await measure(
+                lambda: rag.search("stock levels for topic 42", top_k=5),
+                min_time,
+                max_iterations,
+            ),
+        )
+        client.rag = rag
+        record(
+            "format_prompt_rag",
+            await measure(
+                lambda: client.format_prompt("stock levels for topic 42"),
+                min_time,
+                max_iterations,
+            ),
+        )
+        record(
+            "tool_call",
+            await measure(
+                lambda: client.call_mcp_tool("get_stock_for_sku", {"sku": "sku1234"}),
+                min_time,
+                max_iterations,
+            ),
+        )
+
+        turn = 0
+
+        async def chat_turn():
+            nonlocal turn
+            turn += 1
+            return await client.run_chat_turn(
+                f"stock levels for topic {turn}", f"session-{turn}"
+            )
+
+        record("chat_turn", await measure(chat_turn, min_time, max_iterations))
+
+        # throughput of concurrent sessions, each running a turn at a time
+        async def concurrent_turns():
+            nonlocal turn
+            turn += 1
+            await asyncio.gather(
+                *(
+                    client.run_chat_turn(
+                        f"stock levels for topic {i}", f"session-{turn}-{i}"
+                    )
+                    for i in range(concurrency)
+                )
+            )
+
+        stats = await measure(concurrent_turns, min_time, max_iterations)
+        stats["ops_per_s"] *= concurrency
+        record(f"chat_turn_x{concurrency}", stats)
+
+        # mean duration of the turn stages, from the client telemetry
+        for stage, summary in client.telemetry.summary().items():
+            results.append(
+                {
+                    "benchmark": f"stage:{stage}",
+                    "widgets": n_widgets,
+                    "iterations": summary["count"],
+                    "mean_ms": summary["mean"] * 1e3,
+                }
+            )
+    finally:
+        await client.close()
+    return results
+
+
+async def bench_fixed(min_time: float, max_iterations: int) -> List[Dict[str, Any]]:
+    """Runs the benchmarks that do not depend on the catalog size."""
+    results = []
+    memory = LastKMemory(k=10)
+    message = {"role": "user", "content": "Show me the product number 1"}
+
+    def memory_roundtrip():
+        memory.add_message("bench", dict(message))
+        return memory.get_context("bench")
+
+    for name, fn in (
+        ("memory_add_get", memory_roundtrip),
+        ("response_validation", lambda: ValidResponse.model_validate_json(_ANSWER)),
+    ):
+        stats = await measure(fn, min_time, max_iterations)
+        results.append({"benchmark": name, "widgets": 0, **stats})
+        print(
+            f"{name:<24}{0:>8}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}"
+            f"{stats['ops_per_s']:>12.1f}{stats['alloc_peak_kb']:>12.1f}"
+        )
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str):
+    """Prints the p50 (or mean) ratio of each benchmark against a previous run."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["benchmark"], r["widgets"]): r for r in json.load(f)["results"]}
+    print(f"\n{'benchmark':<24}{'widgets':>8}{'before':>10}{'after':>10}{'ratio':>8}")
+    for result in results:
+        before = baseline.get((result["benchmark"], result["widgets"]))
+        if before is None:
+            continue
+        key = "p50_ms" if "p50_ms" in result else "mean_ms"
+        if not before.get(key):
+            continue
+        print(
+            f"{result['benchmark']:<24}{result['widgets']:>8}{before[key]:>10.3f}"
+            f"{result[key]:>10.3f}{result[key] / before[key]:>8.2f}"
+        )
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main():
+    """Main function of the benchmark"""
+    parser = argparse.ArgumentParser(description="MCPWIPClient microbenchmark suite")
+    parser.add_argument("--widgets", default="10,100,1000,10000")
+    parser.add_argument("--min-time", type=float, default=0.5)
+    parser.add_argument("--max-iterations", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args()
+
+    print(
+        f"{'benchmark':<24}{'widgets':>8}{'p50 ms':>10}{'p95 ms':>10}{'ops/s':>12}{'alloc kB':>12}"
+    )
+    results = await bench_fixed(args.min_time, args.max_iterations)
+    for n_widgets in (int(n) for n in args.widgets.split(",")):
+        results.extend(
+            await bench_widgets(
+                n_widgets, args.min_time, args.max_iterations, args.concurrency
+            )
+        )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "min_time": args.min_time,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    output = args.output or f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults saved to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""
+Startup time and per-call overhead of the MCPWIPClient transports, for the example server
+(example/server.py, widgets of example/resources/widgets):
+
+- in-process: the MCPWIPServer instance is passed to the client (in-memory transport).
+- stdio: the server runs in a subprocess spawned by the client (python -m example.server).
+- http: the server is served by uvicorn in this process (streamable HTTP on localhost).
+
+The startup is the time from the client creation to the first widget catalog (sessions opened);
+the HTTP server itself is started once, beforehand. The per-call overhead is timed on list_tools,
+a tool call (get_stock_for_sku) and a widget read, with no tool cache.
+
+Run from the repository root:
+    python -m benchmarks.transports [--startups 5] [--min-time 0.5] [--output transports.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict
+
+from fastmcp.client.transports import StdioTransport, StreamableHttpTransport
+
+import example.server
+from core.mcp_client.client import MCPWIPClient
+from core.mcp_server.server import MCPWIPServer
+from .fake_openai_server import serve
+from .fakes import FakeLLM
+from .suite import measure
+
+WIDGETS_DIR = "example/resources/widgets"
+
+
+def _client(transport: Any) -> MCPWIPClient:
+    return MCPWIPClient(
+        llm_client=FakeLLM(FakeLLM.select_first_widget),
+        mcp_server_transport=transport,
+        log_lvl=logging.WARNING,
+    )
+
+
+async def bench_transport(
+    make_transport: Callable[[], Any],
+    startups: int,
+    min_time: float,
+    max_iterations: int,
+) -> Dict[str, Any]:
+    """Times the startups of new clients, then the calls of one of them."""
+    startup_ms = []
+    for _ in range(startups):
+        start = time.perf_counter()
+        client = _client(make_transport())
+        await client.collect_widget_resources_text_full()
+        startup_ms.append((time.perf_counter() - start) * 1e3)
+        await client.close()
+
+    results: Dict[str, Any] = {
+        "startup_ms": {
+            "mean": statistics.fmean(startup_ms),
+            "min": min(startup_ms),
+            "max": max(startup_ms),
+        }
+    }
+    client = _client(make_transport())
+    try:
+        await client.start()
+        async with client.session_pool.acquire() as mcp_client:
+            uri = (await mcp_client.list_resources())[0].uri
+
+        async def list_tools():
+            async with client.session_pool.acquire() as mcp_client:
+                await mcp_client.list_tools()
+
+        async def read_widget():
+            async with client.session_pool.acquire() as mcp_client:
+                await mcp_client.read_resource(uri)
+
+        calls = {
+            "list_tools": list_tools,
+            "tool_call": lambda: client.call_mcp_tool(
+                "get_stock_for_sku", {"sku": "sku1234"}
+            ),
+            "read_widget": read_widget,
+        }
+        for name, fn in calls.items():
+            results[name] = await measure(fn, min_time, max_iterations)
+    finally:
+        await client.close()
+    return results
+
+
+async def main():
+    """Main function of the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark of the MCP transports")
+    parser.add_argument("--startups", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.5)
+    parser.add_argument("--max-iterations", type=int, default=1000)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    wip_server = MCPWIPServer(
+        input_dir=WIDGETS_DIR, server=example.server.server, log_lvl=logging.WARNING
+    )
+    stdio_args = ["-m", "example.server", "--transport", "stdio"]
+    stdio_args += ["--input-dir", WIDGETS_DIR]
+    results: Dict[str, Any] = {}
+    async with serve(wip_server.server.http_app()) as (url, _):
+        transports = {
+            "in-process": lambda: wip_server,
+            "stdio": lambda: StdioTransport(sys.executable, stdio_args),
+            "http": lambda: StreamableHttpTransport(f"{url}/mcp"),
+        }
+        for name, make_transport in transports.items():
+            results[name] = await bench_transport(
+                make_transport, args.startups, args.min_time, args.max_iterations
+            )
+
+    print(
+        f"{'transport':<12}{'startup ms':>12}{'list_tools':>12}{'tool_call':>12}{'read_widget':>12}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<12}{result['startup_ms']['mean']:>12.1f}"
+            + "".join(
+                f"{result[call]['p50_ms']:>12.3f}"
+                for call in ("list_tools", "tool_call", "read_widget")
+            )
+        )
+    print("(startup: mean ms, calls: p50 ms)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+"""
+Rendering of the widget catalog included in the turn prompt, within a token budget.
+The budget is filled from the best-ranked widget down, first with the widget identities, then
+the best-ranked widgets are detailed with what is left; the renderings are memoized across turns.
+"""
+
+import functools
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# word pieces of at most 4 characters, or single symbols: close to the BPE token count
+_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+
+# detail levels of a rendered widget, from the full manifest to its bare identity
+FULL, NO_EXAMPLES, SHORT_DESCRIPTIONS, MINIFIED_SCHEMA, IDENTITY = range(5)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local estimate of the number of LLM tokens of a text, no tokenizer required.
+
+    Args:
+        text: The text to measure.
+
+    Returns:
+        int: the estimated number of tokens.
+    """
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+class RenderedCatalog(NamedTuple):
+    """Widget catalog of a turn: the rendered widgets, their uris and the tokens used."""
+
+    widgets: List[str]
+    uris: List[str]
+    tokens: int
+
+
+def _drop_keys(value: Any, keys: set) -> Any:
+    """Returns a copy of a JSON value without the given keys, at any depth."""
+    if isinstance(value, dict):
+        return {k: _drop_keys(v, keys) for k, v in value.items() if k not in keys}
+    if isinstance(value, list):
+        return [_drop_keys(v, keys) for v in value]
+    return value
+
+
+def _shorten(text: Any, max_chars: int) -> Any:
+    """Keeps the first sentence of a text, at most max_chars long."""
+    if not isinstance(text, str):
+        return text
+    text = " ".join(text.split())
+    sentence = text.split(". ")[0]
+    if len(sentence) > max_chars:
+        sentence = sentence[: max_chars - 3].rstrip() + "..."
+    return sentence
+
+
+def _minify_schema(schema: Any) -> Any:
+    """Keeps only property names, types and required fields of a JSON schema."""
+    if not isinstance(schema, dict):
+        return schema
+    minified = {}
+    for key in ("type", "required", "enum"):
+        if key in schema:
+            minified[key] = schema[key]
+    if "items" in schema:
+        minified["items"] = _minify_schema(schema["items"])
+    if isinstance(schema.get("properties"), dict):
+        minified["properties"] = {
+            name: _minify_schema(prop) for name, prop in schema["properties"].items()
+        }
+    return minified
+
+
+def render_widget(manifest: Dict[str, Any], level: int) -> str:
+    """
+    Renders a widget manifest at the given detail level.
+
+    Args:
+        manifest: The parsed widget manifest.
+        level: One of FULL, NO_EXAMPLES, SHORT_DESCRIPTIONS, MINIFIED_SCHEMA, IDENTITY.
+
+    Returns:
+        str: the compact JSON of the (reduced) manifest.
+    """
+    if level >= IDENTITY:
+        reduced = {
+            "uri": manifest.get("uri"),
+            "name": manifest.get("name"),
+            "description": _shorten(manifest.get("description"), 80),
+        }
+        return json.dumps(reduced, separators=(",", ":"), ensure_ascii=False)
+    # _drop_keys copies the manifest, the reductions below do not alter the original
+    reduced = _drop_keys(manifest, {"examples", "example", "default"})
+    if level >= SHORT_DESCRIPTIONS:
+        reduced["description"] = _shorten(reduced.get("description"), 160)
+        reduced["use_cases_hints"] = _shorten(reduced.get("use_cases_hints"), 120)
+        reduced.pop("version", None)
+        for prop in (
+            reduced.get("input_parameters_schema", {}).get("properties", {}).values()
+        ):
+            if isinstance(prop, dict) and "description" in prop:
+                prop["description"] = _shorten(prop["description"], 60)
+    if level >= MINIFIED_SCHEMA:
+        reduced["input_parameters_schema"] = _minify_schema(
+            reduced.get("input_parameters_schema", {})
+        )
+        reduced.pop("capabilities", None)
+    return json.dumps(reduced, separators=(",", ":"), ensure_ascii=False)
+
+
+# the widget texts are the same from turn to turn: each rendering and its estimate are computed
+# once, keyed on the widget JSON text (it changes with the manifest) and the detail level
+@functools.lru_cache(maxsize=16384)
+def _rendered_widget(text: str, level: int) -> Tuple[str, int]:
+    """Returns a widget JSON text rendered at the given detail level, and its estimated tokens."""
+    rendered = text if level == FULL else render_widget(json.loads(text), level)
+    return rendered, estimate_tokens(rendered)
+
+
+class CatalogRenderer:
+    """
+    Fits the ranked widgets of a turn into a token budget.
+
+    The budget is filled from the best-ranked widget down with the widget identities (uri, name
+    and short description); once the next identity does not fit, the budget is full and the
+    lower-ranked widgets are dropped without being rendered. The rest of the budget then details
+    the kept widgets from the best-ranked one down, each at the most detailed level that fits
+    (full, no examples, short descriptions, minified schema). Without a budget the catalog is
+    rendered as is.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None):
+        """
+        Args:
+            token_budget: Max number of (estimated) tokens of the catalog. None for no limit.
+        """
+        self.token_budget = token_budget
+
+    def render(
+        self, texts: List[str], manifests: List[Optional[Dict[str, Any]]]
+    ) -> RenderedCatalog:
+        """
+        Renders the catalog of a turn.
+
+        Args:
+            texts: The widget JSON texts, best ranked first.
+            manifests: The parsed manifests of texts (None if not parsable, such widgets are skipped).
+
+        Returns:
+            RenderedCatalog: the widgets to include in the prompt, their uris and their tokens.
+        """
+        entries = [
+            (text, manifest)
+            for text, manifest in zip(texts, manifests)
+            if isinstance(manifest, dict) and "uri" in manifest
+        ]
+        if self.token_budget is None:
+            rendered = [text for text, _ in entries]
+            total = sum(_rendered_widget(text, FULL)[1] for text in rendered)
+        else:
+            rendered, tokens, total = [], [], 0
+            for text, _ in entries:
+                widget, widget_tokens = _rendered_widget(text, IDENTITY)
+                if total + widget_tokens > self.token_budget:
+                    break
+                rendered.append(widget)
+                tokens.append(widget_tokens)
+                total += widget_tokens
+            entries = entries[: len(rendered)]
+            for i, (text, _) in enumerate(entries):
+                for level in range(FULL, IDENTITY):
+                    widget, widget_tokens = _rendered_widget(text, level)
+                    if total + widget_tokens - tokens[i] <= self.token_budget:
+                        total += widget_tokens - tokens[i]
+                        rendered[i], tokens[i] = widget, widget_tokens
+                        break
+
+        return RenderedCatalog(
+            widgets=rendered,
+            uris=[manifest["uri"] for _, manifest in entries],
+            tokens=total,
+        )
@@ -1,19 +1,45 @@
 """MCP-WIP client logic"""
 
-from typing import Dict, Any, List, Literal
+from typing import Dict, Any, AsyncIterator, List, Literal, Tuple
+import asyncio
+import contextlib
 import json
+import re
+import time
 import logging
 import functools
-from fastmcp import Client
+import mcp.types
+from fastmcp import Client, FastMCP
 from fastmcp.client.client import CallToolResult
-from fastmcp.client.transports import ClientTransport
+from fastmcp.client.messages import MessageHandler
+from fastmcp.client.transports import ClientTransport, FastMCPTransport
 from fastmcp.exceptions import ToolError
-from mcp.types import TextResourceContents
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, BadRequestError
+from openai.types.chat import ChatCompletionMessageFunctionToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
 from pydantic import ValidationError
+from core.mcp_server.server import MCPWIPServer
 from rag.base import BaseRAG
 from .memory_handler import Memory, LastKMemory
-from .models import ToolMessage, AssistantMessage, ValidResponse
+from .models import ToolMessage, AssistantMessage, WidgetUriMessage, ValidResponse
+from .json_repair import repair_response
+from .session_pool import MCPSessionPool
+from .federation import FederatedSessionPool, MCPFederation
+from .session_scheduler import SessionScheduler
+from .tool_cache import ToolCallCache
+from .llm_limiter import LLMLimiter
+from .llm_router import LLMRouter
+from .telemetry import Telemetry, TelemetryHook, prometheus_metric
+from .token_usage import TokenUsageTracker, usage_from_response
+from .turn_recorder import TurnRecorder
+from .response_cache import (
+    SemanticResponseCache,
+    bind_parameters,
+    rebind_parameters,
+)
+from .catalog import CatalogRenderer
+from .tool_results import ToolResultBudget, ToolResultStore, compact_result
+from .widget_cache import WidgetManifestCache
 
 # Example system prompt for the assistant
 SYSTEM_PROMPT = (
@@ -36,6 +62,46 @@ SYSTEM_PROMPT = (
 )
 
 
+def _strict_schema(schema: Any) -> Any:
+    """
+    Copy of a JSON schema meeting the strict structured outputs rules: objects forbid additional
+    properties and require all their properties, defaults are dropped and untyped array items are scalars.
+    """
+    if isinstance(schema, list):
+        return [_strict_schema(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    strict = {
+        key: _strict_schema(value) for key, value in schema.items() if key != "default"
+    }
+    if strict.get("type") == "object" and "properties" in strict:
+        strict["additionalProperties"] = False
+        strict["required"] = list(strict["properties"])
+    if strict.get("items") == {}:
+        strict["items"] = {"type": ["string", "number", "boolean", "null"]}
+    return strict
+
+
+# ValidResponse as strict JSON-schema response format, for providers supporting structured outputs
+_VALID_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "ValidResponse",
+        "schema": _strict_schema(ValidResponse.model_json_schema()),
+        "strict": True,
+    },
+}
+
+# Final answer of a turn interrupted by its deadline or by the max number of tool-calling rounds
+TURN_INTERRUPTED_TEXT = (
+    "Sorry, I could not complete your request in time. "
+    "Please try again, or ask for something more specific."
+)
+
+# Matches the widget uri in a (partial) JSON answer of the LLM
+_URI_PATTERN = re.compile(r'"uri"\s*:\s*"([^"]*)"')
+
+
 class ChatExecption(Exception):
     """
     Exception class for chat message errors in MCPWIPClient.
@@ -44,6 +110,29 @@ class ChatExecption(Exception):
     """
 
 
+class _WIPMessageHandler(MessageHandler):
+    """Handles the MCP server notifications that invalidate the MCPWIPClient caches."""
+
+    def __init__(self, wip_client: "MCPWIPClient"):
+        self.wip_client = wip_client
+
+    async def on_tool_list_changed(
+        self, message: mcp.types.ToolListChangedNotification
+    ) -> None:
+        self.wip_client.invalidate_tools_cache()
+
+    async def on_resource_list_changed(
+        self, message: mcp.types.ResourceListChangedNotification
+    ) -> None:
+        self.wip_client.widget_cache.invalidate()
+
+    async def on_resource_updated(
+        self, message: mcp.types.ResourceUpdatedNotification
+    ) -> None:
+        # sent for the widgets subscribed by the widget cache
+        self.wip_client.widget_cache.invalidate(str(message.params.uri))
+
+
 class MCPWIPClient:
     """
     Asynchronous client for interacting with an MCP-WIP server.
@@ -59,34 +148,310 @@ class MCPWIPClient:
     def __init__(
         self,
         llm_client: AsyncOpenAI,
-        mcp_server_transport: ClientTransport | Dict[str, Any],
+        mcp_server_transport: (
+            ClientTransport | Dict[str, Any] | MCPWIPServer | FastMCP | MCPFederation
+        ),
         system_prompt: str = SYSTEM_PROMPT,
         model: str = "openai/gpt-oss-20b",
         rag: BaseRAG = None,
         memory: Memory = LastKMemory(k=5),
         log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.DEBUG,
+        pool_size: int = 1,
+        health_check_interval: float = 30.0,
+        tools_cache_ttl: float | None = None,
+        widget_cache_ttl: float | None = None,
+        widget_fetch_concurrency: int = 16,
+        tool_concurrency: int = 4,
+        tool_timeout: float | None = None,
+        structured_output: bool = False,
+        store_widget_catalog: bool = False,
+        catalog_token_budget: int | None = None,
+        tool_result_budget: ToolResultBudget | None = None,
+        tool_result_budgets: Dict[str, ToolResultBudget] | None = None,
+        tool_result_store_size: int = 1000,
+        turn_timeout: float | None = None,
+        llm_timeout: float | None = None,
+        max_tool_iterations: int = 10,
+        tool_cache: ToolCallCache | None = None,
+        tool_rag: BaseRAG = None,
+        tool_top_k: int = 5,
+        pinned_tools: List[str] | None = None,
+        response_cache: SemanticResponseCache | None = None,
+        llm_limiter: LLMLimiter | None = None,
+        telemetry_hooks: List[TelemetryHook] | None = None,
+        token_usage: TokenUsageTracker | None = None,
+        turn_recorder: TurnRecorder | None = None,
     ):
         """
         Initialize the MCPWIPClient with an LLM client and MCP configuration.
 
         Args:
             llm_client: The language model client (OpenAI compatible, async).
-            mcp_server_transport: Either a transport object or connection config dict for the MCP server.
+            mcp_server_transport: Either a transport object or connection config dict for the MCP server, or an
+                MCPWIPServer/FastMCP instance served in-process through the in-memory transport (no subprocess
+                spawn, no pipes or sockets), when the server and the client are deployed together.
+                With an MCPFederation, the tools and widgets of several servers are merged (see federation.py).
             system_prompt: Default system prompt for new chat sessions.
             model: Model identifier for LLM completions (default: "openai/gpt-oss-20b").
             rag: Optional BaseRAG instance for RAG-based widget search. If None provided, all the widgets are exposed to the LLM each time.
             memory: Memory interface for contextual message/session management.
+            pool_size: Number of MCP sessions kept open and shared by concurrent requests.
+            health_check_interval: Idle seconds after which a pooled MCP session is pinged before reuse.
+            tools_cache_ttl: Seconds after which the cached tool list is fetched again. If None, it is refreshed
+                only when the server notifies a tool list change.
+            widget_cache_ttl: Seconds after which the cached widget manifests are fetched again. If None, they are
+                refreshed only when the server notifies a resource list change. A server supporting resource
+                subscriptions also notifies the update of a single widget, which is then read again.
+            widget_fetch_concurrency: Max number of concurrent resource reads while filling the widget cache.
+            tool_concurrency: Max number of tool calls of the same assistant message executed concurrently.
+            tool_timeout: Seconds after which a tool call is abandoned and reported as timed out to the LLM.
+            structured_output: If True, ValidResponse is sent as JSON-schema response format (structured outputs),
+                when supported by the provider, to avoid the fallback parse of invalid final answers.
+            store_widget_catalog: If True, the full prompt of each turn, widget manifests included, is stored in memory
+                and sent again in the following turns. By default only the user message and the offered uris are stored.
+            catalog_token_budget: Max number of (estimated) tokens of the widget catalog of each turn. Lower-ranked
+                widgets are shortened, then dropped, to fit it. If None, the widgets are sent in full.
+            tool_result_budget: Default size limits of the tool results sent to the LLM and stored in memory.
+                If None, the tool results are sent in full.
+            tool_result_budgets: Size limits by tool name, overriding tool_result_budget.
+            tool_result_store_size: Max number of full results of truncated tool calls kept for `get_tool_result`.
+            turn_timeout: Seconds after which a chat turn is interrupted and answered with TURN_INTERRUPTED_TEXT.
+                The LLM requests and tool calls in flight are cancelled. If None, turns have no deadline.
+            llm_timeout: Max seconds of each LLM request (the whole stream in streaming mode).
+            max_tool_iterations: Max number of tool-calling rounds of a turn. Once reached, the LLM is asked for
+                the final answer without tools.
+            tool_cache: Optional ToolCallCache memoizing the calls of the read-only tools. If None, every tool
+                call reaches the MCP server.
+            tool_rag: Optional BaseRAG instance indexing the tools (see `collect_tool_documents`). If provided, only the
+                top-k tools relevant to the user message, the pinned tools and the tools already used in the session
+                are sent to the LLM. If None, all the tools are sent each time.
+            tool_top_k: Number of tools retrieved by tool_rag.
+            pinned_tools: Names of the tools always sent to the LLM when tool_rag is used.
+            response_cache: Optional SemanticResponseCache reusing the answers of similar first turns of a session
+                (offered the same widgets), without calling the LLM.
+            llm_limiter: Optional LLMLimiter shared by all the turns, bounding the concurrency and rate of the
+                LLM requests and backing off on rate limits.
+            telemetry_hooks: Exporters of the timed spans of the turn stages (e.g. OpenTelemetryHook).
+            token_usage: TokenUsageTracker accounting the LLM tokens per turn, session and widget, with its
+                token budgets. If None, the tokens are accounted without budgets.
+            turn_recorder: Optional TurnRecorder writing the inputs, LLM responses, tool calls and timings of
+                every turn to a JSONL log, to replay them offline (see TurnReplayer).
         """
+        self.logger = logging.getLogger("MCPWIPClient")
+        self.logger.setLevel(log_lvl)
         self.llm_client = llm_client
         self.mcp_config = mcp_server_transport
-        self.mcp_client = Client(mcp_server_transport)
+        self.pool_size = pool_size
+        self.health_check_interval = health_check_interval
+        self.tools_cache_ttl = tools_cache_ttl
+        self._openai_tools: List[Dict[str, Any]] | None = None
+        self._openai_tools_expiry = 0.0
+        self._openai_tools_version = 0
+        self._openai_tools_lock = asyncio.Lock()
+        self._tool_annotations: Dict[str, mcp.types.ToolAnnotations | None] = {}
+        self.tool_cache = tool_cache
+        self.structured_output = structured_output
+        self.store_widget_catalog = store_widget_catalog
+        self._structured_output_supported: bool | None = None
+        # final answers validated, how many of them were repaired locally and how many needed the fallback parse
+        self.stats: Dict[str, int] = {
+            "final_answers": 0,
+            "local_repairs": 0,
+            "fallback_parses": 0,
+            # estimated tokens of the widget catalogs sent, over all the turns
+            "catalog_tokens": 0,
+            # turns ended by their deadline or by the max number of tool-calling rounds
+            "interrupted_turns": 0,
+        }
+        self.catalog_renderer = CatalogRenderer(token_budget=catalog_token_budget)
+        self.tool_result_budget = tool_result_budget
+        self.tool_result_budgets = tool_result_budgets or {}
+        self.tool_result_store = ToolResultStore(max_entries=tool_result_store_size)
+        self.tool_concurrency = tool_concurrency
+        self.tool_timeout = tool_timeout
+        self.turn_timeout = turn_timeout
+        self.llm_timeout = llm_timeout
+        self.max_tool_iterations = max_tool_iterations
+        self.widget_cache = WidgetManifestCache(
+            ttl=widget_cache_ttl,
+            max_concurrency=widget_fetch_concurrency,
+            log_lvl=log_lvl,
+        )
+        self.session_pool = self._build_session_pool(mcp_server_transport)
+        self.session_scheduler = SessionScheduler(
+            context_writer=self._write_contexts, log_lvl=log_lvl
+        )
         self.system_prompt = system_prompt
         self.rag: BaseRAG = rag
         self.top_k = 5
+        self.tool_rag: BaseRAG = tool_rag
+        self.tool_top_k = tool_top_k
+        self.pinned_tools = list(pinned_tools or [])
+        self.response_cache = response_cache
+        self.llm_limiter = llm_limiter
+        self.telemetry = Telemetry(hooks=telemetry_hooks)
+        self.token_usage = token_usage or TokenUsageTracker(log_lvl=log_lvl)
         self.model = model
         self.memory = memory
-        self.logger = logging.getLogger("MCPWIPClient")
-        self.logger.setLevel(log_lvl)
+        self.turn_recorder = turn_recorder
+        if turn_recorder is not None:
+            turn_recorder.header(model, system_prompt)
+
+    @property
+    def mcp_client(self) -> Client:
+        """The first fastmcp Client of the session pool."""
+        return self.session_pool.members[0].client
+
+    def _build_session_pool(
+        self,
+        mcp_server_transport: (
+            ClientTransport | Dict[str, Any] | MCPWIPServer | FastMCP | MCPFederation
+        ),
+    ) -> MCPSessionPool | FederatedSessionPool:
+        """Creates the pool of persistent MCP sessions for the given transport."""
+        if isinstance(mcp_server_transport, MCPFederation):
+            return mcp_server_transport.session_pool(
+                self._build_session_pool,
+                on_change=self._invalidate_catalogs,
+                log_lvl=self.logger.level,
+            )
+        if isinstance(mcp_server_transport, MCPWIPServer):
+            mcp_server_transport = mcp_server_transport.get_server()
+        if isinstance(mcp_server_transport, FastMCP):
+            # in-process server: each pooled session runs it in a task of the event loop
+            mcp_server_transport = FastMCPTransport(mcp_server_transport)
+        return MCPSessionPool(
+            mcp_server_transport,
+            size=self.pool_size,
+            health_check_interval=self.health_check_interval,
+            client_kwargs={"message_handler": _WIPMessageHandler(self)},
+            log_lvl=self.logger.level,
+        )
+
+    def _invalidate_catalogs(self):
+        """Drops the cached tool descriptors and widget manifests, they are listed again by the next turn."""
+        self.invalidate_tools_cache()
+        self.widget_cache.invalidate()
+
+    async def start(self):
+        """
+        Opens the pooled MCP sessions ahead of the first request.
+
+        Optional, the sessions are opened lazily otherwise. Meant for the startup of the application lifespan.
+        """
+        await self.session_pool.start()
+
+    async def close(self):
+        """
+        Closes the pooled MCP sessions (and the stdio server subprocesses, if any) and the turn log.
+
+        Meant for the shutdown of the application lifespan.
+        """
+        await self.session_pool.close()
+        if self.turn_recorder is not None:
+            self.turn_recorder.close()
+
+    def prometheus_metrics(self) -> str:
+        """
+        Render the metrics of the client in the Prometheus text exposition format: the durations and errors
+        of the turn stages, the client counters and, when configured, the caches, LLM limiter and LLM router.
+
+        Returns:
+            str: The metrics text.
+        """
+        prefix = self.telemetry.prefix
+        parts = [self.telemetry.render_prometheus()]
+        parts.extend(
+            prometheus_metric(
+                f"{prefix}_{name}_total",
+                "counter",
+                f"MCPWIPClient {name.replace('_', ' ')}.",
+                [({}, value)],
+            )
+            for name, value in self.stats.items()
+        )
+        usage = self.token_usage.total
+        parts.append(
+            prometheus_metric(
+                f"{prefix}_llm_tokens_total",
+                "counter",
+                "Tokens of the LLM requests by kind (cached tokens are part of the prompt tokens).",
+                [
+                    ({"kind": "prompt"}, usage.prompt_tokens),
+                    ({"kind": "completion"}, usage.completion_tokens),
+                    ({"kind": "cached"}, usage.cached_tokens),
+                ],
+            )
+        )
+        parts.append(
+            prometheus_metric(
+                f"{prefix}_active_sessions",
+                "gauge",
+                "Sessions with a chat turn running or queued.",
+                [({}, len(self.session_scheduler))],
+            )
+        )
+        for name, cache in (
+            ("tool_cache", self.tool_cache),
+            ("response_cache", self.response_cache),
+        ):
+            if cache is not None:
+                parts.append(
+                    prometheus_metric(
+                        f"{prefix}_{name}_lookups_total",
+                        "counter",
+                        f"Lookups of the {name.replace('_', ' ')} by result.",
+                        [({"result": k}, v) for k, v in cache.stats.items()],
+                    )
+                )
+        if self.llm_limiter is not None:
+            limiter = self.llm_limiter.stats()
+            for name, kind, description in (
+                ("limit", "gauge", "Current concurrency limit of the LLM requests."),
+                ("in_flight", "gauge", "LLM requests in flight."),
+                ("queue_depth", "gauge", "LLM requests waiting for admission."),
+                ("requests", "counter", "LLM requests admitted."),
+                ("rate_limited", "counter", "LLM requests answered with a 429."),
+            ):
+                parts.append(
+                    prometheus_metric(
+                        f"{prefix}_llm_limiter_{name}"
+                        + ("_total" if kind == "counter" else ""),
+                        kind,
+                        description,
+                        [({}, limiter[name])],
+                    )
+                )
+            parts.append(
+                prometheus_metric(
+                    f"{prefix}_llm_limiter_wait_seconds",
+                    "gauge",
+                    "Recent wait times for admission, by quantile.",
+                    [
+                        ({"quantile": q}, limiter[key])
+                        for q, key in (("0.5", "wait_p50"), ("0.95", "wait_p95"))
+                        if limiter[key] is not None
+                    ],
+                )
+            )
+        if isinstance(self.llm_client, LLMRouter):
+            endpoints = self.llm_client.stats()
+            for name, kind, description in (
+                ("outstanding", "gauge", "LLM requests in flight per endpoint."),
+                ("requests", "counter", "LLM requests sent per endpoint."),
+                ("failures", "counter", "Failed LLM requests per endpoint."),
+                ("ejected", "gauge", "1 if the endpoint is ejected."),
+            ):
+                parts.append(
+                    prometheus_metric(
+                        f"{prefix}_llm_endpoint_{name}"
+                        + ("_total" if kind == "counter" else ""),
+                        kind,
+                        description,
+                        [({"endpoint": e["name"]}, e[name]) for e in endpoints],
+                    )
+                )
+        return "".join(parts)
 
     def set_llm_client(self, llm_client: AsyncOpenAI):
         """
@@ -97,15 +462,29 @@ class MCPWIPClient:
         """
         self.llm_client = llm_client
 
-    def set_mcp_config(self, mcp_config: dict):
+    def set_mcp_config(
+        self,
+        mcp_config: (
+            ClientTransport | Dict[str, Any] | MCPWIPServer | FastMCP | MCPFederation
+        ),
+    ):
         """
-        Set or update the MCP server transport configuration and instantiate a Client.
+        Set or update the MCP server transport configuration and rebuild the session pool.
+
+        The sessions of the previous pool are closed in background, if an event loop is running.
 
         Args:
-            mcp_config: New configuration dict for the MCP server.
+            mcp_config: New transport, configuration dict or in-process server instance for the MCP server.
         """
+        old_pool = self.session_pool
         self.mcp_config = mcp_config
-        self.mcp_client = Client(mcp_config)
+        self.session_pool = self._build_session_pool(mcp_config)
+        self._invalidate_catalogs()
+        if old_pool.started:
+            try:
+                asyncio.get_running_loop().create_task(old_pool.close())
+            except RuntimeError:
+                self.logger.warning("No running loop, previous MCP sessions not closed")
 
     def set_rag(self, rag: BaseRAG, top_k: int):
         """
@@ -118,18 +497,29 @@ class MCPWIPClient:
         self.rag = rag
         self.top_k = top_k
 
+    def set_tool_rag(self, tool_rag: BaseRAG, top_k: int):
+        """
+        Set or update the tool RAG instance and the top-k parameter.
+
+        Args:
+            tool_rag: New BaseRAG instance to use for tool retrieval, None to send all the tools.
+            top_k: Maximum number of tools to retrieve.
+        """
+        self.tool_rag = tool_rag
+        self.tool_top_k = top_k
+
     @staticmethod
     def run_with_self_client(func):
         """
-        Decorator to ensure that the wrapped async method is called within an `async with self.mcp_client` context.
+        Decorator to ensure that the pooled MCP sessions are open before the wrapped async method runs.
 
-        Ensures MCP client connection lifecycle is handled for each decorated call.
+        The sessions are opened once and shared, each MCP operation checks one out of the pool.
         """
 
         @functools.wraps(func)
         async def wrapper(self, *args, **kwargs):
-            async with self.mcp_client:
-                return await func(self, *args, **kwargs)
+            await self.session_pool.start()
+            return await func(self, *args, **kwargs)
 
         return wrapper
 
@@ -139,6 +529,9 @@ class MCPWIPClient:
         """
         Call a server-side MCP tool asynchronously by name and arguments.
 
+        With a tool cache, the results of the read-only tools are reused and identical concurrent
+        calls share a single request.
+
         Args:
             tool_name: String name of the tool to call.
             arguments: Dict of arguments for the tool.
@@ -149,23 +542,181 @@ class MCPWIPClient:
         Raises:
             ToolError: If the tool call fails for any reason.
         """
+        with self.telemetry.span("tool_call", labels={"tool": tool_name}):
+            if self.tool_cache is None:
+                return await self._call_mcp_tool(tool_name, arguments)
+            # the annotations of the tools tell which calls can be served from the cache
+            await self._list_openai_tools()
+            return await self.tool_cache.call(
+                tool_name,
+                arguments,
+                self._tool_annotations.get(tool_name),
+                functools.partial(self._call_mcp_tool, tool_name, arguments),
+            )
+
+    async def _call_mcp_tool(
+        self, tool_name: str, arguments: Dict[str, Any]
+    ) -> CallToolResult:
+        """Call a server-side MCP tool, bypassing the tool cache."""
         try:
-            async with self.mcp_client:
-                return await self.mcp_client.call_tool(tool_name, arguments)
+            async with self.session_pool.acquire() as mcp_client:
+                return await mcp_client.call_tool(tool_name, arguments)
         except ToolError as exc:
             self.logger.error("Tool call error %s", exc)
             raise ToolError from exc
 
-    async def _list_openai_tools(self) -> List[Dict[str, Any]]:
+    def invalidate_tools_cache(self):
+        """
+        Drop the cached OpenAI tool descriptors, the next turn lists the MCP tools again.
+
+        Called automatically when the server sends a `notifications/tools/list_changed`.
+        """
+        self._openai_tools = None
+        self._openai_tools_version += 1
+        # the tools may have changed behaviour as well
+        if self.tool_cache is not None:
+            self.tool_cache.invalidate()
+
+    @staticmethod
+    def _deadline(timeout: float | None, deadline: float | None = None) -> float | None:
+        """Earliest between the monotonic time in timeout seconds and deadline (None means no limit)."""
+        if timeout is not None:
+            timeout_deadline = time.monotonic() + timeout
+            deadline = (
+                timeout_deadline
+                if deadline is None
+                else min(deadline, timeout_deadline)
+            )
+        return deadline
+
+    @staticmethod
+    def _time_left(deadline: float | None) -> float | None:
+        """Seconds left before deadline, None if there is no deadline."""
+        if deadline is None:
+            return None
+        return max(deadline - time.monotonic(), 0.0)
+
+    async def _execute_tool_call(
+        self,
+        tool_call: Any,
+        semaphore: asyncio.Semaphore,
+        deadline: float | None = None,
+        session_id: str = "",
+    ) -> Tuple[str, Dict[str, Any], Any]:
+        """
+        Execute a single OpenAI tool call on the MCP server.
+
+        A call that exceeds `tool_timeout`, or the turn deadline, is answered with an error payload,
+        so that the LLM still gets a result for its tool_call_id.
+
+        Args:
+            tool_call: The OpenAI tool call.
+            semaphore: Semaphore bounding the concurrent calls of the same assistant message.
+            deadline: Monotonic deadline of the turn, if any.
+            session_id: ID of the conversation session, for the turn_recorder.
+
+        Returns:
+            Tuple[str, Dict[str, Any], Any]: tool name, arguments and structured result.
+        """
+        func_name = tool_call.function.name
+        try:
+            func_args = json.loads(tool_call.function.arguments or "{}")
+        except json.JSONDecodeError:
+            func_args = {}
+
+        async with semaphore:
+            timeout = self._time_left(self._deadline(self.tool_timeout, deadline))
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(
+                    self.call_mcp_tool(func_name, func_args), timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                self.logger.error("Tool call %s timed out", func_name)
+                result = {"error": f"Tool call timed out after {timeout:.1f}s"}
+            except ToolError as exc:
+                if self.turn_recorder is not None:
+                    self.turn_recorder.tool(
+                        session_id,
+                        func_name,
+                        func_args,
+                        None,
+                        time.perf_counter() - start,
+                        error=str(exc.__cause__ or exc),
+                    )
+                raise
+
+        structured = (
+            result.structured_content if isinstance(result, CallToolResult) else result
+        )
+        if self.turn_recorder is not None:
+            self.turn_recorder.tool(
+                session_id,
+                func_name,
+                func_args,
+                structured,
+                time.perf_counter() - start,
+            )
+        return func_name, func_args, structured
+
+    async def _execute_tool_calls(
+        self,
+        tool_calls: List[Any],
+        deadline: float | None = None,
+        session_id: str = "",
+    ) -> List[Tuple[str, Dict[str, Any], Any]]:
+        """
+        Execute the tool calls of one assistant message concurrently, at most `tool_concurrency` at a time.
+
+        Args:
+            tool_calls: The OpenAI tool calls of the assistant message.
+            deadline: Monotonic deadline of the turn, if any.
+            session_id: ID of the conversation session, for the turn_recorder.
+
+        Returns:
+            List[Tuple[str, Dict[str, Any], Any]]: (tool name, arguments, structured result) for each call,
+                in the same order of tool_calls.
+
+        Raises:
+            ToolError: If a tool call fails, after all the calls of the message have completed.
+        """
+        semaphore = asyncio.Semaphore(self.tool_concurrency)
+        outputs = await asyncio.gather(
+            *(
+                self._execute_tool_call(tc, semaphore, deadline, session_id)
+                for tc in tool_calls
+            ),
+            return_exceptions=True,
+        )
+        for output in outputs:
+            if isinstance(output, BaseException):
+                raise output
+        return outputs
+
+    async def _list_openai_tools(self, refresh: bool = False) -> List[Dict[str, Any]]:
         """
         List all available MCP tools as OpenAI-compatible function descriptors.
 
+        The descriptors are built once and shared by all turns and sessions, until the server
+        notifies a tool list change or the `tools_cache_ttl` expires. The returned list must not be mutated.
+
+        Args:
+            refresh: If True, ignore the cached descriptors and list the tools from the server.
+
         Returns:
             List[Dict[str, Any]]: List of tool schemas suitable for OpenAI API `tools` parameter.
         """
-        async with self.mcp_client:
-            tools = await self.mcp_client.list_tools()
-            return [
+        if not refresh and self._tools_cache_valid():
+            return self._openai_tools
+        async with self._openai_tools_lock:
+            # another turn may have filled the cache while waiting for the lock
+            if not refresh and self._tools_cache_valid():
+                return self._openai_tools
+            version = self._openai_tools_version
+            async with self.session_pool.acquire() as mcp_client:
+                tools = await mcp_client.list_tools()
+            self._tool_annotations = {t.name: t.annotations for t in tools}
+            openai_tools = [
                 {
                     "type": "function",
                     "function": {
@@ -176,53 +727,109 @@ class MCPWIPClient:
                 }
                 for t in tools
             ]
+            # do not store a list that has been invalidated while fetching it
+            if version == self._openai_tools_version:
+                self._openai_tools = openai_tools
+                if self.tools_cache_ttl is not None:
+                    self._openai_tools_expiry = time.monotonic() + self.tools_cache_ttl
+            return openai_tools
+
+    def _tools_cache_valid(self) -> bool:
+        """True if the cached tool descriptors can be used."""
+        if self._openai_tools is None:
+            return False
+        return (
+            self.tools_cache_ttl is None or time.monotonic() < self._openai_tools_expiry
+        )
+
+    async def collect_tool_documents(self) -> List[str]:
+        """
+        Collect the documents to index in the tool RAG: one JSON text with name and description per MCP tool.
+
+        Returns:
+            List[str]: List of tool JSON texts.
+        """
+        openai_tools = await self._list_openai_tools()
+        return [
+            json.dumps(
+                {
+                    "name": t["function"]["name"],
+                    "description": t["function"]["description"],
+                }
+            )
+            for t in openai_tools
+        ]
+
+    async def _search_tools(self, user_message: str) -> List[str]:
+        """Names of the tools relevant to the user message, according to the tool RAG."""
+        results = await asyncio.to_thread(
+            self.tool_rag.search, user_message, top_k=self.tool_top_k
+        )
+        names = []
+        for result in results:
+            # plain JSON texts, or dicts holding them as document (e.g. FaissRAG)
+            if isinstance(result, dict) and "document" in result:
+                result = result["document"]
+            if isinstance(result, str):
+                try:
+                    result = json.loads(result)
+                except json.JSONDecodeError:
+                    continue
+            if isinstance(result, dict) and result.get("name"):
+                names.append(result["name"])
+        return names
+
+    def _select_tools(
+        self,
+        openai_tools: List[Dict[str, Any]],
+        relevant: List[str],
+        messages: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Restrict the tools sent to the LLM to the relevant ones, the pinned ones and the ones
+        already called in the session history, so that multi-step chains keep their tools.
+        """
+        selected = set(relevant) | set(self.pinned_tools)
+        for m in messages:
+            for tc in m.get("tool_calls") or []:
+                selected.add(tc["function"]["name"])
+        return [t for t in openai_tools if t["function"]["name"] in selected]
 
     async def collect_widget_resources_text_full(self) -> List[str]:
         """
         Collect the full text content of all widget resources with URI scheme "wip".
 
+        Served from the widget manifest cache; the server is queried only when the cache is empty or stale.
+
         Returns:
             List[str]: List of widget resource JSON texts.
         """
-        resources_text: List[str] = []
-        async with self.mcp_client:
-            res = await self.mcp_client.list_resources()
-            for r in res:
-                if r.uri.scheme == "wip":
-                    rr: TextResourceContents = await self.mcp_client.read_resource(
-                        r.uri
-                    )
-                    try:
-                        resources_text.append(rr[0].text)
-                    except Exception:
-                        continue
-        return resources_text
+        widgets = await self.widget_cache.get_all(self.session_pool)
+        return [w.text for w in widgets]
 
     async def collect_widget_resources_text(self, uris: List[str]) -> List[str]:
         """
         Given a list of resource URIs, fetch and return the widget texts.
 
+        Cached widgets are served locally, the others are read concurrently from the server.
+
         Args:
             uris: List of URIs pointing to widget resources.
 
         Returns:
             List[str]: List of resource JSON texts in order of input URIs.
         """
-        async with self.mcp_client:
-            resources_text: List[str] = []
-            for uri in uris:
-                rr: TextResourceContents = await self.mcp_client.read_resource(uri)
-                try:
-                    resources_text.append(rr[0].text)
-                except Exception:
-                    continue
-            return resources_text
+        widgets = await self.widget_cache.get_many(self.session_pool, uris)
+        return [w.text for w in widgets]
 
-    async def format_prompt(self, user_message: str):
+    async def format_prompt(
+        self, user_message: str, catalog_token_budget: int | None = None
+    ):
         """
         Prepares a prompt for the LLM chat turn, including best-matching widgets.
 
         Uses the RAG module (if available) to select top-k widget JSONs; else, returns all from the widget store.
+        With a catalog token budget, the lower-ranked widgets are shortened or dropped to fit it.
         Formats as:
             User:
             <user_message>
@@ -233,19 +840,39 @@ class MCPWIPClient:
 
         Args:
             user_message: The most recent user input/message string.
+            catalog_token_budget: Token budget of the catalog for this prompt only, if lower than the client one.
 
         Returns:
             formatted_input: String containing the prompt for the LLM.
             uris: List of widget resource URIs included in this prompt.
         """
         if self.rag:
-            best_widgets = self.rag.search(user_message, top_k=self.top_k)
+            # the search is blocking (embedding, index lookup), it runs in a worker thread
+            best_widgets = await asyncio.to_thread(
+                self.rag.search, user_message, top_k=self.top_k
+            )
+            manifests = [json.loads(widget) for widget in best_widgets]
         else:
-            best_widgets = await self.collect_widget_resources_text_full()
-        uris = []
-        for widget in best_widgets:
-            w_dict = json.loads(widget)
-            uris.append(w_dict["uri"])
+            # the parsed manifests are cached, no need to decode them on every turn
+            widgets = await self.widget_cache.get_all(self.session_pool)
+            best_widgets = [w.text for w in widgets]
+            manifests = [w.manifest for w in widgets]
+
+        if self.turn_recorder is not None:
+            self.turn_recorder.widgets(manifests, best_widgets)
+
+        renderer = self.catalog_renderer
+        if catalog_token_budget is not None and (
+            renderer.token_budget is None
+            or catalog_token_budget < renderer.token_budget
+        ):
+            renderer = CatalogRenderer(token_budget=catalog_token_budget)
+        catalog = renderer.render(best_widgets, manifests)
+        best_widgets, uris = catalog.widgets, catalog.uris
+        self.stats["catalog_tokens"] += catalog.tokens
+        self.logger.debug(
+            "Widget catalog: %d widgets, %d estimated tokens", len(uris), catalog.tokens
+        )
 
         formatted_input = (
             "User:\n"
@@ -257,6 +884,565 @@ class MCPWIPClient:
         )
         return formatted_input, uris
 
+    @staticmethod
+    def format_memory_prompt(user_message: str, uris: List[str]) -> str:
+        """
+        Compact version of the turn prompt stored in memory: the user message and the uris of the
+        widgets offered in the turn, without their manifests.
+
+        Args:
+            user_message: The user input/message string of the turn.
+            uris: List of widget resource URIs offered in the turn.
+
+        Returns:
+            str: the prompt to store in the session memory.
+        """
+        return (
+            "User:\n"
+            + user_message.strip()
+            + "\n"
+            + "Available-widgets:\n"
+            + ", ".join(uris)
+            + "\n"
+        )
+
+    async def _start_turn(
+        self,
+        user_message: str,
+        session_id: str,
+        shrink: bool = False,
+        stream: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], List[str], List[Dict[str, Any]]]:
+        """
+        Prepare the LLM input of a chat turn and store the user message in memory.
+
+        The independent setup stages run concurrently: widget retrieval (RAG search or catalog), tool
+        listing and session history loading (in a worker thread if the memory is a blocking store).
+        Each stage runs in a telemetry span, their durations are also logged at debug level.
+
+        Args:
+            user_message: User-provided message string for this turn.
+            session_id: Unique identifier for the chat session.
+            shrink: If True, the turn is over its token budget: the history and the widget catalog are
+                reduced as configured in token_usage.
+            stream: True for a streaming turn, as recorded by the turn_recorder.
+
+        Returns:
+            messages: The messages to send to the LLM, session history included.
+            uris: List of widget resource URIs offered to the LLM in this turn.
+            openai_tools: The MCP tools as OpenAI function descriptors.
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        coros = {
+            "retrieval": self.format_prompt(
+                user_message,
+                self.token_usage.shrink_catalog_tokens if shrink else None,
+            ),
+            "tool_listing": self._list_openai_tools(),
+            "memory_load": self._load_memory(session_id),
+        }
+        if self.tool_rag is not None:
+            coros["tool_retrieval"] = self._search_tools(user_message)
+        stages = {
+            name: asyncio.ensure_future(self._timed(timings, name, coro))
+            for name, coro in coros.items()
+        }
+        try:
+            results = dict(zip(stages, await asyncio.gather(*stages.values())))
+        finally:
+            # a failed stage stops the others
+            for stage in stages.values():
+                stage.cancel()
+        formatted_input, uris = results["retrieval"]
+        openai_tools = results["tool_listing"]
+        messages = results["memory_load"]
+        if shrink:
+            messages = self._shrink_history(
+                messages, self.token_usage.shrink_history_turns
+            )
+        if self.tool_rag is not None:
+            all_tools = len(openai_tools)
+            openai_tools = self._select_tools(
+                openai_tools, results["tool_retrieval"], messages
+            )
+            self.logger.debug("Tools sent: %d of %d", len(openai_tools), all_tools)
+        setup_ms = (time.perf_counter() - start) * 1000
+        self.logger.debug(
+            "Turn setup %.1f ms (%s)",
+            setup_ms,
+            ", ".join(f"{name} {ms:.1f} ms" for name, ms in timings.items()),
+        )
+
+        # the widget catalog is sent in this turn only, memory keeps a reference to the offered uris
+        messages.append({"role": "user", "content": formatted_input})
+        if not self.store_widget_catalog:
+            formatted_input = self.format_memory_prompt(user_message, uris)
+        self.memory.add_message(
+            session_id, {"role": "user", "content": formatted_input}
+        )
+        if self.turn_recorder is not None:
+            self.turn_recorder.tools(results["tool_listing"])
+            self.turn_recorder.begin_turn(
+                session_id, user_message, uris, timings, setup_ms, stream
+            )
+        return messages, uris, openai_tools
+
+    async def _timed(
+        self, timings: Dict[str, float], stage: str, awaitable: Any
+    ) -> Any:
+        """Await a turn stage in a telemetry span, recording its duration in milliseconds."""
+        start = time.perf_counter()
+        try:
+            with self.telemetry.span(stage):
+                return await awaitable
+        finally:
+            timings[stage] = (time.perf_counter() - start) * 1000
+
+    @staticmethod
+    def _shrink_history(
+        messages: List[Dict[str, Any]], turns: int
+    ) -> List[Dict[str, Any]]:
+        """Keep the system messages and the last turns of the history, each turn starting at a user message."""
+        starts = [i for i, m in enumerate(messages) if m.get("role") == "user"]
+        if turns <= 0:
+            start = len(messages)
+        elif turns > len(starts):
+            start = 0
+        else:
+            start = starts[-turns]
+        system = [m for m in messages[:start] if m.get("role") == "system"]
+        return system + messages[start:]
+
+    async def _load_memory(self, session_id: str) -> List[Dict[str, Any]]:
+        """Load the session history, in a worker thread only if the memory is a blocking store."""
+        if self.memory.blocking:
+            return await asyncio.to_thread(self._load_context, session_id)
+        return self._load_context(session_id)
+
+    def _load_context(self, session_id: str) -> List[Dict[str, Any]]:
+        """Load the session history, inserting the system prompt if missing."""
+        messages = self.memory.get_context(session_id)
+        if not any(m.get("role") == "system" for m in messages):
+            self.memory.reinsert_system(
+                session_id, {"role": "system", "content": self.system_prompt}
+            )
+            messages = self.memory.get_context(session_id)
+        return messages
+
+    def _add_tool_calls_message(
+        self,
+        messages: List[Dict[str, Any]],
+        content: str | None,
+        tool_calls: List[Any],
+    ) -> Dict[str, Any]:
+        """
+        Append the assistant message requesting the tool calls to messages.
+
+        It is stored in memory by `_add_tool_results`, together with the results: a turn cancelled while
+        its tools run does not leave unanswered tool calls in the session history.
+
+        Returns:
+            Dict[str, Any]: the assistant message.
+        """
+        msg = {
+            "role": "assistant",
+            "content": content,
+            "tool_calls": [
+                {
+                    "id": tc.id,
+                    "type": "function",
+                    "function": {
+                        "name": tc.function.name,
+                        "arguments": tc.function.arguments,
+                    },
+                }
+                for tc in tool_calls
+            ],
+        }
+        messages.append(msg)
+        return msg
+
+    def get_tool_result(self, handle: str) -> Any:
+        """
+        Returns the full result of a tool call that was truncated for the LLM.
+
+        Args:
+            handle: The result_handle of the ToolMessage (also given to the LLM in the truncated result).
+
+        Returns:
+            Any: the full structured result, None if the handle is unknown or was evicted.
+        """
+        return self.tool_result_store.get(handle)
+
+    def _process_tool_output(
+        self, tool_output: Tuple[str, Dict[str, Any], Any]
+    ) -> Tuple[ToolMessage, str]:
+        """
+        Build the ToolMessage for the UI and the content for the LLM of a tool call output.
+
+        When the result exceeds the budget of the tool, the full result goes to the side store and
+        the LLM gets its compact version, with the handle and the omitted parts.
+
+        Args:
+            tool_output: (tool name, arguments, structured result) of the tool call.
+
+        Returns:
+            Tuple[ToolMessage, str]: the tool message with the full result, the tool message content for the LLM.
+        """
+        func_name, func_args, structured = tool_output
+        result = json.dumps(structured)
+        content, handle = result, None
+        budget = self.tool_result_budgets.get(func_name, self.tool_result_budget)
+        if budget is not None:
+            compact, omitted = compact_result(structured, budget)
+            if omitted:
+                handle = self.tool_result_store.put(structured)
+                content = json.dumps(
+                    {
+                        "result": compact,
+                        "truncated": omitted,
+                        "result_handle": handle,
+                        "note": "The result was reduced to fit the context, the full result is shown to the user.",
+                    }
+                )
+                self.logger.debug(
+                    "Tool %s result truncated: %s", func_name, ", ".join(omitted)
+                )
+        tool_message = ToolMessage(
+            role="tool",
+            tool=func_name,
+            arguments=func_args,
+            result=result,
+            result_handle=handle,
+        )
+        return tool_message, content
+
+    def _add_tool_results(
+        self,
+        session_id: str,
+        messages: List[Dict[str, Any]],
+        tool_calls_message: Dict[str, Any],
+        contents: List[str],
+    ):
+        """
+        Append the tool results to messages, in the order of the tool calls, and store the
+        assistant tool calls message with its results in memory.
+        """
+        self.memory.add_message(session_id, tool_calls_message)
+        for tool_call, content in zip(tool_calls_message["tool_calls"], contents):
+            msg = {"role": "tool", "tool_call_id": tool_call["id"], "content": content}
+            messages.append(msg)
+            self.memory.add_message(session_id, dict(msg))
+
+    async def _create_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        openai_tools: List[Dict[str, Any]],
+        stream: bool = False,
+        timeout: float | None = None,
+        session_id: str = "",
+    ):
+        """
+        Request a chat completion to the LLM for the current turn.
+
+        With `structured_output` enabled, ValidResponse is sent as JSON-schema `response_format`, so that
+        the final answer is already valid. The first request acts as capability probe: if the provider
+        rejects the response format (a 400 error naming `response_format`), it is disabled for this client
+        and the request is sent again without it.
+
+        Args:
+            messages: The messages to send to the LLM.
+            openai_tools: The MCP tools as OpenAI function descriptors.
+            stream: If True, request the streaming mode.
+            timeout: Max seconds to wait for the completion (for the stream to start if stream is True),
+                the wait in the llm_limiter queue included. The llm_call span covers the same time.
+            session_id: ID of the conversation session, the fairness key of the llm_limiter.
+
+        Returns:
+            The ChatCompletion, or the chunks stream if stream is True.
+
+        Raises:
+            asyncio.TimeoutError: If the timeout expires, the request is cancelled.
+        """
+        request = functools.partial(
+            self._request_completion, messages, openai_tools, stream
+        )
+        if self.llm_limiter is not None:
+            request = functools.partial(
+                self.llm_limiter.call, request, session_id, stream=stream
+            )
+        start = time.perf_counter()
+        with self.telemetry.span(
+            "llm_call",
+            labels={"stream": str(stream).lower()},
+            model=self.model,
+            session_id=session_id,
+        ):
+            response = await asyncio.wait_for(request(), timeout=timeout)
+        if not stream:
+            usage = usage_from_response(response)
+            self.token_usage.record(session_id, usage)
+            if self.turn_recorder is not None:
+                message = response.choices[0].message
+                self.turn_recorder.llm(
+                    session_id,
+                    messages,
+                    openai_tools,
+                    message.content,
+                    message.tool_calls or [],
+                    usage,
+                    time.perf_counter() - start,
+                )
+        return response
+
+    async def _request_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        openai_tools: List[Dict[str, Any]],
+        stream: bool,
+    ):
+        """Send the chat completion request, probing the structured outputs support."""
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+        }
+        if openai_tools:
+            kwargs["tools"] = openai_tools
+            kwargs["tool_choice"] = "auto"
+        if stream:
+            kwargs["stream"] = True
+            # the usage comes in a last chunk without choices
+            kwargs["stream_options"] = {"include_usage": True}
+        if not self.structured_output or self._structured_output_supported is False:
+            return await self.llm_client.chat.completions.create(**kwargs)
+        try:
+            response = await self.llm_client.chat.completions.create(
+                **kwargs, response_format=_VALID_RESPONSE_FORMAT
+            )
+        except BadRequestError as exc:
+            # only a rejection of the response format disables it, not e.g. a context length error
+            if self._structured_output_supported or "response_format" not in (
+                f"{exc.param or ''} {exc.message}"
+            ):
+                raise
+            self.logger.warning(
+                "Structured outputs not supported by the provider, disabled: %s", exc
+            )
+            self._structured_output_supported = False
+            return await self.llm_client.chat.completions.create(**kwargs)
+        self._structured_output_supported = True
+        return response
+
+    async def _validate_final_text(
+        self,
+        final_text: Any,
+        uris: List[str],
+        deadline: float | None = None,
+        session_id: str = "",
+    ) -> str:
+        """
+        Turn the final assistant content into a JSON string valid for the ValidResponse model.
+
+        Parameters given as a dict are remapped to a list of name/value objects and a uri not offered
+        in this turn is dropped. If the content cannot be parsed, it is repaired locally and, only if that
+        fails too, the LLM is asked to fix it.
+
+        Args:
+            final_text: The content of the final assistant message.
+            uris: List of widget resource URIs offered to the LLM in this turn.
+            deadline: Monotonic deadline of the turn, if any. If the LLM fix is not done in time,
+                the content is returned as text-only response.
+            session_id: ID of the conversation session, the tokens of the LLM fix are accounted to it
+                and it is the fairness key of the llm_limiter.
+
+        Returns:
+            str: The ValidResponse JSON.
+        """
+        self.stats["final_answers"] += 1
+        with self.telemetry.span("validation"):
+            valid_text = self._parse_final_text(final_text, uris)
+        if valid_text is not None:
+            return valid_text
+
+        self.stats["fallback_parses"] += 1
+        self.logger.debug(
+            "Fallback parse %d of %d final answers",
+            self.stats["fallback_parses"],
+            self.stats["final_answers"],
+        )
+        request = functools.partial(
+            self.llm_client.responses.parse,
+            model=self.model,
+            input=final_text,
+            instructions="""Return a valid response following your model. Do not infere anything that is not in the input, if some parameters are missing return only the ones you are certain.""",
+            text_format=ValidResponse,
+        )
+        if self.llm_limiter is not None:
+            request = functools.partial(self.llm_limiter.call, request, session_id)
+        start = time.perf_counter()
+        try:
+            with self.telemetry.span("fallback_parse", model=self.model):
+                response_final = await asyncio.wait_for(
+                    request(),
+                    timeout=self._time_left(self._deadline(self.llm_timeout, deadline)),
+                )
+        except asyncio.TimeoutError:
+            self.logger.warning("Fallback parse timed out, answering with plain text")
+            return ValidResponse(text=str(final_text)).model_dump_json()
+        self.token_usage.record(session_id, usage_from_response(response_final))
+        parsed = response_final.output_parsed
+        if parsed.uri not in uris:
+            parsed.uri = ""
+            parsed.parameters = []
+
+        final_text = parsed.model_dump_json()
+        if self.turn_recorder is not None:
+            self.turn_recorder.parse(
+                session_id, final_text, time.perf_counter() - start
+            )
+        return final_text
+
+    def _parse_final_text(self, final_text: Any, uris: List[str]) -> str | None:
+        """
+        Validate the final assistant content locally, repairing it if nearly valid.
+
+        Returns:
+            str | None: The ValidResponse JSON, None if the content needs the LLM fallback parse.
+        """
+        try:
+            if isinstance(final_text, str):
+                parsed: dict = json.loads(final_text)
+            else:
+                parsed: dict = final_text
+            # If the parameters are a dict, remap them to a list of {"name": ..., "value": ...} objects
+            if isinstance(parsed.get("parameters", []), dict):
+                parsed["parameters"] = [
+                    {"name": k, "value": v} for k, v in parsed["parameters"].items()
+                ]
+            if parsed.get("uri", "") not in uris:
+                parsed["uri"] = ""
+                parsed["parameters"] = []
+            test = parsed.get("text", None)
+            if test is None:
+                parsed["text"] = ""
+            final_text = json.dumps(parsed)
+            ValidResponse.model_validate_json(final_text)
+            return final_text
+        except (json.JSONDecodeError, ValidationError, AttributeError):
+            pass
+
+        # nearly valid answers (fences, trailing commas, quotes, extra prose...) are fixed locally
+        repaired = repair_response(final_text, uris)
+        if repaired is not None:
+            self.stats["local_repairs"] += 1
+            if repaired["uri"] not in uris:
+                repaired["uri"] = ""
+                repaired["parameters"] = []
+            return json.dumps(repaired)
+        return None
+
+    def _is_first_turn(self, messages: List[Dict[str, Any]]) -> bool:
+        """True if the turn can use the response cache: enabled and no session history before the user message."""
+        if self.response_cache is None:
+            return False
+        return all(m.get("role") == "system" for m in messages[:-1])
+
+    async def _cached_answer(
+        self,
+        user_message: str,
+        uris: List[str],
+        deadline: float | None = None,
+        session_id: str = "",
+    ) -> Tuple[List[ToolMessage], str] | None:
+        """
+        Look up the response cache for the first turn of a session.
+
+        The tool calls backing the parameters of the cached answer are made again, as the tool calls
+        of an assistant message, so that those parameters are up to date. A failed or timed out call
+        makes the lookup a miss.
+
+        Args:
+            user_message: The user message of the turn.
+            uris: List of widget resource URIs offered in this turn.
+            deadline: Monotonic deadline of the turn, if any.
+            session_id: ID of the conversation session, for the turn_recorder.
+
+        Returns:
+            Tuple[List[ToolMessage], str] | None: the tool messages and the ValidResponse JSON,
+                None on a miss.
+        """
+        cached = await self.response_cache.get(user_message, uris)
+        if cached is None:
+            return None
+        tool_outputs = []
+        response = cached.response
+        if cached.tool_calls:
+            tool_calls = [
+                ChatCompletionMessageFunctionToolCall(
+                    id=f"cached_{i}",
+                    type="function",
+                    function=Function(name=name, arguments=json.dumps(args)),
+                )
+                for i, (name, args) in enumerate(cached.tool_calls)
+            ]
+            try:
+                tool_outputs = await self._execute_tool_calls(
+                    tool_calls, deadline, session_id
+                )
+            except ToolError:
+                return None
+            structured = [result for _, _, result in tool_outputs]
+            if any(isinstance(r, dict) and "error" in r for r in structured):
+                return None
+            response = rebind_parameters(cached, structured)
+            if response is None:
+                return None
+        self.logger.debug("Response cache hit for %r", user_message)
+        tool_messages = [self._process_tool_output(o)[0] for o in tool_outputs]
+        return tool_messages, json.dumps(response)
+
+    async def _cache_answer(
+        self,
+        user_message: str,
+        uris: List[str],
+        final_text: str,
+        tool_outputs: List[Tuple[str, Dict[str, Any], Any]],
+    ):
+        """Store the answer of a first turn in the response cache, unless a tool call of the turn timed out."""
+        if any(
+            isinstance(result, dict) and "error" in result
+            for _, _, result in tool_outputs
+        ):
+            return
+        cached = bind_parameters(json.loads(final_text), tool_outputs)
+        await self.response_cache.put(user_message, uris, cached)
+
+    def _setup_timed_out(self, user_message: str, session_id: str) -> AssistantMessage:
+        """Answer a turn whose setup outlasted the turn deadline, storing its user message in memory."""
+        self.memory.add_message(session_id, {"role": "user", "content": user_message})
+        final_text = self._interrupted_answer("turn setup timed out")
+        return self._add_final_message(session_id, [], final_text)
+
+    def _interrupted_answer(self, reason: str) -> str:
+        """The ValidResponse JSON answering a turn that ran out of time or tool-calling rounds."""
+        self.stats["interrupted_turns"] += 1
+        self.logger.warning("Chat turn interrupted: %s", reason)
+        return ValidResponse(text=TURN_INTERRUPTED_TEXT).model_dump_json()
+
+    def _add_final_message(
+        self, session_id: str, messages: List[Dict[str, Any]], final_text: str
+    ) -> AssistantMessage:
+        """Append the final assistant message to messages and memory, closing the token accounting of the turn."""
+        self.token_usage.end_turn(session_id, json.loads(final_text).get("uri"))
+        if self.turn_recorder is not None:
+            self.turn_recorder.end_turn(session_id, final_text)
+        messages.append({"role": "assistant", "content": final_text})
+        self.memory.add_message(
+            session_id, {"role": "assistant", "content": final_text}
+        )
+        return AssistantMessage(role="assistant", content=final_text)
+
     @run_with_self_client
     async def run_chat_turn(
         self, user_message: str, session_id: str
@@ -264,6 +1450,9 @@ class MCPWIPClient:
         """
         Run an LLM chat turn, incorporating RAG widgets, tool-calling, and memory management.
 
+        Turns of the same session run one at a time. The messages received while a turn of the session
+        is running are merged into a single next turn, whose messages are returned to all their callers.
+
         Args:
             user_message: User-provided message string for this turn.
             session_id: Unique identifier for the chat session (enables session memory/history).
@@ -278,164 +1467,365 @@ class MCPWIPClient:
             - Updates and appends session memory for RAG/widget and tool flows.
             - Ensures all returned assistant messages are valid according to the ValidResponse model.
         """
-        messages = self.memory.get_context(session_id)
-        if not any(m.get("role") == "system" for m in messages):
-            self.memory.reinsert_system(
-                session_id, {"role": "system", "content": self.system_prompt}
-            )
-            messages = self.memory.get_context(session_id)
+        return await self.session_scheduler.run_turn(
+            session_id,
+            user_message,
+            functools.partial(self._run_chat_turn, session_id=session_id),
+        )
 
-        # print(messages)
+    async def _run_chat_turn(
+        self, user_message: str, session_id: str
+    ) -> List[ToolMessage | AssistantMessage]:
+        """Run a chat turn, the session being already reserved by the scheduler."""
+        with self.telemetry.span(
+            "chat_turn", labels={"stream": "false"}, session_id=session_id
+        ):
+            return await self._chat_turn(user_message, session_id)
 
-        formatted_input, uris = await self.format_prompt(user_message)
+    async def _chat_turn(
+        self, user_message: str, session_id: str
+    ) -> List[ToolMessage | AssistantMessage]:
+        """The tool-calling loop of a chat turn."""
+        deadline = self._deadline(self.turn_timeout)
+        shrink = self.token_usage.begin_turn(session_id)
+        try:
+            messages, uris, openai_tools = await asyncio.wait_for(
+                self._start_turn(user_message, session_id, shrink),
+                timeout=self._time_left(deadline),
+            )
+        except asyncio.TimeoutError:
+            return [self._setup_timed_out(user_message, session_id)]
         messages_to_return = []
-        messages.append({"role": "user", "content": formatted_input})
-        self.memory.add_message(
-            session_id, {"role": "user", "content": formatted_input}
-        )
-
-        openai_tools = await self._list_openai_tools()
-        tool_results: List[Dict[str, Any]] = []
+        iterations = 0
+        first_turn = self._is_first_turn(messages)
+        if first_turn:
+            cached = await self._cached_answer(user_message, uris, deadline, session_id)
+            if cached is not None:
+                tool_messages, final_text = cached
+                return tool_messages + [
+                    self._add_final_message(session_id, messages, final_text)
+                ]
+        turn_outputs = []
 
         while True:
-            response = await self.llm_client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                tools=openai_tools if openai_tools else None,
-                tool_choice="auto",
-            )
+            # once the tool-calling rounds are over, the LLM must give its final answer
+            tools = openai_tools if iterations < self.max_tool_iterations else None
+            try:
+                response = await self._create_completion(
+                    messages,
+                    tools,
+                    timeout=self._time_left(self._deadline(self.llm_timeout, deadline)),
+                    session_id=session_id,
+                )
+            except asyncio.TimeoutError:
+                final_text = self._interrupted_answer("LLM request timed out")
+                messages_to_return.append(
+                    self._add_final_message(session_id, messages, final_text)
+                )
+                return messages_to_return
 
             assistant_message = response.choices[0].message
             self.logger.debug(assistant_message)
-            # print(assistant_message)
+
+            if assistant_message.tool_calls and tools:
+                iterations += 1
+                tool_calls_message = self._add_tool_calls_message(
+                    messages, assistant_message.content, assistant_message.tool_calls
+                )
+                tool_outputs = await self._execute_tool_calls(
+                    assistant_message.tool_calls, deadline, session_id
+                )
+                turn_outputs.extend(tool_outputs)
+                results = [self._process_tool_output(o) for o in tool_outputs]
+                self._add_tool_results(
+                    session_id,
+                    messages,
+                    tool_calls_message,
+                    [content for _, content in results],
+                )
+                messages_to_return.extend(message for message, _ in results)
+                continue
 
             if assistant_message.tool_calls:
-                msg = {
-                    "role": "assistant",
-                    "content": assistant_message.content,
-                    "tool_calls": [
-                        {
-                            "id": tc.id,
-                            "type": "function",
-                            "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments,
-                            },
-                        }
-                        for tc in assistant_message.tool_calls
-                    ],
-                }
-                messages.append(msg)
-                self.memory.add_message(session_id, msg)
-
-                for tool_call in assistant_message.tool_calls:
-                    func_name = tool_call.function.name
-                    try:
-                        func_args = json.loads(tool_call.function.arguments or "{}")
-                    except json.JSONDecodeError:
-                        func_args = {}
-
-                    result = await self.call_mcp_tool(func_name, func_args)
-
-                    structured = (
-                        result.structured_content
-                        if isinstance(result, CallToolResult)
-                        else result
-                    )
-                    tool_results.append(
-                        {
-                            "tool": func_name,
-                            "arguments": func_args,
-                            "result": structured,
-                        }
+                # tool calls requested despite no tools offered
+                final_text = self._interrupted_answer("max tool iterations reached")
+            else:
+                final_text = await self._validate_final_text(
+                    assistant_message.content, uris, deadline, session_id
+                )
+                if first_turn:
+                    await self._cache_answer(
+                        user_message, uris, final_text, turn_outputs
                     )
+            messages_to_return.append(
+                self._add_final_message(session_id, messages, final_text)
+            )
+            return messages_to_return
 
-                    messages.append(
-                        {
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "content": json.dumps(structured),
-                        }
-                    )
-                    self.memory.add_message(
-                        session_id,
-                        {
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "content": json.dumps(structured),
-                        },
-                    )
-                    messages_to_return.append(
-                        ToolMessage(
-                            role="tool",
-                            tool=func_name,
-                            arguments=func_args,
-                            result=json.dumps(structured),
-                        )
-                    )
+    async def run_chat_turn_stream(
+        self, user_message: str, session_id: str
+    ) -> AsyncIterator[ToolMessage | WidgetUriMessage | AssistantMessage]:
+        """
+        Streaming variant of run_chat_turn, using the streaming mode of the LLM.
 
-                continue
+        Yields each ToolMessage as soon as its tool call completes, a WidgetUriMessage as soon as an offered
+        widget uri can be read from the partial final answer, and finally the validated AssistantMessage.
+        If the validated uri differs from the one sent early, a correcting WidgetUriMessage (with an empty
+        uri if no widget is selected) comes right before it: the final AssistantMessage is authoritative.
+        Messages are stored in memory in the same order as run_chat_turn. The turn waits for the running
+        turns of the session, it is not merged with other messages.
 
-            final_text = assistant_message.content
+        Args:
+            user_message: User-provided message string for this turn.
+            session_id: Unique identifier for the chat session (enables session memory/history).
+
+        Yields:
+            ToolMessage | WidgetUriMessage | AssistantMessage: Messages for the UI, as they become available.
+        """
+        await self.session_pool.start()
+        async with self.session_scheduler.exclusive(session_id):
+            # timed without span: a span would stay current across the yields to the caller
+            start, error = time.perf_counter(), False
             try:
-                if isinstance(final_text, str):
-                    parsed: dict = json.loads(final_text)
-                else:
-                    parsed: dict = final_text
-                # If the parameters are a dict, remap them to a list of {"name": ..., "value": ...} objects
-                if isinstance(parsed.get("parameters", []), dict):
-                    parsed["parameters"] = [
-                        {"name": k, "value": v} for k, v in parsed["parameters"].items()
-                    ]
-                if parsed.get("uri", "") not in uris:
-                    parsed["uri"] = ""
-                    parsed["parameters"] = []
-                test = parsed.get("text", None)
-                if test is None:
-                    parsed["text"] = ""
-                # print(parsed)
-                final_text = json.dumps(parsed)
-                ValidResponse.model_validate_json(final_text)
-            except (json.JSONDecodeError, ValidationError) as e:
-                # print("Fallback")
-                # print(e)
-                response_final = await self.llm_client.responses.parse(
-                    model=self.model,
-                    input=final_text,
-                    instructions="""Return a valid response following your model. Do not infere anything that is not in the input, if some parameters are missing return only the ones you are certain.""",
-                    text_format=ValidResponse,
+                async with contextlib.aclosing(
+                    self._run_chat_turn_stream(user_message, session_id)
+                ) as turn_messages:
+                    async for message in turn_messages:
+                        yield message
+            except Exception:
+                error = True
+                raise
+            finally:
+                self.telemetry.observe(
+                    "chat_turn",
+                    time.perf_counter() - start,
+                    labels={"stream": "true"},
+                    error=error,
                 )
-                parsed = response_final.output_parsed
-                if parsed.uri not in uris:
-                    parsed.uri = ""
-                    parsed.parameters = []
-
-                final_text = parsed.model_dump_json()
 
-            messages.append({"role": "assistant", "content": final_text})
-            self.memory.add_message(
-                session_id, {"role": "assistant", "content": final_text}
+    async def _run_chat_turn_stream(
+        self, user_message: str, session_id: str
+    ) -> AsyncIterator[ToolMessage | WidgetUriMessage | AssistantMessage]:
+        """Run a streaming chat turn, the session being already reserved by the scheduler."""
+        deadline = self._deadline(self.turn_timeout)
+        shrink = self.token_usage.begin_turn(session_id)
+        try:
+            messages, uris, openai_tools = await asyncio.wait_for(
+                self._start_turn(user_message, session_id, shrink, stream=True),
+                timeout=self._time_left(deadline),
             )
-            messages_to_return.append(
-                AssistantMessage(role="assistant", content=final_text)
+        except asyncio.TimeoutError:
+            yield self._setup_timed_out(user_message, session_id)
+            return
+        iterations = 0
+        first_turn = self._is_first_turn(messages)
+        if first_turn:
+            cached = await self._cached_answer(user_message, uris, deadline, session_id)
+            if cached is not None:
+                tool_messages, final_text = cached
+                for tool_message in tool_messages:
+                    yield tool_message
+                uri = json.loads(final_text)["uri"]
+                if uri:
+                    yield WidgetUriMessage(uri=uri)
+                yield self._add_final_message(session_id, messages, final_text)
+                return
+        turn_outputs = []
+        # widget uri already sent to the UI, read from a partial answer
+        sent_uri = ""
+
+        while True:
+            tools = openai_tools if iterations < self.max_tool_iterations else None
+            call_deadline = self._deadline(self.llm_timeout, deadline)
+            content = ""
+            pending_calls: Dict[int, Dict[str, str]] = {}
+            uri_sent = False
+            usage = None
+            start = time.perf_counter()
+            try:
+                stream = await self._create_completion(
+                    messages,
+                    tools,
+                    stream=True,
+                    timeout=self._time_left(call_deadline),
+                    session_id=session_id,
+                )
+                async with contextlib.aclosing(
+                    self._stream_chunks(stream, call_deadline)
+                ) as chunks:
+                    async for chunk in chunks:
+                        chunk_usage = usage_from_response(chunk)
+                        self.token_usage.record(session_id, chunk_usage)
+                        usage = chunk_usage or usage
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+                        for tc in delta.tool_calls or []:
+                            call = pending_calls.setdefault(
+                                tc.index, {"id": "", "name": "", "arguments": ""}
+                            )
+                            call["id"] = tc.id or call["id"]
+                            if tc.function is not None:
+                                call["name"] += tc.function.name or ""
+                                call["arguments"] += tc.function.arguments or ""
+                        if delta.content:
+                            content += delta.content
+                            if not uri_sent and not pending_calls:
+                                match = _URI_PATTERN.search(content)
+                                if match and match.group(1) in uris:
+                                    uri_sent = True
+                                    if match.group(1) != sent_uri:
+                                        sent_uri = match.group(1)
+                                        yield WidgetUriMessage(uri=sent_uri)
+            except asyncio.TimeoutError:
+                final_text = self._interrupted_answer("LLM request timed out")
+                for message in self._final_stream_messages(
+                    session_id, messages, final_text, sent_uri
+                ):
+                    yield message
+                return
+
+            tool_calls = [
+                ChatCompletionMessageFunctionToolCall(
+                    id=call["id"],
+                    type="function",
+                    function=Function(name=call["name"], arguments=call["arguments"]),
+                )
+                for _, call in sorted(pending_calls.items())
+            ]
+            if self.turn_recorder is not None:
+                self.turn_recorder.llm(
+                    session_id,
+                    messages,
+                    tools,
+                    content or None,
+                    tool_calls,
+                    usage,
+                    time.perf_counter() - start,
+                )
+
+            if pending_calls and not tools:
+                final_text = self._interrupted_answer("max tool iterations reached")
+                for message in self._final_stream_messages(
+                    session_id, messages, final_text, sent_uri
+                ):
+                    yield message
+                return
+
+            if pending_calls:
+                iterations += 1
+                tool_calls_message = self._add_tool_calls_message(
+                    messages, content or None, tool_calls
+                )
+                semaphore = asyncio.Semaphore(self.tool_concurrency)
+                tasks = [
+                    asyncio.ensure_future(
+                        self._execute_tool_call(tc, semaphore, deadline, session_id)
+                    )
+                    for tc in tool_calls
+                ]
+                contents: Dict[asyncio.Future, str] = {}
+                try:
+                    pending = set(tasks)
+                    while pending:
+                        done, pending = await asyncio.wait(
+                            pending, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        for task in (t for t in tasks if t in done):
+                            tool_message, contents[task] = self._process_tool_output(
+                                task.result()
+                            )
+                            yield tool_message
+                finally:
+                    # the consumer went away or a tool failed: stop the remaining calls
+                    for task in tasks:
+                        task.cancel()
+                # results are stored in the original tool_call order
+                turn_outputs.extend(task.result() for task in tasks)
+                self._add_tool_results(
+                    session_id,
+                    messages,
+                    tool_calls_message,
+                    [contents[t] for t in tasks],
+                )
+                continue
+
+            final_text = await self._validate_final_text(
+                content, uris, deadline, session_id
             )
+            if first_turn:
+                await self._cache_answer(user_message, uris, final_text, turn_outputs)
+            for message in self._final_stream_messages(
+                session_id, messages, final_text, sent_uri
+            ):
+                yield message
+            return
 
-            return messages_to_return
+    def _final_stream_messages(
+        self,
+        session_id: str,
+        messages: List[Dict[str, Any]],
+        final_text: str,
+        sent_uri: str,
+    ) -> List[WidgetUriMessage | AssistantMessage]:
+        """
+        The last messages of a streaming turn: the final AssistantMessage, preceded by a WidgetUriMessage
+        if its uri differs from the one already sent (empty if the validated answer has no widget).
+        """
+        final: List[WidgetUriMessage | AssistantMessage] = []
+        uri = json.loads(final_text)["uri"]
+        if uri != sent_uri:
+            final.append(WidgetUriMessage(uri=uri))
+        final.append(self._add_final_message(session_id, messages, final_text))
+        return final
+
+    async def _stream_chunks(
+        self, stream: Any, deadline: float | None
+    ) -> AsyncIterator[Any]:
+        """
+        Iterate the chunks of a completion stream until the deadline, closing the stream at the end.
+
+        Raises:
+            asyncio.TimeoutError: If the deadline expires before the end of the stream.
+        """
+        iterator = stream.__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(
+                        iterator.__anext__(), timeout=self._time_left(deadline)
+                    )
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            # releases the HTTP connection of an interrupted stream
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await close()
 
-    @run_with_self_client
     async def inject_context(self, context: str, session_id: str):
         """
         Inject additional contextual information into the chat as if provided by the user.
 
         Prepends '[Widget Context]: ' to the supplied context and stores it as a 'user' message.
+        While a turn of the session is running, the context is stored right after it, merged with the
+        other contexts received meanwhile.
 
         Args:
             context: Arbitrary contextual information (string) to provide for the session.
             session_id: ID of the conversation session where the context should be injected.
         """
         context = "[Widget Context]: " + context
+        self.session_scheduler.add_context(session_id, context)
+
+    def _write_contexts(self, session_id: str, contexts: List[str]):
+        """Store the given context injections in memory, as a single 'user' message."""
+        context = "\n".join(contexts)
         message = {"role": "user", "content": context}
         self.memory.add_message(session_id=session_id, message=message)
+        if self.turn_recorder is not None:
+            self.turn_recorder.context(session_id, contexts)
         self.logger.debug("[Additional context] %s", context)
         # print("[Additional context] %s", context)
         # print(f"{session_id}", self.memory.get_context(session_id))
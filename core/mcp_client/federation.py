@@ -0,0 +1,336 @@
+"""
+Federation of several MCP-WIP servers behind a single MCPWIPClient.
+
+The tools, resources and widget reads are fanned out to all the servers concurrently, each with
+its own timeout, and merged: tool names are namespaced with the server name, tool calls and
+resource reads are routed to the owning server. A server that times out or drops its connection
+is skipped for a while, so a slow or dead backend does not stall every turn.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Literal
+
+import mcp.types
+from fastmcp.client.client import CallToolResult
+
+from .session_pool import MCPSessionPool, MCPSessionPoolException
+
+
+class MCPFederationException(Exception):
+    """
+    Exception class for the federation errors in FederatedSessionPool.
+
+    Raised when a resource is served by no available MCP server.
+    """
+
+
+class MCPFederation:
+    """
+    Configuration of a federation of MCP servers, to be passed to MCPWIPClient as `mcp_server_transport`.
+
+    The tools of each server are exposed to the LLM as `<server name><separator><tool name>`, the
+    resources keep their URIs (the first server listing a URI owns it).
+    """
+
+    def __init__(
+        self,
+        servers: Dict[str, Any],
+        timeout: float = 5.0,
+        timeouts: Dict[str, float] | None = None,
+        retry_interval: float = 30.0,
+        separator: str = "__",
+    ):
+        """
+        Args:
+            servers: The MCP servers by name, each as a transport object, connection config dict
+                or in-process MCPWIPServer/FastMCP instance (any `mcp_server_transport` of MCPWIPClient).
+                Names are made of letters, digits, "_" and "-", and must not contain the separator.
+            timeout: Max seconds of the listings and resource reads of each server (connection included).
+            timeouts: Timeouts by server name, overriding timeout.
+            retry_interval: Seconds during which a server that timed out or lost its connection is skipped.
+            separator: Separator between the server name and the tool name.
+        """
+        if not servers:
+            raise ValueError("The federation needs at least one MCP server")
+        for name in servers:
+            if (
+                not name
+                or separator in name
+                or not name.replace("_", "").replace("-", "").isalnum()
+            ):
+                raise ValueError(f"Invalid MCP server name: {name!r}")
+        self.servers = servers
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.retry_interval = retry_interval
+        self.separator = separator
+
+    def session_pool(
+        self,
+        pool_factory: Callable[[Any], MCPSessionPool],
+        on_change: Callable[[], None] | None = None,
+        log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.DEBUG,
+    ) -> "FederatedSessionPool":
+        """
+        Builds the session pools of the servers.
+
+        Args:
+            pool_factory: Creates the session pool of a server transport.
+            on_change: Called when a skipped server can be retried, to refresh the merged catalogs.
+        """
+        return FederatedSessionPool(
+            self,
+            {name: pool_factory(transport) for name, transport in self.servers.items()},
+            on_change=on_change,
+            log_lvl=log_lvl,
+        )
+
+
+class FederatedSessionPool:
+    """
+    Session pools of the federated servers, with the interface of MCPSessionPool.
+
+    `acquire()` gives access to the federation itself, which answers the fastmcp Client calls
+    used by MCPWIPClient (list_tools, list_resources, read_resource, call_tool) by fanning them
+    out or routing them to the servers.
+
+    When a server fails a listing, its last listed tools and resources are kept in the merged
+    catalogs. A server that times out or loses its connection is skipped for `retry_interval`
+    seconds: its tools and resources are left out of the merged catalogs, its reads fail
+    immediately and its tool calls are answered with an error result meanwhile. `on_change` is
+    called when the server is put aside and again when it can be retried, so that the next turn
+    lists the servers again.
+    """
+
+    def __init__(
+        self,
+        federation: MCPFederation,
+        pools: Dict[str, MCPSessionPool],
+        on_change: Callable[[], None] | None = None,
+        log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.DEBUG,
+    ):
+        """
+        Args:
+            federation: The federation configuration.
+            pools: The session pool of each server, by name.
+            on_change: Called when a skipped server can be retried.
+        """
+        self.federation = federation
+        self.pools = pools
+        self.on_change = on_change
+        self.failures: Dict[str, int] = {name: 0 for name in pools}
+        self._unavailable_until: Dict[str, float] = {}
+        self._tools: Dict[str, List[mcp.types.Tool]] = {}
+        self._resources: Dict[str, List[mcp.types.Resource]] = {}
+        self._resource_owners: Dict[str, str] = {}
+        self.logger = logging.getLogger("FederatedSessionPool")
+        self.logger.setLevel(log_lvl)
+
+    @property
+    def members(self) -> List[Any]:
+        """The pooled sessions of all the servers, in server order."""
+        return [m for pool in self.pools.values() for m in pool.members]
+
+    @property
+    def started(self) -> bool:
+        """True if the pools have been started and not closed."""
+        return any(pool.started for pool in self.pools.values())
+
+    @staticmethod
+    def is_unavailable_error(exc: BaseException) -> bool:
+        """True if exc puts the server aside for retry_interval: a timeout, a failed connection or a lost one."""
+        return isinstance(
+            exc, (asyncio.TimeoutError, MCPSessionPoolException)
+        ) or MCPSessionPool.is_transport_error(exc)
+
+    def available(self, name: str) -> bool:
+        """True if the server is not skipped after a timeout or a lost connection."""
+        return time.monotonic() >= self._unavailable_until.get(name, 0.0)
+
+    async def start(self):
+        """
+        Opens the sessions of all the available servers concurrently, each within its timeout.
+
+        Safe to call more than once, the servers already started are not waited.
+        """
+        await asyncio.gather(*(self._start(name) for name in self.pools))
+
+    async def _start(self, name: str):
+        pool = self.pools[name]
+        if pool.started or not self.available(name):
+            return
+        try:
+            await asyncio.wait_for(pool.start(), self._timeout(name))
+        except asyncio.TimeoutError as exc:
+            self._set_unavailable(name, exc)
+
+    async def close(self):
+        """Closes the sessions of all the servers."""
+        await asyncio.gather(*(pool.close() for pool in self.pools.values()))
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator["FederatedSessionPool"]:
+        """
+        Gives access to the federation, the server sessions are acquired by each call.
+
+        Yields:
+            FederatedSessionPool: the federation, answering the fastmcp Client calls.
+        """
+        yield self
+
+    def _timeout(self, name: str) -> float:
+        return self.federation.timeouts.get(name, self.federation.timeout)
+
+    async def _run(
+        self,
+        name: str,
+        fn: Callable[[Any], Awaitable[Any]],
+        bounded: bool = True,
+    ) -> Any:
+        """
+        Runs fn with a client of the server, within the server timeout if bounded.
+
+        A timeout or a lost connection puts the server aside for retry_interval.
+        """
+
+        async def call():
+            async with self.pools[name].acquire() as mcp_client:
+                return await fn(mcp_client)
+
+        try:
+            return await asyncio.wait_for(
+                call(), self._timeout(name) if bounded else None
+            )
+        except Exception as exc:
+            if self.is_unavailable_error(exc):
+                self._set_unavailable(name, exc)
+            raise
+
+    def _set_unavailable(self, name: str, exc: BaseException):
+        self.failures[name] += 1
+        retry_interval = self.federation.retry_interval
+        self.logger.warning(
+            "MCP server %s unavailable, skipped for %.1fs: %r",
+            name,
+            retry_interval,
+            exc,
+        )
+        newly_unavailable = self.available(name)
+        self._unavailable_until[name] = time.monotonic() + retry_interval
+        if newly_unavailable and self.on_change is not None:
+            # drops the server from the catalogs now, lists it again once it can be retried
+            self.on_change()
+            with contextlib.suppress(RuntimeError):
+                asyncio.get_running_loop().call_later(retry_interval, self.on_change)
+
+    async def _fan_out(
+        self, fn: Callable[[Any], Awaitable[Any]]
+    ) -> Dict[str, Any | BaseException]:
+        """Runs fn on all the available servers concurrently, returns the results or errors by name."""
+        names = [name for name in self.pools if self.available(name)]
+        results = await asyncio.gather(
+            *(self._run(name, fn) for name in names), return_exceptions=True
+        )
+        for name, result in zip(names, results):
+            # the unavailable servers are already logged
+            if isinstance(result, BaseException) and not self.is_unavailable_error(
+                result
+            ):
+                self.logger.warning("MCP server %s failed: %r", name, result)
+        return dict(zip(names, results))
+
+    async def list_tools(self) -> List[mcp.types.Tool]:
+        """Lists the tools of all the servers, with namespaced names."""
+        results = await self._fan_out(lambda c: c.list_tools())
+        for name, result in results.items():
+            if not isinstance(result, BaseException):
+                self._tools[name] = [
+                    t.model_copy(
+                        update={"name": f"{name}{self.federation.separator}{t.name}"}
+                    )
+                    for t in result
+                ]
+        return [
+            t
+            for name in self.pools
+            if self.available(name)
+            for t in self._tools.get(name, [])
+        ]
+
+    async def list_resources(self) -> List[mcp.types.Resource]:
+        """Lists the resources of all the servers; a URI listed by more than one server belongs to the first."""
+        results = await self._fan_out(lambda c: c.list_resources())
+        for name, result in results.items():
+            if not isinstance(result, BaseException):
+                self._resources[name] = result
+        resources = []
+        owners: Dict[str, str] = {}
+        for name in self.pools:
+            if not self.available(name):
+                continue
+            for resource in self._resources.get(name, []):
+                uri = str(resource.uri)
+                if uri in owners:
+                    self.logger.warning(
+                        "Resource %s of %s already served by %s", uri, name, owners[uri]
+                    )
+                    continue
+                owners[uri] = name
+                resources.append(resource)
+        self._resource_owners = owners
+        return resources
+
+    async def read_resource(
+        self, uri: Any
+    ) -> List[mcp.types.TextResourceContents | mcp.types.BlobResourceContents]:
+        """Reads a resource from its owning server."""
+        uri = str(uri)
+        if uri not in self._resource_owners:
+            await self.list_resources()
+        name = self._resource_owners.get(uri)
+        if name is None:
+            raise MCPFederationException(f"No MCP server serves the resource {uri}")
+        if not self.available(name):
+            raise MCPFederationException(f"MCP server {name} unavailable")
+        return await self._run(name, lambda c: c.read_resource(uri))
+
+    async def call_tool(
+        self, name: str, arguments: Dict[str, Any] | None = None, **kwargs
+    ) -> CallToolResult:
+        """
+        Calls a namespaced tool on its owning server.
+
+        The call is bounded by the tool timeout of the caller, not by the server timeout. A call to
+        an unknown tool or to an unavailable server is answered with an error result, so that the
+        LLM can go on without it.
+
+        Raises:
+            ToolError: If the tool call fails on the server.
+        """
+        server, _, tool_name = name.partition(self.federation.separator)
+        if server not in self.pools or not tool_name:
+            return self._error_result(f"Unknown tool: {name}")
+        if not self.available(server):
+            return self._error_result(f"MCP server {server} unavailable")
+        try:
+            return await self._run(
+                server,
+                lambda c: c.call_tool(tool_name, arguments, **kwargs),
+                bounded=False,
+            )
+        except Exception as exc:
+            if not self.is_unavailable_error(exc):
+                raise
+            return self._error_result(f"MCP server {server} unavailable")
+
+    @staticmethod
+    def _error_result(message: str) -> CallToolResult:
+        return CallToolResult(
+            content=[mcp.types.TextContent(type="text", text=message)],
+            structured_content={"error": message},
+            data=None,
+            is_error=True,
+        )
@@ -0,0 +1,231 @@
+"""
+Deterministic local repair of nearly valid final answers of the LLM.
+Used before asking the LLM itself to fix an answer that is not a valid ValidResponse.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic import ValidationError
+from .models import ValidResponse
+
+_FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+
+# bare words accepted outside strings, mapped to their JSON literal
+_LITERALS = {
+    "true": "true",
+    "false": "false",
+    "null": "null",
+    "True": "true",
+    "False": "false",
+    "None": "null",
+}
+
+_QUOTES = {'"': '"', "'": "'", "“": "”", "‘": "’"}
+
+
+def strip_fences(text: str) -> str:
+    """
+    Returns the content of the first markdown code fence, or the text itself if there is none.
+
+    Args:
+        text: The LLM answer.
+    """
+    match = _FENCE_PATTERN.search(text)
+    return match.group(1) if match else text
+
+
+def extract_object(text: str) -> Optional[str]:
+    """
+    Extracts the first JSON-like object from a text, dropping the prose around it.
+
+    Quotes and nesting are tracked, so braces inside strings do not end the object.
+    A truncated object is closed.
+
+    Args:
+        text: Text containing an object.
+
+    Returns:
+        str | None: the object text, None if the text has no "{".
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    stack: List[str] = []
+    quote = None
+    escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == quote:
+                quote = None
+            continue
+        if c in _QUOTES:
+            quote = _QUOTES[c]
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+        elif c in "}]":
+            if stack and stack[-1] == c:
+                stack.pop()
+            if not stack:
+                return text[start : i + 1]
+    # truncated answer: close the open string and the open brackets
+    tail = text[start:]
+    if quote:
+        tail += quote
+    return tail.rstrip().rstrip(",") + "".join(reversed(stack))
+
+
+def normalize_json(text: str) -> str:
+    """
+    Rewrites common syntax errors of JSON-like text into valid JSON.
+
+    Fixes single and typographic quotes, Python literals (True/False/None), unquoted keys,
+    trailing commas and raw newlines inside strings.
+
+    Args:
+        text: JSON-like text.
+
+    Returns:
+        str: the normalized text, not guaranteed to be valid JSON.
+    """
+    out: List[str] = []
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c in _QUOTES:
+            # re-emit any string as a JSON double-quoted string
+            close = _QUOTES[c]
+            j = i + 1
+            chars: List[str] = []
+            while j < n and text[j] != close:
+                if text[j] == "\\" and j + 1 < n:
+                    nxt = text[j + 1]
+                    # \' is not a valid JSON escape
+                    chars.append(nxt if nxt == "'" else text[j : j + 2])
+                    j += 2
+                    continue
+                if text[j] == '"':
+                    chars.append('\\"')
+                elif text[j] == "\n":
+                    chars.append("\\n")
+                else:
+                    chars.append(text[j])
+                j += 1
+            out.append('"' + "".join(chars) + '"')
+            i = j + 1
+        elif c.isdigit() or c == "-":
+            j = i + 1
+            while j < n and (text[j].isdigit() or text[j] in ".eE+-"):
+                j += 1
+            out.append(text[i:j])
+            i = j
+        elif c.isalpha() or c == "_":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] in "_-"):
+                j += 1
+            word = text[i:j]
+            k = j
+            while k < n and text[k].isspace():
+                k += 1
+            if k < n and text[k] == ":":
+                out.append(json.dumps(word))
+            else:
+                out.append(_LITERALS.get(word, json.dumps(word)))
+            i = j
+        elif c == ",":
+            k = i + 1
+            while k < n and text[k].isspace():
+                k += 1
+            if k >= n or text[k] not in "}]":
+                out.append(c)
+            i += 1
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def coerce_parameters(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Coerces the parameters of a parsed answer into a list of ParameterKV-like dicts.
+
+    Accepts a dict of parameters, a list of single-key dicts, a list of [name, value] pairs or null.
+
+    Args:
+        parsed: The parsed answer, modified in place.
+
+    Returns:
+        Dict[str, Any]: the same parsed answer.
+    """
+    params = parsed.get("parameters")
+    if params is None:
+        parsed["parameters"] = []
+    elif isinstance(params, dict):
+        parsed["parameters"] = [{"name": k, "value": v} for k, v in params.items()]
+    elif isinstance(params, list):
+        coerced = []
+        for p in params:
+            if isinstance(p, dict) and "name" in p:
+                coerced.append({"name": str(p["name"]), "value": p.get("value")})
+            elif isinstance(p, dict):
+                coerced.extend({"name": k, "value": v} for k, v in p.items())
+            elif isinstance(p, (list, tuple)) and len(p) == 2:
+                coerced.append({"name": str(p[0]), "value": p[1]})
+        parsed["parameters"] = coerced
+    for key in ("uri", "text"):
+        if parsed.get(key) is None:
+            parsed[key] = ""
+    return parsed
+
+
+def repair_response(text: Any, uris: Sequence[str] = ()) -> Optional[Dict[str, Any]]:
+    """
+    Tries to turn a nearly valid final answer into a ValidResponse dict, without any LLM call.
+
+    Pipeline: strip markdown fences, extract the JSON object, normalize its syntax,
+    coerce the parameters and validate against ValidResponse (unknown keys are dropped).
+    An answer without any object is taken as a text-only response, unless it names one of
+    the offered uris: the widget selection is then left to the fallback parse.
+
+    Args:
+        text: The content of the final assistant message.
+        uris: The widget uris offered in the turn.
+
+    Returns:
+        Dict[str, Any] | None: the repaired answer, None if the local repair failed.
+    """
+    if isinstance(text, dict):
+        parsed = dict(text)
+    elif isinstance(text, str):
+        candidate = extract_object(strip_fences(text))
+        if candidate is None:
+            if any(uri in text for uri in uris):
+                # prose selecting a widget, its parameters are not recoverable locally
+                return None
+            # plain prose, the answer is a text-only response
+            return {"uri": "", "parameters": [], "text": text.strip()}
+        try:
+            parsed = json.loads(candidate)
+        except json.JSONDecodeError:
+            try:
+                parsed = json.loads(normalize_json(candidate))
+            except json.JSONDecodeError:
+                return None
+        if not isinstance(parsed, dict):
+            return None
+    else:
+        return None
+    parsed = coerce_parameters(
+        {k: v for k, v in parsed.items() if k in ValidResponse.model_fields}
+    )
+    try:
+        return ValidResponse.model_validate(parsed).model_dump()
+    except ValidationError:
+        return None
@@ -0,0 +1,352 @@
+"""
+Client-side admission control of the LLM requests.
+An AIMD concurrency limit and a token bucket shared by all the turns, with fair queuing
+across sessions and backoff on the provider rate limits (HTTP 429).
+"""
+
+import asyncio
+import collections
+import contextlib
+import email.utils
+import logging
+import re
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Literal,
+    Mapping,
+    Optional,
+)
+
+from openai import RateLimitError
+
+# durations of the x-ratelimit-reset-* headers, e.g. "1s", "6m0s", "20ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Seconds to wait before the next request, from the headers of a rate-limited response.
+
+    Reads, in order, `retry-after-ms`, `retry-after` (seconds or HTTP date) and the
+    `x-ratelimit-reset-requests` / `x-ratelimit-reset-tokens` durations of the exhausted limits.
+
+    Returns:
+        float | None: the delay in seconds, None if the headers do not tell.
+    """
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is not None:
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                date = email.utils.parsedate_to_datetime(value)
+                return max(0.0, date.timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    delays = []
+    for limit in ("requests", "tokens"):
+        remaining = headers.get(f"x-ratelimit-remaining-{limit}")
+        reset = headers.get(f"x-ratelimit-reset-{limit}")
+        if reset is not None and remaining in (None, "0"):
+            delay = _parse_duration(reset)
+            if delay is not None:
+                delays.append(delay)
+    return max(delays) if delays else None
+
+
+class LLMLimiter:
+    """
+    Admission control of the LLM requests of an MCPWIPClient.
+
+    - Concurrency: at most `limit` requests are in flight. While the limit is reached, it grows by
+      `increase` per `limit` successful requests (about +1 per round of requests), and it is multiplied
+      by `decrease_factor` on a 429 response (AIMD), within [min_limit, max_limit].
+    - Rate: with `requests_per_second`, requests also take a token from a bucket of `burst` tokens.
+    - Backoff: on a 429 response, no request is sent until the delay given by the `Retry-After` or
+      rate-limit headers (or `default_backoff`, doubled at each retry) has passed, then the request
+      is queued again, up to `max_retries` times.
+    - Fairness: waiting requests are queued by key (the session) and admitted round robin, so that
+      a session sending many requests does not delay the others.
+    The OpenAI client should be built with max_retries=0, so that 429 responses reach the limiter.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        requests_per_second: float | None = None,
+        burst: int | None = None,
+        max_retries: int = 3,
+        default_backoff: float = 1.0,
+        wait_window: int = 1000,
+        log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.DEBUG,
+    ):
+        """
+        Args:
+            initial_limit: Initial max number of concurrent requests.
+            min_limit: Lower bound of the concurrency limit.
+            max_limit: Upper bound of the concurrency limit.
+            increase: Growth of the limit per `limit` successful requests.
+            decrease_factor: Factor applied to the limit on a 429 response.
+            requests_per_second: Refill rate of the token bucket. If None, the rate is not limited.
+            burst: Capacity of the token bucket, requests_per_second by default.
+            max_retries: Max number of retries of a rate-limited request.
+            default_backoff: Seconds to wait after a 429 response without delay headers.
+            wait_window: Number of recent queue wait times kept for the metrics.
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.requests_per_second = requests_per_second
+        self.burst = burst or max(1, int(requests_per_second or 1))
+        self.max_retries = max_retries
+        self.default_backoff = default_backoff
+        self.in_flight = 0
+        self._queues: collections.OrderedDict[str, Deque[asyncio.Future]] = (
+            collections.OrderedDict()
+        )
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._decreased_at = 0.0
+        self._timer: asyncio.TimerHandle | None = None
+        self._wait_times: Deque[float] = collections.deque(maxlen=wait_window)
+        self.counters: Dict[str, int] = {
+            "requests": 0,
+            "rate_limited": 0,
+            "retries": 0,
+            "max_queue_depth": 0,
+        }
+        self.logger = logging.getLogger("LLMLimiter")
+        self.logger.setLevel(log_lvl)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for admission."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limit, load, queue and wait time percentiles (seconds)."""
+        waits = sorted(self._wait_times)
+
+        def quantile(q: float) -> float | None:
+            return waits[min(len(waits) - 1, int(q * len(waits)))] if waits else None
+
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "paused_for": max(0.0, self._paused_until - time.monotonic()),
+            "wait_p50": quantile(0.5),
+            "wait_p95": quantile(0.95),
+            **self.counters,
+        }
+
+    def _refill(self, now: float):
+        if self.requests_per_second is None:
+            return
+        self._tokens = min(
+            self.burst,
+            self._tokens + (now - self._refilled_at) * self.requests_per_second,
+        )
+        self._refilled_at = now
+
+    def _wake_at(self, when: float):
+        """Runs the admission again at the given monotonic time."""
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_later(max(0.0, when - time.monotonic()), self._admit)
+
+    def _admit(self):
+        """Admits the waiting requests allowed by the limits, round robin over the keys."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queues and self.in_flight < int(self.limit):
+            now = time.monotonic()
+            if now < self._paused_until:
+                self._wake_at(self._paused_until)
+                return
+            self._refill(now)
+            if self.requests_per_second is not None and self._tokens < 1:
+                self._wake_at(now + (1 - self._tokens) / self.requests_per_second)
+                return
+            key, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            if future.done():
+                # cancelled while waiting
+                continue
+            if self.requests_per_second is not None:
+                self._tokens -= 1
+            self.in_flight += 1
+            future.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, key: str = "") -> AsyncIterator[None]:
+        """
+        Waits for the admission of a request and holds its slot for the enclosed block.
+
+        Args:
+            key: Fairness key of the request, e.g. the session id.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, collections.deque()).append(future)
+        self.counters["max_queue_depth"] = max(
+            self.counters["max_queue_depth"], self.queue_depth
+        )
+        start = time.monotonic()
+        self._admit()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # admitted and cancelled in the same iteration: give the slot back
+                self.in_flight -= 1
+                self._admit()
+            raise
+        self._wait_times.append(time.monotonic() - start)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._admit()
+
+    def _on_success(self):
+        # the limit grows only while it is reached, not while the load is below it
+        if self.in_flight >= int(self.limit):
+            self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+    def _on_rate_limited(self, exc: RateLimitError, started: float, attempt: int):
+        self.counters["rate_limited"] += 1
+        # the 429 responses of the requests sent before the last decrease count once
+        if started >= self._decreased_at:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            self._decreased_at = time.monotonic()
+        delay = retry_after(exc.response.headers) if exc.response is not None else None
+        if delay is None:
+            delay = self.default_backoff * 2**attempt
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self.logger.warning(
+            "LLM rate limited, limit %d, pausing %.2fs", int(self.limit), delay
+        )
+
+    async def call(
+        self,
+        request: Callable[[], Awaitable[Any]],
+        key: str = "",
+        stream: bool = False,
+    ) -> Any:
+        """
+        Sends an LLM request through the limiter, retrying it on 429 responses.
+
+        Args:
+            request: Coroutine function sending the request.
+            key: Fairness key of the request, e.g. the session id.
+            stream: If True, the request returns a completion stream: its slot is held until the
+                stream is exhausted or closed, and only its end counts as a success.
+
+        Returns:
+            Any: the result of the request, wrapped if stream is True.
+
+        Raises:
+            RateLimitError: If the request is still rate limited after max_retries retries.
+        """
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.counters["retries"] += 1
+            held = contextlib.AsyncExitStack()
+            await held.enter_async_context(self.slot(key))
+            self.counters["requests"] += 1
+            started = time.monotonic()
+            try:
+                result = await request()
+            except RateLimitError as exc:
+                self._on_rate_limited(exc, started, attempt)
+                await held.aclose()
+                if attempt == self.max_retries:
+                    raise
+                continue
+            except BaseException:
+                await held.aclose()
+                raise
+            if stream:
+                return _HeldStream(result, held, self._on_success)
+            self._on_success()
+            await held.aclose()
+            return result
+
+
+class _HeldStream:
+    """Completion stream holding the slot of its request until it is exhausted or closed."""
+
+    def __init__(
+        self,
+        stream: Any,
+        held: contextlib.AsyncExitStack,
+        on_success: Callable[[], None],
+    ):
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+        self._held: contextlib.AsyncExitStack | None = held
+        self._on_success = on_success
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    def __aiter__(self) -> "_HeldStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self._iterator.__anext__()
+        except StopAsyncIteration:
+            await self._release(success=True)
+            raise
+        except BaseException:
+            await self._release(success=False)
+            raise
+
+    async def close(self):
+        """Closes the stream and gives its slot back."""
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                await close()
+        finally:
+            await self._release(success=False)
+
+    async def _release(self, success: bool):
+        held, self._held = self._held, None
+        if held is None:
+            return
+        if success:
+            self._on_success()
+        await held.aclose()
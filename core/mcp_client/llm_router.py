@@ -0,0 +1,341 @@
+"""
+Routing of the LLM requests over several OpenAI-compatible endpoints.
+Requests are balanced on the least outstanding requests, optionally hedged after the p95
+latency, and endpoints failing repeatedly are ejected for a while.
+"""
+
+import asyncio
+import collections
+import logging
+import random
+import time
+from typing import Any, Deque, Dict, List, Literal, Optional, Set
+
+import httpx
+from openai import (
+    APIConnectionError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    InternalServerError,
+    RateLimitError,
+)
+
+# errors after which the request is sent to another endpoint
+_RETRYABLE_ERRORS = (APIConnectionError, RateLimitError, InternalServerError)
+
+
+class LLMEndpoint:
+    """An OpenAI-compatible endpoint of an LLMRouter."""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str | None = None,
+        model: str | None = None,
+        weight: float = 1.0,
+        name: str | None = None,
+    ):
+        """
+        Args:
+            base_url: Base URL of the OpenAI-compatible API (e.g. "https://api.groq.com/openai/v1").
+            api_key: API key of the endpoint.
+            model: Model served by this endpoint, replacing the model of the requests. If None, the
+                model of the request is kept.
+            weight: Relative share of the requests sent to the endpoint.
+            name: Name of the endpoint in logs and stats, base_url by default.
+        """
+        if weight <= 0:
+            raise ValueError("The weight of an endpoint must be positive")
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.weight = weight
+        self.name = name or base_url
+
+
+class _EndpointState:
+    """Client, load and health of an endpoint."""
+
+    def __init__(self, endpoint: LLMEndpoint, client: AsyncOpenAI, window: int):
+        self.endpoint = endpoint
+        self.client = client
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.latencies: Deque[float] = collections.deque(maxlen=window)
+
+    def is_ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def quantile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Operation:
+    """Callable namespace dispatching one API method (e.g. chat.completions.create)."""
+
+    def __init__(self, router: "LLMRouter", path: str):
+        self._router = router
+        self._path = path
+
+    async def __call__(self, **kwargs) -> Any:
+        return await self._router.request(self._path, **kwargs)
+
+
+class _Namespace:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class LLMRouter:
+    """
+    Drop-in replacement of AsyncOpenAI (`chat.completions.create` and `responses.parse`) routing each
+    request to one of several endpoints.
+
+    - Balancing: each request goes to the healthy endpoint with the fewest outstanding requests
+      relative to its weight, ties broken at random.
+    - Hedging: with `hedge=True`, a request still unanswered after the `hedge_quantile` latency of its
+      endpoint is duplicated on another endpoint; the first response wins and the other request is
+      cancelled. For streams, the latency is the time to the response headers.
+    - Failover: a request failing with a connection error, a 429 or a 5xx is sent to another endpoint,
+      up to `max_attempts` endpoints per request.
+    - Ejection: an endpoint failing `max_failures` times in a row gets no requests for `ejection_time`
+      seconds, then is tried again. If every endpoint is ejected, the first one back is used.
+    All the endpoints share one HTTP connection pool.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[LLMEndpoint],
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_delay: float = 1.0,
+        min_latency_samples: int = 20,
+        latency_window: int = 200,
+        max_attempts: int = 2,
+        max_failures: int = 3,
+        ejection_time: float = 30.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 60.0,
+        max_retries: int = 0,
+        log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.DEBUG,
+    ):
+        """
+        Args:
+            endpoints: The OpenAI-compatible endpoints.
+            hedge: If True, slow requests are duplicated on another endpoint.
+            hedge_quantile: Latency quantile of an endpoint after which its requests are hedged.
+            hedge_delay: Seconds before hedging while an endpoint has fewer than min_latency_samples latencies.
+            min_latency_samples: Number of latencies needed to use the quantile of an endpoint.
+            latency_window: Number of recent latencies kept per endpoint.
+            max_attempts: Max number of endpoints a request is sent to, hedges and failovers included.
+            max_failures: Consecutive failures after which an endpoint is ejected.
+            ejection_time: Seconds an ejected endpoint gets no requests.
+            max_connections: Max number of connections of the shared HTTP pool.
+            max_keepalive_connections: Max number of idle connections kept alive.
+            keepalive_expiry: Seconds an idle connection is kept alive.
+            timeout: HTTP timeout of each request, in seconds.
+            max_retries: Retries of the OpenAI client on the same endpoint, before failing over.
+        """
+        if not endpoints:
+            raise ValueError("LLMRouter needs at least one endpoint")
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_delay = hedge_delay
+        self.min_latency_samples = min_latency_samples
+        self.max_attempts = max_attempts
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=timeout,
+        )
+        self._endpoints = [
+            _EndpointState(
+                endpoint,
+                AsyncOpenAI(
+                    base_url=endpoint.base_url,
+                    # the openai client refuses a missing key, local servers do not need one
+                    api_key=endpoint.api_key or "none",
+                    http_client=self.http_client,
+                    max_retries=max_retries,
+                ),
+                latency_window,
+            )
+            for endpoint in endpoints
+        ]
+        self.hedged_requests = 0
+        self.chat = _Namespace(
+            completions=_Namespace(create=_Operation(self, "chat.completions.create"))
+        )
+        self.responses = _Namespace(parse=_Operation(self, "responses.parse"))
+        self.logger = logging.getLogger("LLMRouter")
+        self.logger.setLevel(log_lvl)
+
+    def _pick(self, exclude: Set[int]) -> int | None:
+        """Index of the endpoint for the next attempt of a request, None if none is left."""
+        now = time.monotonic()
+        candidates = [i for i in range(len(self._endpoints)) if i not in exclude]
+        if not candidates:
+            return None
+        healthy = [i for i in candidates if not self._endpoints[i].is_ejected(now)]
+        if not healthy:
+            return min(candidates, key=lambda i: self._endpoints[i].ejected_until)
+
+        def load(i: int) -> float:
+            state = self._endpoints[i]
+            return (state.outstanding + 1) / state.endpoint.weight
+
+        lowest = min(load(i) for i in healthy)
+        return random.choice([i for i in healthy if load(i) == lowest])
+
+    def _hedge_after(self, index: int) -> float:
+        """Seconds after which a request to an endpoint is hedged."""
+        state = self._endpoints[index]
+        if len(state.latencies) < self.min_latency_samples:
+            return self.hedge_delay
+        return state.quantile(self.hedge_quantile)
+
+    async def _attempt(self, index: int, path: str, kwargs: Dict[str, Any]) -> Any:
+        """Sends a request to an endpoint, recording its latency and outcome."""
+        state = self._endpoints[index]
+        if state.endpoint.model is not None:
+            kwargs = dict(kwargs, model=state.endpoint.model)
+        method: Any = state.client
+        for name in path.split("."):
+            method = getattr(method, name)
+        state.outstanding += 1
+        state.requests += 1
+        start = time.monotonic()
+        try:
+            result = await method(**kwargs)
+        except _RETRYABLE_ERRORS:
+            state.failures += 1
+            state.consecutive_failures += 1
+            if state.consecutive_failures >= self.max_failures:
+                state.ejected_until = time.monotonic() + self.ejection_time
+                self.logger.warning(
+                    "LLM endpoint %s ejected for %.0fs after %d failures",
+                    state.endpoint.name,
+                    self.ejection_time,
+                    state.consecutive_failures,
+                )
+            raise
+        finally:
+            state.outstanding -= 1
+        state.latencies.append(time.monotonic() - start)
+        state.consecutive_failures = 0
+        state.ejected_until = 0.0
+        return result
+
+    @staticmethod
+    def _discard(task: asyncio.Task):
+        """Cancels a losing attempt, closing its stream if it already returned one."""
+
+        def close(done: asyncio.Task):
+            if done.cancelled() or done.exception() is not None:
+                return
+            result = done.result()
+            if hasattr(result, "close"):
+                asyncio.ensure_future(result.close())
+
+        task.cancel()
+        task.add_done_callback(close)
+
+    async def request(self, path: str, **kwargs) -> Any:
+        """
+        Sends a request to the endpoints, see the class description.
+
+        Args:
+            path: The API method, "chat.completions.create" or "responses.parse".
+            **kwargs: The arguments of the method.
+
+        Returns:
+            Any: the response of the first successful attempt.
+
+        Raises:
+            Exception: the error of the last attempt if all failed, or any non retryable error.
+        """
+        tried: Set[int] = set()
+        attempts: Dict[asyncio.Task, int] = {}
+
+        def launch() -> bool:
+            index = self._pick(tried)
+            if index is None or len(tried) >= self.max_attempts:
+                return False
+            tried.add(index)
+            task = asyncio.ensure_future(self._attempt(index, path, kwargs))
+            attempts[task] = index
+            return True
+
+        launch()
+        last_error: BaseException | None = None
+        hedge_at = (
+            time.monotonic() + self._hedge_after(next(iter(attempts.values())))
+            if self.hedge
+            else None
+        )
+        try:
+            while attempts:
+                timeout = None
+                if hedge_at is not None:
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                done, _ = await asyncio.wait(
+                    attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedge_at = None
+                    if launch():
+                        self.hedged_requests += 1
+                        self.logger.debug("LLM request hedged")
+                    continue
+                for task in done:
+                    index = attempts.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    if not isinstance(last_error, _RETRYABLE_ERRORS):
+                        raise last_error
+                    self.logger.warning(
+                        "LLM endpoint %s failed: %s",
+                        self._endpoints[index].endpoint.name,
+                        last_error,
+                    )
+                if not attempts and launch():
+                    hedge_at = None
+            raise last_error
+        finally:
+            for task in attempts:
+                self._discard(task)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Load, latency and health of each endpoint."""
+        now = time.monotonic()
+        return [
+            {
+                "name": state.endpoint.name,
+                "weight": state.endpoint.weight,
+                "outstanding": state.outstanding,
+                "requests": state.requests,
+                "failures": state.failures,
+                "ejected": state.is_ejected(now),
+                "p50": state.quantile(0.5),
+                "p95": state.quantile(0.95),
+            }
+            for state in self._endpoints
+        ]
+
+    async def close(self):
+        """Closes the shared HTTP connection pool."""
+        await self.http_client.aclose()
@@ -11,6 +11,10 @@ from abc import ABC, abstractmethod
 class Memory(ABC):
     """Abstract base class for conversational memory."""
 
+    # True for a store doing blocking I/O (e.g. a database): the session history is then loaded in
+    # a worker thread. An in-memory store is read on the event loop.
+    blocking: bool = False
+
     @abstractmethod
     def add_message(self, session_id: str, message: dict) -> None:
         """Add a message to memory.
@@ -12,6 +12,8 @@ class ToolMessage(BaseModel):
     tool: str
     arguments: Dict[str, Any]
     result: str
+    # set when the result was truncated for the LLM, see MCPWIPClient.get_tool_result
+    result_handle: Optional[str] = None
 
 
 class AssistantMessage(BaseModel):
@@ -21,6 +23,13 @@ class AssistantMessage(BaseModel):
     content: Optional[str] = None
 
 
+class WidgetUriMessage(BaseModel):
+    """Widget selected by the assistant, streamed before the final assistant message"""
+
+    role: str = Field(default="widget")
+    uri: str
+
+
 class ParameterKV(BaseModel):
     """Generic dictionary field to be included in ValidResponse"""
 
@@ -39,3 +48,33 @@ class ValidResponse(BaseModel):
         default_factory=list, description="Dynamic parameters as list of key/value"
     )
     text: str = Field("", description="the model text response")
+
+
+class TokenUsage(BaseModel):
+    """Tokens used by LLM requests"""
+
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # prompt tokens served from the provider prompt cache (included in prompt_tokens)
+    cached_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        """Prompt and completion tokens"""
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, usage: "TokenUsage"):
+        """Adds the tokens of usage to this one"""
+        self.requests += usage.requests
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+        self.cached_tokens += usage.cached_tokens
+
+
+class TurnUsage(TokenUsage):
+    """Tokens used by the LLM requests of a chat turn"""
+
+    started_at: float
+    # widget selected by the final answer of the turn, if any
+    uri: Optional[str] = None
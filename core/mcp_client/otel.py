@@ -0,0 +1,47 @@
+"""OpenTelemetry exporter of the MCPWIPClient telemetry (requires the otel extra)."""
+
+from typing import Any, ContextManager, Dict
+
+from opentelemetry import metrics, trace
+
+from .telemetry import TelemetryHook
+
+
+class OpenTelemetryHook(TelemetryHook):
+    """
+    Exports each chat turn stage as an OpenTelemetry span (nested in the span of its turn), and
+    its duration and errors as OpenTelemetry metrics.
+    """
+
+    def __init__(
+        self,
+        tracer: trace.Tracer | None = None,
+        meter: metrics.Meter | None = None,
+    ):
+        """
+        Args:
+            tracer: The tracer of the spans, the global "mcp-wip" tracer by default.
+            meter: The meter of the metrics, the global "mcp-wip" meter by default.
+        """
+        self.tracer = tracer or trace.get_tracer("mcp-wip")
+        self.meter = meter or metrics.get_meter("mcp-wip")
+        self.durations = self.meter.create_histogram(
+            "mcp_wip.stage.duration",
+            unit="s",
+            description="Duration of the chat turn stages.",
+        )
+        self.errors = self.meter.create_counter(
+            "mcp_wip.stage.errors",
+            description="Chat turn stages that raised an exception.",
+        )
+
+    def span(self, stage: str, attributes: Dict[str, Any]) -> ContextManager:
+        return self.tracer.start_as_current_span(stage, attributes=attributes)
+
+    def record(
+        self, stage: str, duration: float, labels: Dict[str, str], error: bool
+    ) -> None:
+        attributes = {"stage": stage, **labels}
+        self.durations.record(duration, attributes=attributes)
+        if error:
+            self.errors.add(1, attributes=attributes)
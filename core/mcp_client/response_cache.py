@@ -0,0 +1,282 @@
+"""
+Semantic cache of the final answers of first chat turns.
+A first turn similar enough to a recent one, offered the same widgets, reuses its answer
+without any LLM call; parameters taken from tool results are fetched again.
+"""
+
+import asyncio
+import collections
+import logging
+import math
+import re
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+class CachedResponse(NamedTuple):
+    """A cached final answer and how to refresh its tool-backed parameters."""
+
+    # the ValidResponse dict
+    response: Dict[str, Any]
+    # (tool name, arguments) of the calls to make again on a hit
+    tool_calls: List[Tuple[str, Dict[str, Any]]]
+    # parameter name -> (index in tool_calls, path of its value in the tool result)
+    bindings: Dict[str, Tuple[int, Tuple[Any, ...]]]
+
+
+class _Entry(NamedTuple):
+    uris: FrozenSet[str]
+    vector: List[float]
+    expiry: float
+    cached: CachedResponse
+    # normalized entities of the message the answer depends on, a similar message must contain them all
+    literals: FrozenSet[str]
+
+
+def _walk(value: Any, path: Tuple[Any, ...] = ()) -> Iterator[Tuple[Tuple, Any]]:
+    """Yields (path, value) of every node of a JSON value."""
+    yield path, value
+    if isinstance(value, dict):
+        for k, v in value.items():
+            yield from _walk(v, path + (k,))
+    elif isinstance(value, list):
+        for i, v in enumerate(value):
+            yield from _walk(v, path + (i,))
+
+
+def _same(a: Any, b: Any) -> bool:
+    return type(a) is type(b) and a == b
+
+
+def _scalars(value: Any) -> Iterator[str]:
+    """Yields the strings and numbers of a JSON value, as text."""
+    for _, v in _walk(value):
+        if isinstance(v, (str, int, float)) and not isinstance(v, bool) and v != "":
+            yield str(v)
+
+
+def bind_parameters(
+    response: Dict[str, Any], tool_outputs: List[Tuple[str, Dict[str, Any], Any]]
+) -> CachedResponse:
+    """
+    Builds the cache entry of an answer, finding which parameters come from the tool results of the turn.
+
+    A parameter is tool-backed when its value is found in a tool result and is not one of the
+    arguments of that call (e.g. the stock levels returned for a sku, not the sku itself).
+
+    Args:
+        response: The ValidResponse dict of the final answer.
+        tool_outputs: (tool name, arguments, structured result) of the tool calls of the turn.
+
+    Returns:
+        CachedResponse: the answer with the tool calls to make again and the parameter bindings.
+    """
+    calls: List[Tuple[str, Dict[str, Any]]] = []
+    bindings: Dict[str, Tuple[int, Tuple[Any, ...]]] = {}
+    for param in response.get("parameters", []):
+        value = param.get("value")
+        if value is None or isinstance(value, bool) or value == "":
+            continue
+        for name, args, structured in tool_outputs:
+            if any(_same(value, arg) for arg in (args or {}).values()):
+                continue
+            path = next((p for p, v in _walk(structured) if _same(v, value)), None)
+            if path is None:
+                continue
+            if (name, args) not in calls:
+                calls.append((name, args))
+            bindings[param["name"]] = (calls.index((name, args)), path)
+            break
+    return CachedResponse(response=response, tool_calls=calls, bindings=bindings)
+
+
+def rebind_parameters(
+    cached: CachedResponse, results: List[Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    Returns the cached answer with its tool-backed parameters read from fresh tool results.
+
+    Args:
+        cached: The cache entry.
+        results: The structured results of cached.tool_calls, made again.
+
+    Returns:
+        Dict[str, Any] | None: the refreshed ValidResponse dict, None if a result no longer has the
+            bound path.
+    """
+    parameters = []
+    for param in cached.response.get("parameters", []):
+        param = dict(param)
+        if param["name"] in cached.bindings:
+            index, path = cached.bindings[param["name"]]
+            value = results[index]
+            try:
+                for key in path:
+                    value = value[key]
+            except (KeyError, IndexError, TypeError):
+                return None
+            param["value"] = value
+        parameters.append(param)
+    return dict(cached.response, parameters=parameters)
+
+
+class SemanticResponseCache:
+    """
+    Cache of first-turn answers, keyed on the embedding of the normalized user message and on
+    the set of widget uris offered in the turn.
+
+    A lookup matches an entry with the same uris whose cosine similarity with the message is at
+    least `threshold`, and whose message entities (tool call arguments and parameter values taken
+    from the message) all appear in the new message; identical normalized messages match without
+    computing any embedding.
+    Entries expire after `ttl` seconds and the least recently used are evicted beyond `max_entries`.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], Sequence[float]],
+        threshold: float = 0.92,
+        ttl: float = 600.0,
+        max_entries: int = 512,
+        log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.DEBUG,
+    ):
+        """
+        Args:
+            embed: Function computing the embedding of a text (e.g. a sentence-transformers model encode).
+                It runs in a worker thread.
+            threshold: Min cosine similarity between two messages to reuse an answer.
+            ttl: Seconds an answer is reused.
+            max_entries: Max number of cached answers.
+        """
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: collections.OrderedDict[Tuple[str, FrozenSet[str]], _Entry] = (
+            collections.OrderedDict()
+        )
+        # embeddings of the last messages looked up, reused when their answer is stored
+        self._vectors: collections.OrderedDict[str, List[float]] = (
+            collections.OrderedDict()
+        )
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0}
+        self.logger = logging.getLogger("SemanticResponseCache")
+        self.logger.setLevel(log_lvl)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        """Lowercase message without punctuation and repeated whitespace."""
+        return " ".join(_PUNCTUATION.sub(" ", message.lower()).split())
+
+    async def _vector(self, text: str) -> List[float]:
+        """Unit-length embedding of a normalized text."""
+        vector = self._vectors.get(text)
+        if vector is None:
+            raw = await asyncio.to_thread(self.embed, text)
+            norm = math.sqrt(sum(x * x for x in raw)) or 1.0
+            vector = [float(x) / norm for x in raw]
+            self._vectors[text] = vector
+            while len(self._vectors) > 256:
+                self._vectors.popitem(last=False)
+        else:
+            self._vectors.move_to_end(text)
+        return vector
+
+    def _literals(self, text: str, cached: CachedResponse) -> FrozenSet[str]:
+        """
+        The entities a similar message must contain to reuse the answer: the arguments of the
+        tool calls, and the parameter values that are not tool-backed but come from the message.
+        """
+        literals = set()
+        for _, args in cached.tool_calls:
+            literals.update(self.normalize(v) for v in _scalars(args))
+        padded = f" {text} "
+        for param in cached.response.get("parameters") or []:
+            if param.get("name") in cached.bindings:
+                continue
+            for value in _scalars(param.get("value")):
+                value = self.normalize(value)
+                if f" {value} " in padded:
+                    literals.add(value)
+        literals.discard("")
+        return frozenset(literals)
+
+    def clear(self):
+        """Drops all the cached answers."""
+        self._entries.clear()
+
+    async def get(self, message: str, uris: List[str]) -> Optional[CachedResponse]:
+        """
+        Looks up the answer of a similar first turn.
+
+        Args:
+            message: The user message.
+            uris: The widget uris offered in the turn.
+
+        Returns:
+            CachedResponse | None: the cached answer, None on a miss.
+        """
+        text, uri_set, now = self.normalize(message), frozenset(uris), time.monotonic()
+        entry = self._entries.get((text, uri_set))
+        if entry is None and self._entries:
+            vector = await self._vector(text)
+            best = 0.0
+            padded = f" {text} "
+            for key, candidate in self._entries.items():
+                if candidate.uris != uri_set or candidate.expiry <= now:
+                    continue
+                # "stock for sku2222" must not reuse the answer of "stock for sku1111"
+                if not all(f" {lit} " in padded for lit in candidate.literals):
+                    continue
+                similarity = sum(map(float.__mul__, vector, candidate.vector))
+                if similarity >= self.threshold and similarity > best:
+                    best, entry, text = similarity, candidate, key[0]
+        if entry is None or entry.expiry <= now:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end((text, uri_set))
+        self.stats["hits"] += 1
+        return entry.cached
+
+    async def put(self, message: str, uris: List[str], cached: CachedResponse):
+        """
+        Stores the answer of a first turn.
+
+        Args:
+            message: The user message.
+            uris: The widget uris offered in the turn.
+            cached: The answer, see bind_parameters.
+        """
+        text = self.normalize(message)
+        vector = await self._vector(text)
+        key = (text, frozenset(uris))
+        self._entries[key] = _Entry(
+            uris=key[1],
+            vector=vector,
+            expiry=time.monotonic() + self.ttl,
+            cached=cached,
+            literals=self._literals(text, cached),
+        )
+        self._entries.move_to_end(key)
+        now = time.monotonic()
+        for stale in [k for k, e in self._entries.items() if e.expiry <= now]:
+            del self._entries[stale]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,211 @@
+"""
+Pool of long-lived MCP sessions shared by the MCPWIPClient operations.
+Sessions are opened once and reused, instead of paying the transport handshake
+(and the subprocess spawn for stdio transports) on every request.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Literal
+
+import anyio
+import httpx
+import mcp.types
+from fastmcp import Client
+from fastmcp.client.transports import ClientTransport, StdioTransport
+from mcp.shared.exceptions import McpError
+
+
+class MCPSessionPoolException(Exception):
+    """
+    Exception class for session pool errors in MCPSessionPool.
+
+    Raised when a pooled session cannot be (re)connected.
+    """
+
+
+class _PooledSession:
+    """A pooled fastmcp Client with its bookkeeping."""
+
+    def __init__(self, client: Client):
+        self.client = client
+        self.last_used = 0.0
+        self.broken = True
+        self.in_flight = 0
+        self.lock = asyncio.Lock()
+
+
+class MCPSessionPool:
+    """
+    Fixed-size pool of connected fastmcp Clients.
+
+    Each member keeps its MCP session open between calls. An MCP session multiplexes
+    concurrent requests, so members are shared: `acquire()` hands out the member with
+    the fewest requests in flight. Members are pinged before use when they have been
+    idle longer than `health_check_interval` and reconnected when the ping, or a call
+    made through them, fails at the transport level. Errors raised by the server itself
+    (tool errors, MCP protocol errors, timeouts) leave the session untouched.
+    """
+
+    # errors that signal a broken connection, the session is reopened on its next use
+    transport_errors = (
+        anyio.ClosedResourceError,
+        anyio.BrokenResourceError,
+        anyio.EndOfStream,
+        ConnectionError,
+        httpx.TransportError,
+    )
+
+    def __init__(
+        self,
+        transport: ClientTransport | Dict[str, Any],
+        size: int = 1,
+        health_check_interval: float = 30.0,
+        health_check_timeout: float = 5.0,
+        client_kwargs: Dict[str, Any] = None,
+        log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.DEBUG,
+    ):
+        """
+        Args:
+            transport: Either a transport object or connection config dict for the MCP server.
+            size: Number of sessions kept open and shared by the concurrent requests.
+            health_check_interval: Idle seconds after which a session is pinged before reuse.
+            health_check_timeout: Max seconds to wait for the ping answer.
+            client_kwargs: Extra keyword arguments for each fastmcp Client (e.g. message_handler).
+        """
+        if size < 1:
+            raise ValueError("The session pool size must be at least 1")
+        self.transport = transport
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.client_kwargs = client_kwargs or {}
+        self.members: List[_PooledSession] = [
+            _PooledSession(Client(self._member_transport(i), **self.client_kwargs))
+            for i in range(size)
+        ]
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self.logger = logging.getLogger("MCPSessionPool")
+        self.logger.setLevel(log_lvl)
+
+    def _member_transport(self, index: int) -> ClientTransport | Dict[str, Any]:
+        """
+        Returns the transport for the index-th member.
+
+        A stdio transport owns a single subprocess, so every member after the first
+        gets its own copy of it; the other transports open a new connection per session.
+        """
+        transport = self.transport
+        if index > 0 and isinstance(transport, StdioTransport):
+            return StdioTransport(
+                transport.command,
+                list(transport.args),
+                env=transport.env,
+                cwd=transport.cwd,
+                keep_alive=transport.keep_alive,
+            )
+        return transport
+
+    @property
+    def started(self) -> bool:
+        """True if the pool has been started and not closed."""
+        return self._started
+
+    @classmethod
+    def is_transport_error(cls, exc: BaseException) -> bool:
+        """True if exc signals a broken connection: a transport error or an MCP "connection closed" error."""
+        if isinstance(exc, McpError):
+            return exc.error.code == mcp.types.CONNECTION_CLOSED
+        return isinstance(exc, cls.transport_errors)
+
+    async def start(self):
+        """
+        Opens all the sessions of the pool. Safe to call more than once.
+
+        Members that fail to connect are kept in the pool and retried on their next use.
+        """
+        async with self._start_lock:
+            if self._started:
+                return
+            results = await asyncio.gather(
+                *(self._connect(m) for m in self.members), return_exceptions=True
+            )
+            for exc in results:
+                if isinstance(exc, Exception):
+                    self.logger.warning("MCP session failed to connect: %s", exc)
+            self._started = True
+
+    async def close(self):
+        """Closes all the sessions of the pool, to be called on application shutdown."""
+        async with self._start_lock:
+            self._started = False
+            for member in self.members:
+                try:
+                    await member.client.close()
+                except asyncio.CancelledError:
+                    # the session task of a connection abandoned by a timeout is already cancelled
+                    if asyncio.current_task().cancelling():
+                        raise
+                except Exception as exc:
+                    self.logger.warning("Error closing MCP session: %s", exc)
+                member.broken = True
+
+    async def _connect(self, member: _PooledSession):
+        """(Re)connects a pool member."""
+        if member.client.is_connected():
+            await member.client.close()
+        try:
+            await member.client.__aenter__()
+        except asyncio.CancelledError:
+            # connection abandoned (e.g. by a timeout): fastmcp leaves its session task running
+            task = member.client._session_state.session_task
+            if task is not None:
+                task.cancel()
+            member.broken = True
+            raise
+        except Exception as exc:
+            member.broken = True
+            raise MCPSessionPoolException(f"Unable to connect: {exc}") from exc
+        member.broken = False
+        member.last_used = time.monotonic()
+
+    async def _ensure_healthy(self, member: _PooledSession):
+        """Reconnects the member if broken, or if it does not answer the ping after a long idle."""
+        if not member.broken and member.client.is_connected():
+            if time.monotonic() - member.last_used < self.health_check_interval:
+                return
+            try:
+                await asyncio.wait_for(
+                    member.client.ping(), timeout=self.health_check_timeout
+                )
+                return
+            except Exception as exc:
+                self.logger.warning("MCP session health check failed: %s", exc)
+        self.logger.debug("Reconnecting MCP session %s", member.client.name)
+        await self._connect(member)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Client]:
+        """
+        Gives access to the connected fastmcp Client with the fewest requests in flight.
+
+        Yields:
+            Client: a connected client, possibly shared with other concurrent callers.
+        """
+        await self.start()
+        member = min(self.members, key=lambda m: m.in_flight)
+        member.in_flight += 1
+        try:
+            async with member.lock:
+                await self._ensure_healthy(member)
+            yield member.client
+        except Exception as exc:
+            if self.is_transport_error(exc):
+                member.broken = True
+            raise
+        finally:
+            member.in_flight -= 1
+            member.last_used = time.monotonic()
@@ -0,0 +1,175 @@
+"""
+Per-session scheduling of the chat turns of MCPWIPClient.
+Turns of the same session run one at a time, the messages and context injections received
+while a turn is running are merged into the next turn.
+"""
+
+import asyncio
+import contextlib
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Literal
+
+
+class _Batch:
+    """User messages waiting for the next turn of a session, answered together."""
+
+    def __init__(self):
+        self.messages: List[str] = []
+        self.callers = 0
+        self.task: asyncio.Task | None = None
+
+
+class _SessionState:
+    """Lock and pending work of a session."""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.next_batch: _Batch | None = None
+        self.contexts: List[str] = []
+        self.holders = 0
+
+
+class SessionScheduler:
+    """
+    Serializes the chat turns of each session and coalesces the work received during a turn.
+
+    - A turn holds the lock of its session, so that concurrent requests do not interleave their
+      memory reads and writes.
+    - User messages received while a turn is running are queued in a single batch: they are joined
+      into one user message and answered by one turn, whose result is returned to all their callers.
+    - Context injections received while a turn is running are written to memory, as one message,
+      right after the turn and before the next one.
+    - The state of a session is dropped as soon as it has no turn running nor queued.
+    """
+
+    def __init__(
+        self,
+        context_writer: Callable[[str, List[str]], None],
+        message_separator: str = "\n\n",
+        log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.DEBUG,
+    ):
+        """
+        Args:
+            context_writer: Function storing the given context injections of a session in memory.
+            message_separator: Separator of the user messages merged into one turn.
+        """
+        self.context_writer = context_writer
+        self.message_separator = message_separator
+        self._sessions: Dict[str, _SessionState] = {}
+        self.logger = logging.getLogger("SessionScheduler")
+        self.logger.setLevel(log_lvl)
+
+    def __len__(self) -> int:
+        """Number of sessions with a turn running or queued."""
+        return len(self._sessions)
+
+    def is_busy(self, session_id: str) -> bool:
+        """True if the session has a turn running or queued."""
+        return session_id in self._sessions
+
+    @contextlib.asynccontextmanager
+    async def exclusive(self, session_id: str) -> AsyncIterator[None]:
+        """
+        Runs the enclosed block as the only turn of the session, waiting for the previous ones.
+
+        On exit, the context injections received meanwhile are written to memory.
+        """
+        state = self._sessions.setdefault(session_id, _SessionState())
+        state.holders += 1
+        try:
+            async with state.lock:
+                try:
+                    yield
+                finally:
+                    if state.contexts:
+                        contexts, state.contexts = state.contexts, []
+                        self.context_writer(session_id, contexts)
+        finally:
+            self._release(session_id, state)
+
+    def _release(self, session_id: str, state: _SessionState):
+        """Drops a holder of the session state, and the state itself once it has none."""
+        state.holders -= 1
+        if state.holders == 0 and self._sessions.get(session_id) is state:
+            del self._sessions[session_id]
+            # contexts left by a turn cancelled before it started
+            if state.contexts:
+                self.context_writer(session_id, state.contexts)
+
+    async def run_turn(
+        self,
+        session_id: str,
+        message: str,
+        turn: Callable[[str], Awaitable[Any]],
+    ) -> Any:
+        """
+        Runs turn(message) as soon as the session is free, merged with the messages received meanwhile.
+
+        The turn runs in its own task: it is cancelled only when all the callers merged into it are cancelled.
+
+        Args:
+            session_id: ID of the conversation session.
+            message: The user message.
+            turn: Coroutine function running a chat turn for a user message.
+
+        Returns:
+            Any: the result of the turn, shared by all the merged callers.
+        """
+        state = self._sessions.setdefault(session_id, _SessionState())
+        batch = state.next_batch
+        if batch is None:
+            batch = state.next_batch = _Batch()
+            # the batch holds the session state until its task is done, even if cancelled before starting
+            state.holders += 1
+            batch.task = asyncio.ensure_future(
+                self._run_batch(session_id, state, batch, turn)
+            )
+            batch.task.add_done_callback(
+                lambda _: self._end_batch(session_id, state, batch)
+            )
+        else:
+            self.logger.debug(
+                "Session %s busy, message merged into the next turn", session_id
+            )
+        batch.messages.append(message)
+        batch.callers += 1
+        try:
+            return await asyncio.shield(batch.task)
+        except asyncio.CancelledError:
+            batch.callers -= 1
+            if batch.callers == 0:
+                batch.task.cancel()
+            raise
+
+    async def _run_batch(
+        self,
+        session_id: str,
+        state: _SessionState,
+        batch: _Batch,
+        turn: Callable[[str], Awaitable[Any]],
+    ) -> Any:
+        """Waits for the session and runs the turn of a batch."""
+        async with self.exclusive(session_id):
+            # the messages received from now on go to the next batch
+            state.next_batch = None
+            return await turn(self.message_separator.join(batch.messages))
+
+    def _end_batch(self, session_id: str, state: _SessionState, batch: _Batch):
+        """Releases the session state held by a finished batch."""
+        if state.next_batch is batch:
+            state.next_batch = None
+        self._release(session_id, state)
+
+    def add_context(self, session_id: str, context: str):
+        """
+        Writes a context injection to memory, or queues it after the running turn of the session.
+
+        Args:
+            session_id: ID of the conversation session.
+            context: The context message content.
+        """
+        state = self._sessions.get(session_id)
+        if state is None:
+            self.context_writer(session_id, [context])
+        else:
+            state.contexts.append(context)
@@ -0,0 +1,223 @@
+"""
+Instrumentation of the chat turn stages of MCPWIPClient.
+Each stage runs in a timed span, aggregated in histograms exported in the Prometheus text format
+and forwarded to pluggable hooks (e.g. OpenTelemetry, see otel.py).
+"""
+
+import bisect
+import contextlib
+import logging
+import time
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# seconds, from a cached tool call to a slow LLM completion
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+
+class TelemetryHook:
+    """
+    Interface of the telemetry exporters. Both methods are no-ops, override the ones needed.
+    """
+
+    def span(self, stage: str, attributes: Dict[str, Any]) -> ContextManager:
+        """
+        Context manager enclosing the execution of a stage, e.g. a tracing span.
+
+        Args:
+            stage: Name of the stage.
+            attributes: Labels and attributes of the stage (str, bool, int or float values).
+        """
+        return contextlib.nullcontext()
+
+    def record(
+        self, stage: str, duration: float, labels: Dict[str, str], error: bool
+    ) -> None:
+        """
+        Records the outcome of a stage, e.g. in metrics.
+
+        Args:
+            stage: Name of the stage.
+            duration: Duration of the stage in seconds.
+            labels: Low-cardinality labels of the stage.
+            error: True if the stage raised an exception.
+        """
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, value: float, error: bool):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.errors += error
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_metric(
+    name: str,
+    kind: str,
+    description: str,
+    samples: List[Tuple[Dict[str, Any], float]],
+) -> str:
+    """
+    Renders a metric in the Prometheus text exposition format.
+
+    Args:
+        name: Name of the metric.
+        kind: Prometheus type, "counter" or "gauge".
+        description: HELP text of the metric.
+        samples: (labels, value) of each series.
+
+    Returns:
+        str: the HELP, TYPE and sample lines of the metric.
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    lines.extend(
+        f"{name}{_format_labels(labels)} {float(value)!r}" for labels, value in samples
+    )
+    return "\n".join(lines) + "\n"
+
+
+class Telemetry:
+    """
+    Timed spans of the chat turn stages, with a duration histogram and an error counter per stage
+    and labels. The spans and their durations are forwarded to the hooks.
+    """
+
+    def __init__(
+        self,
+        hooks: Optional[List[TelemetryHook]] = None,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        prefix: str = "mcp_wip",
+    ):
+        """
+        Args:
+            hooks: The exporters of the spans and durations.
+            buckets: Upper bounds, in seconds, of the duration histograms.
+            prefix: Prefix of the Prometheus metric names.
+        """
+        self.hooks: List[TelemetryHook] = list(hooks or [])
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._histograms: Dict[Tuple[str, _Labels], _Histogram] = {}
+        self.logger = logging.getLogger("Telemetry")
+
+    @contextlib.contextmanager
+    def span(
+        self, stage: str, labels: Optional[Dict[str, str]] = None, **attributes
+    ) -> Iterator[None]:
+        """
+        Times the enclosed block as a stage.
+
+        Args:
+            stage: Name of the stage.
+            labels: Low-cardinality labels, part of the metric series (e.g. the tool name).
+            **attributes: Attributes of the span only (e.g. the session id). None values are dropped.
+        """
+        labels = labels or {}
+        span_attributes = {
+            **labels,
+            **{k: v for k, v in attributes.items() if v is not None},
+        }
+        with contextlib.ExitStack() as stack:
+            for hook in self.hooks:
+                stack.enter_context(hook.span(stage, span_attributes))
+            start = time.perf_counter()
+            error = False
+            try:
+                yield
+            except Exception:
+                error = True
+                raise
+            finally:
+                self.observe(stage, time.perf_counter() - start, labels, error)
+
+    def observe(
+        self,
+        stage: str,
+        duration: float,
+        labels: Optional[Dict[str, str]] = None,
+        error: bool = False,
+    ):
+        """
+        Records the duration of a stage timed outside a span.
+
+        Args:
+            stage: Name of the stage.
+            duration: Duration in seconds.
+            labels: Low-cardinality labels of the stage.
+            error: True if the stage failed.
+        """
+        labels = labels or {}
+        key = (stage, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = _Histogram(self.buckets)
+        histogram.observe(duration, error)
+        for hook in self.hooks:
+            try:
+                hook.record(stage, duration, labels, error)
+            except Exception:  # pylint: disable=broad-exception-caught
+                self.logger.exception("Telemetry hook %r failed", hook)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, errors and mean duration of each stage, over all its labels."""
+        summary: Dict[str, Dict[str, float]] = {}
+        for (stage, _), histogram in self._histograms.items():
+            entry = summary.setdefault(stage, {"count": 0, "errors": 0, "sum": 0.0})
+            entry["count"] += histogram.count
+            entry["errors"] += histogram.errors
+            entry["sum"] += histogram.sum
+        for entry in summary.values():
+            entry["mean"] = entry["sum"] / entry["count"] if entry["count"] else 0.0
+        return summary
+
+    def render_prometheus(self) -> str:
+        """
+        Renders the stage histograms and error counters in the Prometheus text exposition format.
+        """
+        name = f"{self.prefix}_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Duration of the chat turn stages.",
+            f"# TYPE {name} histogram",
+        ]
+        errors = []
+        for (stage, labels), histogram in sorted(self._histograms.items()):
+            series = {"stage": stage, **dict(labels)}
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{name}_bucket{_format_labels({**series, 'le': le})} {cumulative}"
+                )
+            lines.append(f"{name}_sum{_format_labels(series)} {histogram.sum!r}")
+            lines.append(f"{name}_count{_format_labels(series)} {histogram.count}")
+            errors.append((series, histogram.errors))
+        return (
+            "\n".join(lines)
+            + "\n"
+            + prometheus_metric(
+                f"{self.prefix}_stage_errors_total",
+                "counter",
+                "Chat turn stages that raised an exception.",
+                errors,
+            )
+        )
@@ -0,0 +1,215 @@
+"""
+Token usage accounting of the LLM requests of MCPWIPClient, per turn, session, widget and overall,
+with per-session and global token budgets.
+"""
+
+import collections
+import logging
+import time
+from typing import Any, Deque, Dict, Literal, Optional
+
+from .models import TokenUsage, TurnUsage
+
+
+class TokenBudgetExceeded(Exception):
+    """Raised when a chat turn is rejected because a token budget is exhausted."""
+
+
+def usage_from_response(response: Any) -> TokenUsage | None:
+    """
+    Reads the token usage of an LLM response.
+
+    Supports the chat completions usage (prompt/completion tokens, also sent in the last chunk of a
+    stream with include_usage) and the responses API usage (input/output tokens).
+
+    Returns:
+        TokenUsage | None: the usage of the request, None if the response has none.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    if hasattr(usage, "prompt_tokens"):
+        prompt, completion = usage.prompt_tokens, usage.completion_tokens
+        details = getattr(usage, "prompt_tokens_details", None)
+    else:
+        prompt, completion = usage.input_tokens, usage.output_tokens
+        details = getattr(usage, "input_tokens_details", None)
+    return TokenUsage(
+        requests=1,
+        prompt_tokens=prompt or 0,
+        completion_tokens=completion or 0,
+        cached_tokens=getattr(details, "cached_tokens", None) or 0,
+    )
+
+
+class _SessionUsage:
+    def __init__(self, max_turns: int):
+        self.total = TokenUsage()
+        self.turns: Deque[TurnUsage] = collections.deque(maxlen=max_turns)
+
+
+class TokenUsageTracker:
+    """
+    Accounts the tokens of the LLM requests by turn, session and selected widget, and enforces
+    token budgets on the new turns.
+
+    When a session has used `session_budget` tokens, or all the sessions together `global_budget`
+    tokens, its next turns are either rejected with TokenBudgetExceeded (`action="reject"`) or run
+    with a shrunk context (`action="shrink"`): only the last `shrink_history_turns` turns of history
+    and a widget catalog of `shrink_catalog_tokens` tokens.
+    Sessions are kept in LRU order, up to `max_sessions`.
+    """
+
+    def __init__(
+        self,
+        session_budget: int | None = None,
+        global_budget: int | None = None,
+        action: Literal["shrink", "reject"] = "reject",
+        shrink_history_turns: int = 1,
+        shrink_catalog_tokens: int = 1000,
+        max_sessions: int = 10000,
+        max_turns_per_session: int = 100,
+        log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.DEBUG,
+    ):
+        """
+        Args:
+            session_budget: Max total tokens (prompt and completion) of a session. None for no limit.
+            global_budget: Max total tokens of all the sessions, since the start or the last reset. None for no limit.
+            action: What happens to the turns over budget, "reject" or "shrink".
+            shrink_history_turns: Number of previous turns of history kept in a shrunk context.
+            shrink_catalog_tokens: Token budget of the widget catalog in a shrunk context.
+            max_sessions: Max number of sessions accounted, the least recently used are dropped.
+            max_turns_per_session: Max number of turns kept in the report of a session.
+        """
+        self.session_budget = session_budget
+        self.global_budget = global_budget
+        self.action = action
+        self.shrink_history_turns = shrink_history_turns
+        self.shrink_catalog_tokens = shrink_catalog_tokens
+        self.max_sessions = max_sessions
+        self.max_turns_per_session = max_turns_per_session
+        self.total = TokenUsage()
+        self.widgets: Dict[str, TokenUsage] = {}
+        self.rejected_turns = 0
+        self._sessions: collections.OrderedDict[str, _SessionUsage] = (
+            collections.OrderedDict()
+        )
+        self.logger = logging.getLogger("TokenUsageTracker")
+        self.logger.setLevel(log_lvl)
+
+    def _session(self, session_id: str) -> _SessionUsage:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _SessionUsage(
+                self.max_turns_per_session
+            )
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def over_budget(self, session_id: str) -> bool:
+        """True if the session, or all the sessions together, exhausted their budget."""
+        if (
+            self.global_budget is not None
+            and self.total.total_tokens >= self.global_budget
+        ):
+            return True
+        session = self._sessions.get(session_id)
+        return (
+            self.session_budget is not None
+            and session is not None
+            and session.total.total_tokens >= self.session_budget
+        )
+
+    def begin_turn(self, session_id: str) -> bool:
+        """
+        Opens the accounting of a new turn of the session, enforcing the budgets.
+
+        Returns:
+            bool: True if the turn must run with a shrunk context.
+
+        Raises:
+            TokenBudgetExceeded: If the turn is over budget and the action is "reject".
+        """
+        if self.over_budget(session_id):
+            if self.action == "reject":
+                self.rejected_turns += 1
+                self.logger.warning(
+                    "Turn of session %s rejected: over budget", session_id
+                )
+                raise TokenBudgetExceeded(
+                    f"Token budget exhausted for session {session_id}"
+                )
+            self.logger.debug("Turn of session %s over budget, shrunk", session_id)
+            shrink = True
+        else:
+            shrink = False
+        self._session(session_id).turns.append(TurnUsage(started_at=time.time()))
+        return shrink
+
+    def record(self, session_id: str, usage: TokenUsage | None):
+        """
+        Adds the usage of an LLM request to the current turn of the session and to the totals.
+        """
+        if usage is None:
+            return
+        session = self._session(session_id)
+        if not session.turns:
+            session.turns.append(TurnUsage(started_at=time.time()))
+        session.turns[-1].add(usage)
+        session.total.add(usage)
+        self.total.add(usage)
+
+    def end_turn(self, session_id: str, uri: str | None):
+        """
+        Closes the current turn of the session, accounting its tokens to the selected widget.
+        """
+        session = self._sessions.get(session_id)
+        if session is None or not session.turns or session.turns[-1].uri is not None:
+            return
+        turn = session.turns[-1]
+        turn.uri = uri or ""
+        if uri:
+            self.widgets.setdefault(uri, TokenUsage()).add(turn)
+
+    def report(self, session_id: str | None = None) -> Optional[Dict[str, Any]]:
+        """
+        Usage report of a session (total and turns), or the overall one (total, sessions, widgets).
+
+        Returns:
+            Dict[str, Any] | None: the report, None if the session is unknown.
+        """
+        if session_id is None:
+            return {
+                "total": self._dump(self.total),
+                "sessions": len(self._sessions),
+                "rejected_turns": self.rejected_turns,
+                "global_budget": self.global_budget,
+                "widgets": {uri: self._dump(u) for uri, u in self.widgets.items()},
+            }
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        return {
+            "session_id": session_id,
+            "total": self._dump(session.total),
+            "session_budget": self.session_budget,
+            "over_budget": self.over_budget(session_id),
+            "turns": [self._dump(turn) for turn in session.turns],
+        }
+
+    @staticmethod
+    def _dump(usage: TokenUsage) -> Dict[str, Any]:
+        return {**usage.model_dump(), "total_tokens": usage.total_tokens}
+
+    def reset(self, session_id: str | None = None):
+        """Drops the usage of a session (the totals are kept), or all the usage if session_id is None."""
+        if session_id is not None:
+            self._sessions.pop(session_id, None)
+            return
+        self._sessions.clear()
+        self.widgets.clear()
+        self.total = TokenUsage()
+        self.rejected_turns = 0
@@ -0,0 +1,187 @@
+"""
+Memoization of the MCP tool calls without side effects.
+Results of read-only tools are cached for a TTL, concurrent identical calls share one request.
+"""
+
+import asyncio
+import collections
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Literal, Optional, Tuple
+
+import mcp.types
+
+
+class ToolCallCache:
+    """
+    LRU cache of tool call results, keyed on tool name and canonical JSON arguments.
+
+    The cache policy follows the MCP tool annotations:
+      - tools with `readOnlyHint` have their results cached for `ttl` seconds (or their own entry of `ttls`);
+      - tools with `idempotentHint` are not cached, but identical concurrent calls are coalesced;
+      - other tools are called as usual, unless given an explicit TTL in `ttls`.
+    With `invalidate_on_write`, calling a tool that is not read-only (nor listed in `ttls`) clears the cache,
+    since it may change what the read-only tools return.
+    Failed calls are never cached.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        ttls: Optional[Dict[str, float]] = None,
+        max_entries: int = 1024,
+        invalidate_on_write: bool = True,
+        log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.DEBUG,
+    ):
+        """
+        Args:
+            ttl: Seconds a result of a read-only tool is reused.
+            ttls: TTL by tool name, overriding ttl. A tool listed here is cached even without annotations,
+                a TTL of 0 disables the cache for the tool.
+            max_entries: Max number of cached results, the least recently used are evicted first.
+            invalidate_on_write: If True, a call to a tool that is neither read-only nor listed in ttls
+                clears the cache.
+        """
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.max_entries = max_entries
+        self.invalidate_on_write = invalidate_on_write
+        self._entries: collections.OrderedDict[Tuple[str, str], Tuple[float, Any]] = (
+            collections.OrderedDict()
+        )
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "coalesced": 0}
+        self.logger = logging.getLogger("ToolCallCache")
+        self.logger.setLevel(log_lvl)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+        """Cache key of a call: the tool name and the arguments as canonical JSON."""
+        return tool_name, json.dumps(
+            arguments or {}, sort_keys=True, separators=(",", ":"), default=str
+        )
+
+    def policy(
+        self, tool_name: str, annotations: mcp.types.ToolAnnotations | None
+    ) -> Tuple[float, bool]:
+        """
+        Cache policy of a tool.
+
+        Returns:
+            Tuple[float, bool]: the TTL of its results (0 if not cached) and whether its
+                concurrent identical calls can be coalesced.
+        """
+        if tool_name in self.ttls:
+            ttl = self.ttls[tool_name]
+            return ttl, ttl > 0
+        if annotations is not None and annotations.readOnlyHint:
+            return self.ttl, True
+        return 0.0, bool(annotations is not None and annotations.idempotentHint)
+
+    def invalidate(self, tool_name: str | None = None):
+        """
+        Drops the cached results of a tool, or all of them if tool_name is None.
+        """
+        if tool_name is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] == tool_name]:
+            del self._entries[key]
+
+    async def call(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        annotations: mcp.types.ToolAnnotations | None,
+        call: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Returns the result of a tool call, from the cache when allowed.
+
+        Args:
+            tool_name: Name of the tool.
+            arguments: Arguments of the call.
+            annotations: The MCP annotations of the tool, if known.
+            call: Coroutine function making the actual call.
+
+        Returns:
+            Any: the (possibly cached) result of the call.
+        """
+        ttl, coalesce = self.policy(tool_name, annotations)
+        if self.invalidate_on_write and self._is_write(tool_name, annotations):
+            # results read before, or while, the write completes may be stale
+            self.invalidate()
+            try:
+                return await (
+                    self._coalesced(tool_name, arguments, 0.0, call)
+                    if coalesce
+                    else call()
+                )
+            finally:
+                self.invalidate()
+        if not coalesce:
+            return await call()
+        return await self._coalesced(tool_name, arguments, ttl, call)
+
+    def _is_write(
+        self, tool_name: str, annotations: mcp.types.ToolAnnotations | None
+    ) -> bool:
+        """True if the tool may change the results of the other tools."""
+        if tool_name in self.ttls:
+            return False
+        return not (annotations is not None and annotations.readOnlyHint)
+
+    async def _coalesced(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        ttl: float,
+        call: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Serves a call from the cache, from an identical call in flight, or calls the tool."""
+        key = self.make_key(tool_name, arguments)
+        if ttl > 0:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() < entry[0]:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling() or not in_flight.cancelled():
+                    raise
+                # the call we were waiting for was cancelled, not us: call again
+                return await self._coalesced(tool_name, arguments, ttl, call)
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # the exception is raised here, not only to the coalesced callers
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if ttl > 0:
+                self._entries[key] = (time.monotonic() + ttl, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return result
+        finally:
+            del self._in_flight[key]
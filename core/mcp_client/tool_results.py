@@ -0,0 +1,171 @@
+"""
+Size limits of the tool results sent to the LLM.
+Large results are projected and sampled into a compact version for the context, while the
+full result is kept in a side store and still returned to the UI.
+"""
+
+import collections
+import json
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from .catalog import estimate_tokens
+
+
+class ToolResultBudget:
+    """Size limits of the result of a tool, as seen by the LLM."""
+
+    def __init__(
+        self,
+        max_tokens: int = 1000,
+        max_items: int = 20,
+        fields: Optional[List[str]] = None,
+        max_string_chars: int = 500,
+    ):
+        """
+        Args:
+            max_tokens: Max number of (estimated) tokens of the result in the LLM context.
+            max_items: Max number of items kept from each array of an oversized result, sampled evenly.
+            fields: If provided, only these fields are kept from the objects inside arrays (projection).
+            max_string_chars: Max length of each string of an oversized result, once arrays are sampled.
+        """
+        self.max_tokens = max_tokens
+        self.max_items = max_items
+        self.fields = set(fields) if fields else None
+        self.max_string_chars = max_string_chars
+
+
+class ToolResultStore:
+    """Bounded side store of the full tool results, addressed by their handle."""
+
+    def __init__(self, max_entries: int = 1000):
+        """
+        Args:
+            max_entries: Max number of results kept, the least recently used are evicted first.
+        """
+        self.max_entries = max_entries
+        self._results: collections.OrderedDict[str, Any] = collections.OrderedDict()
+
+    def put(self, result: Any) -> str:
+        """
+        Stores a full result.
+
+        Returns:
+            str: the handle of the result.
+        """
+        handle = f"result-{uuid.uuid4().hex[:12]}"
+        self._results[handle] = result
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        return handle
+
+    def get(self, handle: str) -> Any:
+        """
+        Returns the full result of a handle, None if unknown or evicted.
+        """
+        if handle not in self._results:
+            return None
+        self._results.move_to_end(handle)
+        return self._results[handle]
+
+
+def project_fields(value: Any, fields: set) -> Any:
+    """Keeps only the given fields of the objects inside arrays, at any depth."""
+    if isinstance(value, list):
+        return [
+            (
+                {k: project_fields(v, fields) for k, v in item.items() if k in fields}
+                if isinstance(item, dict) and fields.intersection(item)
+                else project_fields(item, fields)
+            )
+            for item in value
+        ]
+    if isinstance(value, dict):
+        return {k: project_fields(v, fields) for k, v in value.items()}
+    return value
+
+
+def sample_items(items: List[Any], k: int) -> List[Any]:
+    """Evenly spaced sample of k items of a list, the first and the last included."""
+    if len(items) <= k:
+        return items
+    if k <= 1:
+        return items[:k]
+    step = (len(items) - 1) / (k - 1)
+    return [items[round(i * step)] for i in range(k)]
+
+
+def _sample_arrays(
+    value: Any, max_items: int, omitted: Dict[str, str], path: str = "$"
+) -> Any:
+    """Samples every array longer than max_items, recording the sampled paths in omitted."""
+    if isinstance(value, list):
+        if len(value) > max_items:
+            omitted[path] = f"{max_items} of {len(value)} items shown"
+            value = sample_items(value, max_items)
+        return [_sample_arrays(item, max_items, omitted, f"{path}[]") for item in value]
+    if isinstance(value, dict):
+        return {
+            k: _sample_arrays(v, max_items, omitted, f"{path}.{k}")
+            for k, v in value.items()
+        }
+    return value
+
+
+def _truncate_strings(value: Any, max_chars: int) -> Any:
+    """Cuts every string longer than max_chars."""
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + "..."
+    if isinstance(value, list):
+        return [_truncate_strings(item, max_chars) for item in value]
+    if isinstance(value, dict):
+        return {k: _truncate_strings(v, max_chars) for k, v in value.items()}
+    return value
+
+
+def _size(value: Any) -> int:
+    return estimate_tokens(json.dumps(value))
+
+
+def compact_result(result: Any, budget: ToolResultBudget) -> Tuple[Any, Dict[str, str]]:
+    """
+    Reduces a tool result to fit the budget.
+
+    The fields projection is always applied. Then, while the result exceeds max_tokens, arrays are
+    sampled with a halving number of items, strings are cut and, as a last resort, the result is
+    replaced by a preview of its JSON text.
+
+    Args:
+        result: The structured result of the tool.
+        budget: The size limits of the tool.
+
+    Returns:
+        Tuple[Any, Dict[str, str]]: the compact result and what was omitted from it, by JSON path
+            (empty if the result is complete).
+    """
+    projected: Dict[str, str] = {}
+    if budget.fields:
+        projection = project_fields(result, budget.fields)
+        if projection != result:
+            projected["$fields"] = "only " + ", ".join(sorted(budget.fields)) + " kept"
+        result = projection
+    if _size(result) <= budget.max_tokens:
+        return result, projected
+
+    max_items = budget.max_items
+    compact, omitted = result, dict(projected)
+    while max_items >= 1:
+        omitted = dict(projected)
+        compact = _sample_arrays(result, max_items, omitted)
+        if _size(compact) <= budget.max_tokens:
+            return compact, omitted
+        max_items //= 2
+
+    compact = _truncate_strings(compact, budget.max_string_chars)
+    omitted["$strings"] = f"strings cut at {budget.max_string_chars} characters"
+    if _size(compact) <= budget.max_tokens:
+        return compact, omitted
+
+    # about 4 characters per token
+    preview = json.dumps(compact)[: budget.max_tokens * 4]
+    return {"preview": preview}, {"$": "result cut, JSON preview shown"}
@@ -0,0 +1,264 @@
+"""
+Recording of the chat turns of MCPWIPClient in a compact JSONL log, to replay them offline
+against the recorded LLM and MCP responses (see turn_replay.py).
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, IO, List, Literal
+
+from .models import TokenUsage
+
+LOG_VERSION = 1
+
+
+def request_fingerprint(
+    messages: List[Dict[str, Any]], tools: List[Dict[str, Any]] | None
+) -> str:
+    """
+    Short hash of an LLM request (messages and offered tool names), to detect the requests that
+    differ between a recording and its replay without storing the full prompts.
+    """
+    payload = json.dumps(
+        [messages, sorted(t["function"]["name"] for t in tools or [])],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class TurnRecorder:
+    """
+    Writes the chat turns of a client to a JSONL log (gzip compressed if the path ends with .gz),
+    one record per line, each with a `kind`:
+
+    - header: model and system prompt of the client, and the id of the run it starts.
+    - widget / tools: a widget manifest text or the tool descriptors, written when new or changed.
+    - context: context injections stored in the history of a session.
+    - turn: start of a turn, with the user message, the offered widget uris and the setup stage timings.
+    - llm / parse: an LLM completion (assistant message, usage and request fingerprint) or fallback parse.
+    - tool: a tool call, with its arguments, structured result or error.
+    - end: final answer and duration of a turn.
+
+    Each recorder starts a run with its header, a log appended by several clients holds one run per
+    client. The records of a turn carry its `turn` number, unique within its run. The full LLM requests are written only with
+    `record_requests`, by default they are replaced by their fingerprint.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        record_requests: bool = False,
+        log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.DEBUG,
+    ):
+        """
+        Args:
+            path: Path of the log, records are appended. A .gz path is written gzip compressed.
+            record_requests: If True, the messages and tools of each LLM request are written too.
+        """
+        self.path = path
+        self.record_requests = record_requests
+        self.run = uuid.uuid4().hex[:12]
+        self.turns = 0
+        self._file: IO[str] | None = None
+        self._open_turns: Dict[str, tuple] = {}
+        self._widgets: Dict[str, str] = {}
+        self._tools: Any = None
+        self._tools_json = ""
+        self.logger = logging.getLogger("TurnRecorder")
+        self.logger.setLevel(log_lvl)
+
+    def _write(self, record: Dict[str, Any]):
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        if self._file is None:
+            opener = gzip.open if self.path.endswith(".gz") else open
+            self._file = opener(self.path, "at", encoding="utf-8")
+            self.logger.debug("Recording the chat turns to %s", self.path)
+        self._file.write(line + "\n")
+
+    def _turn(self, session_id: str) -> int | None:
+        turn = self._open_turns.get(session_id)
+        return turn[0] if turn else None
+
+    def header(self, model: str, system_prompt: str):
+        """Writes the configuration of the recorded client."""
+        self._write(
+            {
+                "kind": "header",
+                "version": LOG_VERSION,
+                "run": self.run,
+                "ts": time.time(),
+                "model": model,
+                "system_prompt": system_prompt,
+            }
+        )
+
+    def widgets(self, manifests: List[Dict[str, Any]], texts: List[str]):
+        """Writes the widget manifest texts not recorded yet, or changed."""
+        for manifest, text in zip(manifests, texts):
+            uri = (manifest or {}).get("uri")
+            if uri and self._widgets.get(uri) != text:
+                self._widgets[uri] = text
+                self._write({"kind": "widget", "uri": uri, "text": text})
+
+    def tools(self, openai_tools: List[Dict[str, Any]]):
+        """Writes the tool descriptors, if changed."""
+        # the client shares the same list until the tools change
+        if openai_tools is self._tools:
+            return
+        self._tools = openai_tools
+        tools_json = json.dumps(openai_tools, sort_keys=True)
+        if tools_json != self._tools_json:
+            self._tools_json = tools_json
+            self._write({"kind": "tools", "tools": openai_tools})
+
+    def context(self, session_id: str, contexts: List[str]):
+        """Writes context injections stored in the session history."""
+        self._write({"kind": "context", "session_id": session_id, "contexts": contexts})
+
+    def begin_turn(
+        self,
+        session_id: str,
+        user_message: str,
+        uris: List[str],
+        stages: Dict[str, float],
+        setup_ms: float,
+        stream: bool,
+    ):
+        """
+        Opens a turn of the session, once its input is ready.
+
+        Args:
+            session_id: ID of the conversation session.
+            user_message: The user message of the turn (merged messages included).
+            uris: The widget uris offered to the LLM.
+            stages: Duration in milliseconds of each setup stage.
+            setup_ms: Duration in milliseconds of the whole setup.
+            stream: True for a streaming turn.
+        """
+        self.turns += 1
+        self._open_turns[session_id] = (
+            self.turns,
+            time.perf_counter() - setup_ms / 1e3,
+        )
+        self._write(
+            {
+                "kind": "turn",
+                "turn": self.turns,
+                "session_id": session_id,
+                "ts": time.time(),
+                "stream": stream,
+                "message": user_message,
+                "uris": uris,
+                "stages": {k: round(v, 3) for k, v in stages.items()},
+            }
+        )
+
+    def llm(
+        self,
+        session_id: str,
+        messages: List[Dict[str, Any]],
+        tools: List[Dict[str, Any]] | None,
+        content: str | None,
+        tool_calls: List[Any],
+        usage: TokenUsage | None,
+        duration: float,
+    ):
+        """
+        Writes an LLM completion of the current turn of the session.
+
+        Args:
+            session_id: ID of the conversation session.
+            messages: The messages of the request.
+            tools: The tools offered in the request.
+            content: The content of the assistant message.
+            tool_calls: The OpenAI tool calls of the assistant message.
+            usage: The token usage of the request, if any.
+            duration: Seconds of the request (the whole stream in streaming mode).
+        """
+        turn = self._turn(session_id)
+        if turn is None:
+            return
+        record = {
+            "kind": "llm",
+            "turn": turn,
+            "ms": round(duration * 1e3, 3),
+            "request": request_fingerprint(messages, tools),
+            "content": content,
+            "tool_calls": [
+                [tc.id, tc.function.name, tc.function.arguments] for tc in tool_calls
+            ],
+            "usage": usage.model_dump() if usage is not None else None,
+        }
+        if self.record_requests:
+            record["messages"] = messages
+            record["tools"] = [t["function"]["name"] for t in tools or []]
+        self._write(record)
+
+    def parse(self, session_id: str, output: str, duration: float):
+        """Writes the ValidResponse JSON of a fallback parse of the current turn."""
+        turn = self._turn(session_id)
+        if turn is not None:
+            self._write(
+                {
+                    "kind": "parse",
+                    "turn": turn,
+                    "ms": round(duration * 1e3, 3),
+                    "output": output,
+                }
+            )
+
+    def tool(
+        self,
+        session_id: str,
+        name: str,
+        arguments: Dict[str, Any],
+        result: Any,
+        duration: float,
+        error: str | None = None,
+    ):
+        """Writes a tool call of the current turn, its structured result or its error."""
+        turn = self._turn(session_id)
+        if turn is None:
+            return
+        record = {
+            "kind": "tool",
+            "turn": turn,
+            "ms": round(duration * 1e3, 3),
+            "name": name,
+            "arguments": arguments,
+            "result": result,
+        }
+        if error is not None:
+            record["error"] = error
+        self._write(record)
+
+    def end_turn(self, session_id: str, answer: str):
+        """Closes the current turn of the session with its final answer."""
+        turn = self._open_turns.pop(session_id, None)
+        if turn is None:
+            return
+        self._write(
+            {
+                "kind": "end",
+                "turn": turn[0],
+                "ms": round((time.perf_counter() - turn[1]) * 1e3, 3),
+                "answer": answer,
+            }
+        )
+        self.flush()
+
+    def flush(self):
+        """Flushes the records written so far."""
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """Closes the log, it is opened again on the next record."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
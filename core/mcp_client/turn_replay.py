@@ -0,0 +1,422 @@
+"""
+Offline replay of the chat turns recorded by TurnRecorder, against stubs answering with the recorded
+LLM responses and tool results, to measure the client overhead and detect behaviour drift.
+"""
+
+import collections
+import gzip
+import json
+import logging
+import statistics
+import time
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Literal, Optional, Tuple
+
+from fastmcp import FastMCP
+from fastmcp.client.transports import FastMCPTransport
+from fastmcp.exceptions import ToolError
+from fastmcp.tools.tool import Tool, ToolResult
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from rag.base import BaseRAG
+from .client import MCPWIPClient
+from .memory_handler import LastKMemory
+from .models import AssistantMessage, ValidResponse
+from .turn_recorder import request_fingerprint
+
+
+def read_log(path: str) -> List[Dict[str, Any]]:
+    """Reads the records of a turn log (gzip compressed if the path ends with .gz)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class _RecordedTurn:
+    def __init__(self, record: Dict[str, Any], widgets: Dict[str, str]):
+        self.record = record
+        self.widgets = [widgets[uri] for uri in record["uris"] if uri in widgets]
+        self.llm: Deque[Dict[str, Any]] = collections.deque()
+        self.parses: Deque[Dict[str, Any]] = collections.deque()
+        self.tools: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = {}
+        self.end: Dict[str, Any] | None = None
+
+
+class _RecordedRun:
+    """The records of a client, from its header to the next one."""
+
+    def __init__(self, header: Dict[str, Any]):
+        self.header = header
+        self.tools: Dict[str, Dict[str, Any]] = {}
+        # turns and context injections, in the recorded order
+        self.events: List[Tuple[str, Any]] = []
+
+    @property
+    def session_ids(self) -> set:
+        """The sessions of the run."""
+        return {
+            event.record["session_id"] if kind == "turn" else event["session_id"]
+            for kind, event in self.events
+        }
+
+
+def _tool_key(name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+    return name, json.dumps(arguments, sort_keys=True)
+
+
+class _ReplayRAG(BaseRAG):
+    """Returns the widgets offered in the recorded turn being replayed."""
+
+    widgets: List[str] = []
+
+    def search(self, query: str, top_k: Optional[int] = 5, **kwargs) -> List[str]:
+        return self.widgets
+
+    def hybrid_search(
+        self, query: str, top_k: Optional[int] = 5, **kwargs
+    ) -> List[str]:
+        return self.widgets
+
+
+class _ReplayTool(Tool):
+    """A recorded tool, answering with the results recorded for the turn being replayed."""
+
+    replayer: Any = None
+
+    async def run(self, arguments: Dict[str, Any]) -> ToolResult:
+        record = self.replayer.tool_result(self.name, arguments)
+        if record is None:
+            raise ToolError(f"No recorded result for {self.name}({arguments})")
+        if "error" in record:
+            raise ToolError(record["error"])
+        result = record["result"]
+        if result is None:
+            return ToolResult(content="")
+        return ToolResult(content=json.dumps(result), structured_content=result)
+
+
+class _ReplayStream:
+    def __init__(self, chunks: List[ChatCompletionChunk]):
+        self._chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            yield chunk
+
+    async def close(self):
+        """Nothing to release."""
+
+
+class TurnReplayer:
+    """
+    Replays the turns of a TurnRecorder log, one at a time in the recorded order, with an MCPWIPClient
+    whose LLM client and MCP server are stubs answering instantly with the recorded responses.
+
+    The offered widgets of each turn and the context injections are the recorded ones, so a replayed turn
+    sends the same LLM requests as the recorded one unless the client behaviour changed. A log appended by
+    several clients is replayed one run (header) at a time, each with a new client and an empty memory. The report gives
+    the recorded and replayed turn durations (the replayed ones are the client overhead) and the drift:
+    final answers that differ, LLM requests that differ from the recorded ones (by fingerprint) and LLM
+    responses or tool results missing from the log.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.WARNING,
+        **client_kwargs,
+    ):
+        """
+        Args:
+            path: Path of the turn log.
+            log_lvl: Log level of the replay client.
+            **client_kwargs: Options of the replay MCPWIPClient (e.g. catalog_token_budget), to replay with the
+                options of the recorded client. The LLM client, MCP transport and RAG are the replay stubs.
+                A memory passed here must be empty, its sessions are cleared after each run.
+        """
+        self.path = path
+        self.log_lvl = log_lvl
+        self.client_kwargs = client_kwargs
+        self.logger = logging.getLogger("TurnReplayer")
+        self.logger.setLevel(log_lvl)
+        self._current: _RecordedTurn | None = None
+        self._replayed = False
+        self.drift: Dict[str, int] = collections.Counter()
+        self._load()
+
+    def _load(self):
+        """Reads the log, the recorded responses are consumed by each replay."""
+        self.runs: List[_RecordedRun] = []
+        self._all_tools: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # recorded durations in milliseconds, by stage (named as the client telemetry stages)
+        self.recorded_stages: Dict[str, List[float]] = collections.defaultdict(list)
+        widgets: Dict[str, str] = {}
+        turns: Dict[int, _RecordedTurn] = {}
+        for record in read_log(self.path):
+            kind = record["kind"]
+            if kind == "header" or not self.runs:
+                # the turn numbers restart with each run
+                self.runs.append(_RecordedRun(record if kind == "header" else {}))
+                widgets, turns = {}, {}
+            run = self.runs[-1]
+            if kind == "header":
+                continue
+            if kind == "widget":
+                widgets[record["uri"]] = record["text"]
+            elif kind == "tools":
+                for tool in record["tools"]:
+                    run.tools[tool["function"]["name"]] = tool["function"]
+            elif kind == "context":
+                run.events.append(("context", record))
+            elif kind == "turn":
+                turns[record["turn"]] = turn = _RecordedTurn(record, widgets)
+                run.events.append(("turn", turn))
+                for stage, ms in record["stages"].items():
+                    self.recorded_stages[stage].append(ms)
+            elif record.get("turn") in turns:
+                turn = turns[record["turn"]]
+                stage = {
+                    "llm": "llm_call",
+                    "parse": "fallback_parse",
+                    "tool": "tool_call",
+                    "end": "chat_turn",
+                }.get(kind)
+                if stage is not None:
+                    self.recorded_stages[stage].append(record["ms"])
+                if kind == "llm":
+                    turn.llm.append(record)
+                elif kind == "parse":
+                    turn.parses.append(record)
+                elif kind == "tool":
+                    key = _tool_key(record["name"], record["arguments"])
+                    turn.tools.setdefault(key, collections.deque()).append(record)
+                    self._all_tools[key] = record
+                elif kind == "end":
+                    turn.end = record
+
+    def tool_result(
+        self, name: str, arguments: Dict[str, Any]
+    ) -> Dict[str, Any] | None:
+        """
+        The recorded tool record answering a call of the turn being replayed: the next one recorded in
+        the turn with the same arguments, else the last one recorded in any turn.
+        """
+        key = _tool_key(name, arguments)
+        recorded = self._current.tools.get(key) if self._current else None
+        if recorded:
+            return recorded.popleft()
+        self.drift["missing_tool_results"] += key not in self._all_tools
+        return self._all_tools.get(key)
+
+    async def _create(self, **kwargs) -> ChatCompletion | _ReplayStream:
+        turn = self._current
+        if not turn.llm:
+            self.drift["missing_llm_responses"] += 1
+            raise RuntimeError(
+                f"No recorded LLM response left for turn {turn.record['turn']}"
+            )
+        record = turn.llm.popleft()
+        if (
+            request_fingerprint(kwargs["messages"], kwargs.get("tools"))
+            != record["request"]
+        ):
+            self.drift["llm_requests"] += 1
+        message: Dict[str, Any] = {"role": "assistant", "content": record["content"]}
+        tool_calls = [
+            {"id": id_, "type": "function", "function": {"name": n, "arguments": a}}
+            for id_, n, a in record["tool_calls"]
+        ]
+        usage = None
+        if record["usage"]:
+            u = record["usage"]
+            usage = {
+                "prompt_tokens": u["prompt_tokens"],
+                "completion_tokens": u["completion_tokens"],
+                "total_tokens": u["prompt_tokens"] + u["completion_tokens"],
+                "prompt_tokens_details": {"cached_tokens": u["cached_tokens"]},
+            }
+        base = {"id": "replay", "created": 0, "model": kwargs["model"]}
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        if not kwargs.get("stream"):
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return ChatCompletion.model_validate(
+                {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [
+                        {"index": 0, "finish_reason": finish_reason, "message": message}
+                    ],
+                    "usage": usage,
+                }
+            )
+        delta: Dict[str, Any] = {"content": record["content"]}
+        if tool_calls:
+            delta["tool_calls"] = [
+                {"index": i, **tc} for i, tc in enumerate(tool_calls)
+            ]
+        chunks = [
+            {
+                **base,
+                "object": "chat.completion.chunk",
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            },
+            {**base, "object": "chat.completion.chunk", "choices": [], "usage": usage},
+        ]
+        return _ReplayStream([ChatCompletionChunk.model_validate(c) for c in chunks])
+
+    async def _parse(self, **kwargs):
+        turn = self._current
+        if not turn.parses:
+            self.drift["missing_llm_responses"] += 1
+            raise RuntimeError(
+                f"No recorded fallback parse left for turn {turn.record['turn']}"
+            )
+        output = ValidResponse.model_validate_json(turn.parses.popleft()["output"])
+        return SimpleNamespace(output_parsed=output, usage=None)
+
+    def _build_client(self, run: _RecordedRun) -> Tuple[MCPWIPClient, _ReplayRAG]:
+        server = FastMCP("mcp-wip-replay")
+        for name, function in run.tools.items():
+            server.add_tool(
+                _ReplayTool(
+                    name=name,
+                    description=function.get("description") or "",
+                    parameters=function.get("parameters") or {"type": "object"},
+                    replayer=self,
+                )
+            )
+        llm = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=self._create)),
+            responses=SimpleNamespace(parse=self._parse),
+        )
+        rag = _ReplayRAG()
+        kwargs = {
+            "model": run.header.get("model", "replay"),
+            "log_lvl": self.log_lvl,
+            **self.client_kwargs,
+        }
+        if "system_prompt" in run.header:
+            kwargs.setdefault("system_prompt", run.header["system_prompt"])
+        # a fresh memory for each replay, the default one of MCPWIPClient is shared
+        kwargs.setdefault("memory", LastKMemory(k=5))
+        client = MCPWIPClient(
+            llm_client=llm,
+            mcp_server_transport=FastMCPTransport(server),
+            rag=rag,
+            **kwargs,
+        )
+        return client, rag
+
+    async def _replay_turn(self, client: MCPWIPClient, turn: _RecordedTurn) -> str:
+        record = turn.record
+        if not record["stream"]:
+            messages = await client.run_chat_turn(
+                record["message"], record["session_id"]
+            )
+            return messages[-1].content
+        answer = ""
+        async for message in client.run_chat_turn_stream(
+            record["message"], record["session_id"]
+        ):
+            if isinstance(message, AssistantMessage):
+                answer = message.content
+        return answer
+
+    async def run(self, max_mismatches: int = 10) -> Dict[str, Any]:
+        """
+        Replays the log.
+
+        Args:
+            max_mismatches: Max number of turns with a different answer detailed in the report.
+
+        Returns:
+            Dict[str, Any]: the report, with the turn durations (recorded and replayed), the stage timings
+                (recorded and replayed) and the drift counters.
+        """
+        if self._replayed:
+            self._load()
+        self._replayed = True
+        self.drift = collections.Counter()
+        recorded_ms, replayed_ms, mismatches = [], [], []
+        errors = 0
+        # stage durations of the replay clients, seconds
+        replayed_stages: Dict[str, Dict[str, float]] = {}
+        start = time.perf_counter()
+        for run in self.runs:
+            client, rag = self._build_client(run)
+            try:
+                await client.start()
+                for kind, event in run.events:
+                    if kind == "context":
+                        client.session_scheduler.add_context(
+                            event["session_id"], "\n".join(event["contexts"])
+                        )
+                        continue
+                    turn: _RecordedTurn = event
+                    self._current, rag.widgets = turn, turn.widgets
+                    turn_start = time.perf_counter()
+                    try:
+                        answer = await self._replay_turn(client, turn)
+                    except Exception as exc:  # pylint: disable=broad-exception-caught
+                        errors += 1
+                        answer = None
+                        self.logger.warning(
+                            "Turn %d failed: %r", turn.record["turn"], exc
+                        )
+                    replayed_ms.append((time.perf_counter() - turn_start) * 1e3)
+                    end = turn.end
+                    if end is not None:
+                        recorded_ms.append(end["ms"])
+                    recorded_answer = end["answer"] if end is not None else None
+                    if answer != recorded_answer:
+                        self.drift["answers"] += 1
+                        if len(mismatches) < max_mismatches:
+                            mismatches.append(
+                                {
+                                    "run": run.header.get("run"),
+                                    "turn": turn.record["turn"],
+                                    "session_id": turn.record["session_id"],
+                                    "recorded": recorded_answer,
+                                    "replayed": answer,
+                                }
+                            )
+            finally:
+                self._current = None
+                await client.close()
+                for session_id in run.session_ids:
+                    client.memory.clear(session_id)
+            for stage, summary in client.telemetry.summary().items():
+                entry = replayed_stages.setdefault(stage, {"count": 0, "sum": 0.0})
+                entry["count"] += summary["count"]
+                entry["sum"] += summary["sum"]
+        elapsed = time.perf_counter() - start
+
+        return {
+            "turns": len(replayed_ms),
+            "errors": errors,
+            "elapsed_s": elapsed,
+            "turns_per_s": len(replayed_ms) / elapsed if elapsed else 0.0,
+            "recorded_turn_ms": _percentiles(recorded_ms),
+            "replayed_turn_ms": _percentiles(replayed_ms),
+            "recorded_stage_ms": {
+                stage: statistics.fmean(values)
+                for stage, values in self.recorded_stages.items()
+            },
+            "replayed_stage_ms": {
+                stage: entry["sum"] / entry["count"] * 1e3
+                for stage, entry in replayed_stages.items()
+                if entry["count"]
+            },
+            "drift": dict(self.drift),
+            "mismatches": mismatches,
+        }
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    q = statistics.quantiles(values, n=100) if len(values) > 1 else values * 99
+    return {"mean": statistics.fmean(values), "p50": q[49], "p95": q[94], "p99": q[98]}
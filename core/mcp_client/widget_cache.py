@@ -0,0 +1,218 @@
+"""
+Client-side cache of the widget manifests exposed by an MCP-WIP server.
+Manifests are read concurrently once, then served locally until the server
+notifies a resource list change or the cache expires.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+from typing import Any, Dict, List, Literal, NamedTuple, Optional, Set
+
+from mcp.types import TextResourceContents
+from .session_pool import MCPSessionPool
+
+
+class CachedWidget(NamedTuple):
+    """A widget resource as read from the server, with its parsed manifest (None if not valid JSON)."""
+
+    uri: str
+    text: str
+    manifest: Optional[Dict[str, Any]]
+
+
+class WidgetManifestCache:
+    """
+    Cache of the "wip://" resources of the server, keyed by URI.
+
+    The cache is filled with a single `list_resources()` followed by concurrent
+    `read_resource` calls, bounded by `max_concurrency`. It is refreshed when
+    invalidated (e.g. on `notifications/resources/list_changed`) or after `ttl` seconds.
+    When the server advertises `resources.subscribe`, the session filling the cache subscribes
+    to the listed widgets, so that a `notifications/resources/updated` marks a single widget stale.
+    """
+
+    def __init__(
+        self,
+        ttl: float | None = None,
+        max_concurrency: int = 16,
+        log_lvl: Literal[0, 10, 20, 30, 40, 50] = logging.DEBUG,
+    ):
+        """
+        Args:
+            ttl: Seconds after which the catalog is fetched again. If None, only invalidation refreshes it.
+            max_concurrency: Max number of in-flight `read_resource` requests while filling the cache.
+        """
+        self.ttl = ttl
+        self.max_concurrency = max_concurrency
+        self.widgets: Dict[str, CachedWidget] = {}
+        self._filled = False
+        # uris updated on the server, read again on the next lookup
+        self._stale: Set[str] = set()
+        # widget uris subscribed on each MCP session
+        self._subscribed: weakref.WeakKeyDictionary[Any, Set[str]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._expiry = 0.0
+        self._version = 0
+        self._lock = asyncio.Lock()
+        self.logger = logging.getLogger("WidgetManifestCache")
+        self.logger.setLevel(log_lvl)
+
+    def invalidate(self, uri: str = None):
+        """
+        Drops the cached catalog, or marks a single widget as stale if the uri is given.
+
+        A stale widget keeps its place in the catalog and is read again by the next lookup.
+
+        Args:
+            uri: Optional URI of the widget to read again.
+        """
+        if uri is not None:
+            if uri in self.widgets:
+                self._stale.add(uri)
+            return
+        self._filled = False
+        self._stale.clear()
+        self._version += 1
+
+    def is_valid(self) -> bool:
+        """True if the cached catalog can be used without any MCP request."""
+        return self._filled and (self.ttl is None or time.monotonic() < self._expiry)
+
+    async def get_all(
+        self, session_pool: MCPSessionPool, refresh: bool = False
+    ) -> List[CachedWidget]:
+        """
+        Returns all the cached widgets, filling the cache first if needed.
+
+        Args:
+            session_pool: The pool used to reach the MCP server.
+            refresh: If True, the catalog is fetched again from the server.
+
+        Returns:
+            List[CachedWidget]: the widgets, in the order listed by the server.
+        """
+        if not refresh and self.is_valid() and not self._stale:
+            return list(self.widgets.values())
+        async with self._lock:
+            if not refresh and self.is_valid():
+                if self._stale:
+                    await self._read_stale(session_pool)
+                return list(self.widgets.values())
+            version = self._version
+            self._stale.clear()
+            async with session_pool.acquire() as mcp_client:
+                res = await mcp_client.list_resources()
+                uris = [str(r.uri) for r in res if r.uri.scheme == "wip"]
+                widgets = await self._read_all(mcp_client, uris)
+                await self._subscribe(mcp_client, uris)
+            if version == self._version:
+                self.widgets = {w.uri: w for w in widgets}
+                self._filled = True
+                if self.ttl is not None:
+                    self._expiry = time.monotonic() + self.ttl
+            return widgets
+
+    async def get_many(
+        self, session_pool: MCPSessionPool, uris: List[str]
+    ) -> List[CachedWidget]:
+        """
+        Returns the widgets for the given URIs, reading from the server only the ones not cached.
+
+        Args:
+            session_pool: The pool used to reach the MCP server.
+            uris: URIs of the widgets.
+
+        Returns:
+            List[CachedWidget]: the widgets found, in order of input URIs.
+        """
+        cached = self.widgets if self.is_valid() else {}
+        missing = [uri for uri in uris if uri not in cached or uri in self._stale]
+        fetched: Dict[str, CachedWidget] = {}
+        if missing:
+            version = self._version
+            async with session_pool.acquire() as mcp_client:
+                for w in await self._read_all(mcp_client, missing, skip_errors=False):
+                    fetched[w.uri] = w
+            if version == self._version:
+                for uri, w in fetched.items():
+                    if uri in self._stale:
+                        self._stale.discard(uri)
+                        self.widgets[uri] = w
+        found = []
+        for uri in uris:
+            widget = cached.get(uri) or fetched.get(uri)
+            if widget is not None:
+                found.append(widget)
+        return found
+
+    async def _read_stale(self, session_pool: MCPSessionPool):
+        """Reads the stale widgets again, in place; the ones that cannot be read are dropped."""
+        stale, version = set(self._stale), self._version
+        self._stale -= stale
+        async with session_pool.acquire() as mcp_client:
+            fetched = {w.uri: w for w in await self._read_all(mcp_client, list(stale))}
+        if version != self._version:
+            return
+        for uri in stale:
+            if uri in fetched:
+                self.widgets[uri] = fetched[uri]
+            else:
+                self.widgets.pop(uri, None)
+
+    async def _subscribe(self, mcp_client, uris: List[str]):
+        """Subscribes the session to the updates of the widgets, if the server supports it."""
+        try:
+            capabilities = mcp_client.initialize_result.capabilities
+            session = mcp_client.session
+        except (AttributeError, RuntimeError):
+            # not a single fastmcp Client (e.g. a federation), or not connected
+            return
+        if capabilities.resources is None or not capabilities.resources.subscribe:
+            return
+        subscribed = self._subscribed.setdefault(session, set())
+        new = [uri for uri in uris if uri not in subscribed]
+        results = await asyncio.gather(
+            *(session.subscribe_resource(uri) for uri in new), return_exceptions=True
+        )
+        for uri, result in zip(new, results):
+            if isinstance(result, Exception):
+                self.logger.warning("Error subscribing to %s: %s", uri, result)
+            else:
+                subscribed.add(uri)
+
+    async def _read_all(
+        self, mcp_client, uris: List[str], skip_errors: bool = True
+    ) -> List[CachedWidget]:
+        """
+        Reads the given resources concurrently over one session.
+
+        Resources without text content are skipped; the ones that cannot be read are skipped too,
+        unless skip_errors is False.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def read(uri: str) -> CachedWidget | None:
+            async with semaphore:
+                try:
+                    rr: List[TextResourceContents] = await mcp_client.read_resource(uri)
+                except Exception as exc:
+                    if not skip_errors:
+                        raise
+                    self.logger.warning("Error reading resource %s: %s", uri, exc)
+                    return None
+            try:
+                text = rr[0].text
+            except Exception:
+                return None
+            try:
+                manifest = json.loads(text)
+            except (json.JSONDecodeError, TypeError):
+                manifest = None
+            return CachedWidget(uri=uri, text=text, manifest=manifest)
+
+        results = await asyncio.gather(*(read(uri) for uri in uris))
+        return [w for w in results if w is not None]
@@ -7,7 +7,7 @@ the Model Context Protocol (MCP).
 
 Key features illustrated in this example:
 - Configuration of MCP and widget directories for server initialization.
-- Communication between MCPWIPClient and MCPWIPServer via the StdioTransport.
+- Communication between MCPWIPClient and MCPWIPServer in the same process (in-memory transport), or via the StdioTransport.
 - Setup for automatic discovery and loading of widget manifests from a specified directory.
 - Integration with external LLM API providers for chat completions (e.g., Groq).
 - Defines a recommended system prompt to demonstrate the LLM widget selection and instantiation.
@@ -24,31 +24,39 @@ from fastapi.middleware.cors import CORSMiddleware
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+import example.server
 from core.mcp_client.client import MCPWIPClient
+from core.mcp_client.tool_cache import ToolCallCache
+from core.mcp_server.server import MCPWIPServer
 from rag.memvid_rag import MemvidRAG
-from api.routes import router, set_client
+from api.routes import router, set_client, lifespan
 
 
 load_dotenv()
 
 
-# pick your transport - this example uses stdio
-# So the MCPWIPClient runs the MCPWIPServer
-transport = StdioTransport(
-    "uv",
-    args=[
-        "run",
-        "-m",
-        "example.server",
-        "--transport",
-        "stdio",
-        "--input-dir",
-        "example/resources/widgets",
-    ],
+# pick your transport - this example runs the MCPWIPServer in the same process as the client
+# The client talks to it through the in-memory transport: no subprocess, no pipes or sockets
+transport = MCPWIPServer(
+    input_dir="example/resources/widgets", server=example.server.server
 )
 
+# or with stdio, so the MCPWIPClient runs the MCPWIPServer as a subprocess
+# transport = StdioTransport(
+#     "uv",
+#     args=[
+#         "run",
+#         "-m",
+#         "example.server",
+#         "--transport",
+#         "stdio",
+#         "--input-dir",
+#         "example/resources/widgets",
+#     ],
+# )
+
 # FastMCP Client
-client = Client(transport)
+client = Client(transport.get_server())
 
 # Groq API for chat completions
 # Export your GROQ_API_KEY as env variable
@@ -120,10 +128,13 @@ if __name__ == "__main__":
         mcp_server_transport=transport,
         system_prompt=SYSTEM_PROMPT,
         rag=rag,
+        # reuse the results of the read-only tools for 30 seconds
+        tool_cache=ToolCallCache(ttl=30.0),
     )
 
     # Instantiate the main FastAPI application
-    app = FastAPI()
+    # the lifespan opens the MCP sessions on startup and closes them on shutdown
+    app = FastAPI(lifespan=lifespan)
 
     app.add_middleware(  # this is not safe in production! Dev only
         CORSMiddleware,
@@ -23,7 +23,9 @@ server = FastMCP("mcp-wip-server")
 
 
 # add a custom tool
+# read-only tools are annotated with readOnlyHint, their results can be cached by the MCPWIPClient
 @server.tool(
+    annotations={"readOnlyHint": True},
     description="Given an sku, checks its stock availability in the warehouse. It returns the stock level for each size variant of the given sku. Use this tool when the user request any particular information about the availability of a product.",
     output_schema={
         "type": "object",
@@ -173,6 +175,7 @@ def get_calendar_for_day(year: int, month: int, day: int):
 @server.tool(
     description="Reads the calendar events given the date in the format yyyy-mm-dd.",
     name="read_daily_calendar",
+    annotations={"readOnlyHint": True},
 )
 def read_daily_calendar(date: str, ctx: Context):
     # Assume the date is in format "YYYY-MM-DD"
@@ -193,6 +196,7 @@ def read_daily_calendar(date: str, ctx: Context):
 @server.tool(
     description="Given an sku, this tool searches for similar skus in the catalog. It returns the list of the similar sku.",
     name="get_similar_products",
+    annotations={"readOnlyHint": True},
     output_schema={
         "type": "object",
         "properties": {
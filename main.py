@@ -15,20 +15,26 @@ import uvicorn
 load_dotenv()
 
 
-transport = StdioTransport(
-    "uv",
-    args=[
-        "run",
-        "-m",
-        "core.mcp_server.server",
-        "--transport",
-        "stdio",
-        "--input-dir",
-        "resources/widgets",
-    ],
+# in-process server, served to the client through the in-memory transport
+transport = MCPWIPServer(
+    input_dir="example/resources/widgets", server=FastMCP("mcp-wip-server")
 )
 
-client = Client(transport)
+# or run it as a subprocess with stdio
+# transport = StdioTransport(
+#     "uv",
+#     args=[
+#         "run",
+#         "-m",
+#         "core.mcp_server.server",
+#         "--transport",
+#         "stdio",
+#         "--input-dir",
+#         "example/resources/widgets",
+#     ],
+# )
+
+client = Client(transport.get_server())
 _llm_client = AsyncOpenAI(
     api_key=os.getenv("GROQ_API_KEY"), base_url="https://api.groq.com/openai/v1"
 )
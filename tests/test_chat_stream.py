@@ -0,0 +1,44 @@
+import asyncio
+import json
+import logging
+
+from benchmarks.fakes import FakeLLM, build_server
+from core.mcp_client.client import MCPWIPClient
+from core.mcp_client.memory_handler import LastKMemory
+from core.mcp_client.models import AssistantMessage, WidgetUriMessage
+
+
+def _stream_turn(script):
+    client = MCPWIPClient(
+        llm_client=FakeLLM(script),
+        mcp_server_transport=build_server(3),
+        memory=LastKMemory(k=5),
+        log_lvl=logging.WARNING,
+    )
+
+    async def run():
+        try:
+            return [m async for m in client.run_chat_turn_stream("hello", "s1")]
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
+
+
+def test_early_uri_contradicted_by_the_final_answer_is_corrected():
+    def script(messages, tools):
+        uri = json.loads(FakeLLM.select_first_widget(messages, tools))["uri"]
+        # the last "uri" key wins once parsed
+        return f'{{"uri": "{uri}", "uri": "", "parameters": [], "text": "none"}}'
+
+    messages = _stream_turn(script)
+    widgets = [m.uri for m in messages if isinstance(m, WidgetUriMessage)]
+    assert widgets[0].startswith("wip://")
+    assert widgets[-1] == ""
+    assert isinstance(messages[-1], AssistantMessage)
+
+
+def test_early_uri_confirmed_by_the_final_answer_is_sent_once():
+    messages = _stream_turn(FakeLLM.select_first_widget)
+    widgets = [m.uri for m in messages if isinstance(m, WidgetUriMessage)]
+    assert len(widgets) == 1 and widgets[0].startswith("wip://")
@@ -0,0 +1,48 @@
+import asyncio
+import contextlib
+
+from fastmcp import FastMCP
+
+from core.mcp_client.federation import MCPFederation
+from core.mcp_client.session_pool import MCPSessionPool
+
+
+def _server(name: str) -> FastMCP:
+    server = FastMCP(name)
+
+    @server.tool
+    def echo(text: str) -> dict:
+        return {"server": name, "text": text}
+
+    return server
+
+
+def test_unavailable_server_is_left_out():
+    changes = []
+    pool = MCPFederation({"a": _server("a"), "b": _server("b")}).session_pool(
+        lambda server: MCPSessionPool(server), on_change=lambda: changes.append(1)
+    )
+
+    @contextlib.asynccontextmanager
+    async def broken_acquire():
+        raise ConnectionError("connection lost")
+        yield
+
+    async def run():
+        try:
+            before = [t.name for t in await pool.list_tools()]
+            result = await pool.call_tool("b__echo", {"text": "hi"})
+            assert result.structured_content == {"server": "b", "text": "hi"}
+            pool.pools["b"].acquire = broken_acquire
+            failed = await pool.call_tool("b__echo", {"text": "hi"})
+            after = [t.name for t in await pool.list_tools()]
+            return before, failed, after
+        finally:
+            await pool.close()
+
+    before, failed, after = asyncio.run(run())
+    assert before == ["a__echo", "b__echo"]
+    assert failed.is_error
+    assert failed.structured_content == {"error": "MCP server b unavailable"}
+    assert after == ["a__echo"]
+    assert changes == [1]
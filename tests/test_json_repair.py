@@ -0,0 +1,28 @@
+import pytest
+
+from benchmarks.json_repair import CORPUS
+from core.mcp_client.json_repair import repair_response
+
+
+@pytest.mark.parametrize(
+    "answer, expected", [entry[1:] for entry in CORPUS], ids=[e[0] for e in CORPUS]
+)
+def test_corpus(answer, expected):
+    assert repair_response(answer) == expected
+
+
+def test_prose_naming_an_offered_uri_needs_the_fallback():
+    uris = ["wip://stock-level-inspector", "wip://calendar"]
+    answer = "I'll show wip://stock-level-inspector for sku1234."
+
+    assert repair_response(answer, uris) is None
+
+
+def test_prose_naming_no_offered_uri_is_text():
+    answer = "There is no wip://calendar widget for that."
+
+    assert repair_response(answer, ["wip://stock-level-inspector"]) == {
+        "uri": "",
+        "parameters": [],
+        "text": answer,
+    }
@@ -0,0 +1,31 @@
+import asyncio
+
+from core.mcp_client.llm_limiter import LLMLimiter
+
+
+async def _chunks(n: int):
+    for i in range(n):
+        await asyncio.sleep(0)
+        yield i
+
+
+def test_stream_holds_its_slot_until_exhausted():
+    async def run():
+        limiter = LLMLimiter(initial_limit=1, max_limit=1)
+
+        async def request():
+            return _chunks(3)
+
+        stream = await limiter.call(request, "a", stream=True)
+        assert limiter.in_flight == 1
+        second = asyncio.create_task(limiter.call(request, "b", stream=True))
+        await asyncio.sleep(0.01)
+        assert not second.done()
+
+        assert [chunk async for chunk in stream] == [0, 1, 2]
+        other = await asyncio.wait_for(second, 1)
+        assert limiter.in_flight == 1
+        await other.close()
+        assert limiter.in_flight == 0
+
+    asyncio.run(run())
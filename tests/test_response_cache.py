@@ -0,0 +1,72 @@
+import asyncio
+import logging
+
+from fastmcp import FastMCP
+
+from core.mcp_client.client import MCPWIPClient
+from core.mcp_client.response_cache import SemanticResponseCache, bind_parameters
+
+
+def _embed(text: str):
+    # all the messages are similar, only the entity checks tell them apart
+    return [1.0, 0.0]
+
+
+def _cache_stock_answer(cache: SemanticResponseCache, sku: str):
+    response = {
+        "uri": "wip://stock-level-inspector",
+        "parameters": [{"name": "sku", "value": sku}, {"name": "stock", "value": 3}],
+        "text": "",
+    }
+    cached = bind_parameters(
+        response,
+        [("get_stock_for_sku", {"sku": sku}, {"sku": sku, "stock": 3})],
+    )
+    asyncio.run(cache.put(f"stock for {sku}", [response["uri"]], cached))
+
+
+def test_other_sku_is_a_miss():
+    cache = SemanticResponseCache(embed=_embed, threshold=0.5)
+    _cache_stock_answer(cache, "sku1111")
+
+    assert (
+        asyncio.run(cache.get("stock for sku2222", ["wip://stock-level-inspector"]))
+        is None
+    )
+    assert cache.stats["misses"] == 1
+
+
+def test_same_sku_is_a_hit():
+    cache = SemanticResponseCache(embed=_embed, threshold=0.5)
+    _cache_stock_answer(cache, "sku1111")
+
+    cached = asyncio.run(
+        cache.get("What is the stock for SKU1111?", ["wip://stock-level-inspector"])
+    )
+    assert cached is not None
+    assert cached.tool_calls == [("get_stock_for_sku", {"sku": "sku1111"})]
+    assert cached.bindings == {"stock": (0, ("stock",))}
+
+
+def test_slow_tool_refetch_is_a_miss():
+    cache = SemanticResponseCache(embed=_embed, threshold=0.5)
+    _cache_stock_answer(cache, "sku1111")
+    client = MCPWIPClient(
+        llm_client=None,
+        mcp_server_transport=FastMCP("empty"),
+        response_cache=cache,
+        tool_timeout=0.05,
+        log_lvl=logging.WARNING,
+    )
+
+    async def slow_tool(tool_name, arguments):
+        await asyncio.sleep(10)
+
+    client.call_mcp_tool = slow_tool
+    cached = asyncio.run(
+        asyncio.wait_for(
+            client._cached_answer("stock for sku1111", ["wip://stock-level-inspector"]),
+            1,
+        )
+    )
+    assert cached is None
@@ -0,0 +1,41 @@
+import asyncio
+
+import mcp.types
+import pytest
+from fastmcp import FastMCP
+from mcp.shared.exceptions import McpError
+
+from core.mcp_client.session_pool import MCPSessionPool
+
+
+def _broken_after(error: Exception) -> bool:
+    pool = MCPSessionPool(FastMCP("server"))
+
+    async def run():
+        try:
+            with pytest.raises(type(error)):
+                async with pool.acquire():
+                    raise error
+            return pool.members[0].broken
+        finally:
+            await pool.close()
+
+    return asyncio.run(run())
+
+
+def test_runtime_error_keeps_the_session():
+    assert not _broken_after(RuntimeError("tool handler failed"))
+
+
+def test_connection_closed_breaks_the_session():
+    error = McpError(
+        mcp.types.ErrorData(code=mcp.types.CONNECTION_CLOSED, message="closed")
+    )
+    assert _broken_after(error)
+
+
+def test_other_mcp_error_keeps_the_session():
+    error = McpError(
+        mcp.types.ErrorData(code=mcp.types.INVALID_PARAMS, message="bad params")
+    )
+    assert not _broken_after(error)
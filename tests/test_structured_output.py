@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import types
+
+import httpx
+import pytest
+from fastmcp import FastMCP
+from openai import BadRequestError
+
+from core.mcp_client.client import _VALID_RESPONSE_FORMAT, MCPWIPClient
+
+
+def _bad_request(message: str, param: str | None = None) -> BadRequestError:
+    request = httpx.Request("POST", "http://llm/chat/completions")
+    return BadRequestError(
+        message,
+        response=httpx.Response(400, request=request),
+        body={"message": message, "param": param},
+    )
+
+
+def _client(error: BadRequestError) -> tuple[MCPWIPClient, list]:
+    requests = []
+
+    async def create(**kwargs):
+        requests.append(kwargs)
+        if "response_format" in kwargs:
+            raise error
+        return "completion"
+
+    llm_client = types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create))
+    )
+    client = MCPWIPClient(
+        llm_client=llm_client,
+        mcp_server_transport=FastMCP("empty"),
+        structured_output=True,
+        log_lvl=logging.WARNING,
+    )
+    return client, requests
+
+
+def test_response_format_is_strict():
+    schema = _VALID_RESPONSE_FORMAT["json_schema"]["schema"]
+    assert _VALID_RESPONSE_FORMAT["json_schema"]["strict"] is True
+    assert schema["additionalProperties"] is False
+    assert schema["required"] == ["uri", "parameters", "text"]
+    parameter = schema["$defs"]["ParameterKV"]
+    assert parameter["additionalProperties"] is False
+    assert parameter["required"] == ["name", "value"]
+
+
+def test_rejected_response_format_is_disabled():
+    client, requests = _client(
+        _bad_request("response_format json_schema is not supported")
+    )
+    messages = [{"role": "user", "content": "hi"}]
+
+    assert asyncio.run(client._request_completion(messages, [], False)) == "completion"
+    assert client._structured_output_supported is False
+    assert [("response_format" in r) for r in requests] == [True, False]
+
+
+def test_other_bad_request_keeps_response_format():
+    client, requests = _client(_bad_request("context length exceeded"))
+    messages = [{"role": "user", "content": "hi"}]
+
+    with pytest.raises(BadRequestError):
+        asyncio.run(client._request_completion(messages, [], False))
+    assert client._structured_output_supported is None
+    assert len(requests) == 1
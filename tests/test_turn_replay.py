@@ -0,0 +1,18 @@
+import asyncio
+
+from benchmarks.replay import record
+from core.mcp_client.turn_replay import TurnReplayer, read_log
+
+
+def test_log_appended_by_two_clients_replays_each_run(tmp_path):
+    path = str(tmp_path / "turns.jsonl.gz")
+    for _ in range(2):
+        asyncio.run(record(path, sessions=2, turns=2, widgets=5))
+
+    headers = [r for r in read_log(path) if r["kind"] == "header"]
+    report = asyncio.run(TurnReplayer(path).run())
+
+    assert len({h["run"] for h in headers}) == 2
+    assert report["turns"] == 8
+    assert report["errors"] == 0
+    assert report["drift"] == {}
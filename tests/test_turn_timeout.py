@@ -0,0 +1,34 @@
+import asyncio
+import json
+import logging
+
+from fastmcp import FastMCP
+
+from core.mcp_client.client import TURN_INTERRUPTED_TEXT, MCPWIPClient
+from core.mcp_client.memory_handler import LastKMemory
+
+
+def test_turn_timeout_bounds_the_setup():
+    client = MCPWIPClient(
+        llm_client=None,
+        mcp_server_transport=FastMCP("empty"),
+        memory=LastKMemory(k=5),
+        turn_timeout=0.05,
+        log_lvl=logging.WARNING,
+    )
+
+    async def slow_prompt(user_message, catalog_token_budget=None):
+        await asyncio.sleep(10)
+
+    client.format_prompt = slow_prompt
+
+    async def run():
+        try:
+            return await asyncio.wait_for(client.run_chat_turn("hello", "s1"), 1)
+        finally:
+            await client.close()
+
+    messages = asyncio.run(run())
+    assert json.loads(messages[-1].content)["text"] == TURN_INTERRUPTED_TEXT
+    history = client.memory.get_context("s1")
+    assert [m["role"] for m in history[-2:]] == ["user", "assistant"]
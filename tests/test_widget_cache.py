@@ -0,0 +1,89 @@
+import asyncio
+import json
+import logging
+
+from fastmcp import FastMCP
+from fastmcp.client.transports import FastMCPTransport
+
+from core.mcp_client.client import MCPWIPClient
+from core.mcp_client.memory_handler import LastKMemory
+from core.mcp_client.session_pool import MCPSessionPool
+from core.mcp_client.widget_cache import WidgetManifestCache
+from core.mcp_server.models import WidgetManifest
+from core.mcp_server.server import MCPWIPServer
+
+
+def _manifest(name: str, description: str) -> WidgetManifest:
+    return WidgetManifest(
+        uri=f"wip://{name}",
+        name=name,
+        description=description,
+        use_cases_hints=f"Use it for {name}",
+        version="1.0.0",
+    )
+
+
+def test_updated_widget_is_read_again():
+    server = MCPWIPServer(
+        input_dir="", server=FastMCP("test"), load_from_directory=False
+    )
+    server.add_manifest_json_resource(_manifest("calendar", "old calendar"))
+    server.add_manifest_json_resource(_manifest("stock", "stock levels"))
+    pool = MCPSessionPool(FastMCPTransport(server.server))
+    cache = WidgetManifestCache()
+
+    async def run():
+        try:
+            await cache.get_all(pool)
+            server.add_manifest_json_resource(_manifest("calendar", "new calendar"))
+            # as on a notifications/resources/updated
+            cache.invalidate("wip://calendar")
+            return await cache.get_all(pool)
+        finally:
+            await pool.close()
+
+    widgets = asyncio.run(run())
+    assert [w.uri for w in widgets] == ["wip://calendar", "wip://stock"]
+    assert widgets[0].manifest["description"] == "new calendar"
+
+
+def test_subscribed_widget_update_is_read_again():
+    server = MCPWIPServer(
+        input_dir="", server=FastMCP("test"), load_from_directory=False
+    )
+    server.add_manifest_json_resource(_manifest("calendar", "old calendar"))
+    lowlevel = server.server._mcp_server
+    sessions = []
+
+    @lowlevel.subscribe_resource()
+    async def subscribe(uri):
+        sessions.append(lowlevel.request_context.session)
+
+    get_capabilities = lowlevel.get_capabilities
+
+    def capabilities(*args, **kwargs):
+        result = get_capabilities(*args, **kwargs)
+        result.resources.subscribe = True
+        return result
+
+    lowlevel.get_capabilities = capabilities
+    client = MCPWIPClient(
+        llm_client=None,
+        mcp_server_transport=server,
+        memory=LastKMemory(k=5),
+        log_lvl=logging.WARNING,
+    )
+
+    async def run():
+        try:
+            await client.collect_widget_resources_text_full()
+            server.add_manifest_json_resource(_manifest("calendar", "new calendar"))
+            await sessions[0].send_resource_updated("wip://calendar")
+            await asyncio.sleep(0.05)
+            return await client.collect_widget_resources_text_full()
+        finally:
+            await client.close()
+
+    texts = asyncio.run(run())
+    assert len(sessions) == 1
+    assert json.loads(texts[0])["description"] == "new calendar"